@@ -1,27 +1,40 @@
-from src.LLM_setup.llm_initialization import LegalChatbot
+from src.LLM_setup.LLM_initialization import model_registry
 from src.prompts.main_prompt import basic_prompt
 from src.exception import CustomException
-from src.utils import search_similar_documents
+from src.utils import search_similar_documents, asearch_similar_documents, get_token_count
 from src.logger import logger
-from langchain_core.messages import AIMessage
-from src.chat_history_manager import chat_history_manager
+from src.context_builder import assemble_context
+from langchain_core.messages import AIMessage, AIMessageChunk
+from src.chat_history_manager import history_store, DEFAULT_SESSION_ID
 from src.prompts.summarization import summarize
+import os
 import re
 import sys
+import asyncio
 from src.LLM_setup.ai_agent_call import get_enhanced_legal_answer
 from src.eval.llm_evaluation import run_llm_evaluation
 
+# Older turns are folded into the rolling summary once the recent turns exceed this many tokens
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500))
+# Turns always kept verbatim after folding
+KEEP_RECENT_TURNS = max(0, int(os.getenv("KEEP_RECENT_TURNS", 2)))
+
 def get_chunk_text(results):
-    return "\n".join([doc.page_content for doc in results])
+    return assemble_context(results)
 
 def extract_token_usage(response: AIMessage) -> dict:
     """
-    Extracts input, output, and total token 
+    Extracts input, output, and total token counts, with input split into tokens served
+    from Gemini's context cache (explicit or implicit) and tokens billed at the full rate
     """
     try:
-        usage = response.usage_metadata if hasattr(response, 'usage_metadata') else {}
+        usage = getattr(response, 'usage_metadata', None) or {}
+        input_tokens = usage.get("input_tokens", 0)
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
         return {
-            "input_tokens": usage.get("input_tokens", 0),
+            "input_tokens": input_tokens,
+            "cached_input_tokens": cached_tokens,
+            "uncached_input_tokens": max(0, input_tokens - cached_tokens),
             "output_tokens": usage.get("output_tokens", 0),
             "total_tokens": usage.get("total_tokens", 0)
         }
@@ -47,6 +60,74 @@ def parse_gemini_response(response: AIMessage) -> dict:
         logger.error(f"Error during parsing chatbot response's: {str(e)}")
         raise e
 
+class StreamingAnswerParser:
+    """
+    Incremental counterpart of parse_gemini_response.
+    Splits streamed text into <inner_monologue> and <answer> sections as tokens arrive,
+    holding back only a possible partial tag at the end of the buffer.
+    """
+    TAGS = {
+        "<inner_monologue>": "inner_monologue",
+        "</inner_monologue>": None,
+        "<answer>": "answer",
+        "</answer>": None,
+    }
+
+    def __init__(self):
+        self.buffer = ""
+        self.section = None
+        self.parts = {"inner_monologue": [], "answer": []}
+
+    def _emit(self, text, events):
+        if not text or self.section is None:
+            return
+        # Match parse_gemini_response, which strips whitespace after the opening tag
+        if not self.parts[self.section]:
+            text = text.lstrip()
+            if not text:
+                return
+        self.parts[self.section].append(text)
+        events.append((self.section, text))
+
+    def feed(self, text: str) -> list:
+        """
+        Returns:
+            list: (section, text) pairs completed by this piece of text.
+        """
+        self.buffer += text
+        events = []
+        while self.buffer:
+            tag_start = self.buffer.find("<")
+            if tag_start == -1:
+                self._emit(self.buffer, events)
+                self.buffer = ""
+                break
+
+            self._emit(self.buffer[:tag_start], events)
+            self.buffer = self.buffer[tag_start:]
+
+            tag = next((tag for tag in self.TAGS if self.buffer.startswith(tag)), None)
+            if tag is not None:
+                self.section = self.TAGS[tag]
+                self.buffer = self.buffer[len(tag):]
+            elif any(tag.startswith(self.buffer) for tag in self.TAGS):
+                break  # partial tag, wait for more tokens
+            else:
+                # Some other markup, e.g. <additional>, is part of the section text
+                self._emit("<", events)
+                self.buffer = self.buffer[1:]
+        return events
+
+    def close(self) -> list:
+        events = []
+        self._emit(self.buffer, events)
+        self.buffer = ""
+        return events
+
+    def result(self) -> dict:
+        return {section: "".join(parts).strip() for section, parts in self.parts.items()}
+
+
 def evaluate_llm_output(query: str, context: str, llm_answer: str) -> dict:
     """
     Evaluate the LLM answer using available metrics and log the evaluation.
@@ -60,41 +141,173 @@ def evaluate_llm_output(query: str, context: str, llm_answer: str) -> dict:
         logger.error(f"Evaluation failed for query '{query}': {str(e)}")
         raise CustomException(e, sys)
 
-    
-def generate_chatbot_response(user_query: str) -> AIMessage:
+
+async def aevaluate_llm_output(query: str, context: str, llm_answer: str) -> dict:
+    """
+    Async wrapper over evaluate_llm_output; RAGAS runs its own blocking loop, so it is moved to a worker thread.
+    """
+    return await asyncio.to_thread(evaluate_llm_output, query, context, llm_answer)
+
+
+def format_chat_history(chat_history, summary: str = "") -> str:
+    turns = "\n".join(
+        [f"User: {msg['user']}\nAssistant: {msg['system']}" for msg in chat_history]
+    )
+    if summary:
+        return f"Summary of earlier chat: {summary}\n{turns}".strip()
+    return turns if chat_history else "This is the start of the conversation."
+
+
+def needs_summary(history) -> bool:
+    chat_history = history.get()
+    return (
+        len(chat_history) > KEEP_RECENT_TURNS
+        and get_token_count(format_chat_history(chat_history)) > HISTORY_TOKEN_BUDGET
+    )
+
+
+def parse_summary(summary_response) -> str:
+    content = summary_response.content if isinstance(summary_response, AIMessage) else str(summary_response)
+    summary_match = re.search(r"<summary>\s*(.*?)\s*</summary>", content, re.DOTALL)
+    return summary_match.group(1).strip() if summary_match else content.strip()
+
+
+def start_summary(history):
+    """
+    Returns:
+        tuple or None: (turns to fold into the summary, offset of the first one),
+        None if not needed or already in progress.
+    """
+    with history.lock:
+        if history.summarizing or not needs_summary(history):
+            return None
+        history.summarizing = True
+        turns, offset = history.snapshot()
+        # Not turns[:-KEEP_RECENT_TURNS]: with KEEP_RECENT_TURNS=0 that is empty and nothing would be folded
+        return turns[:len(turns) - KEEP_RECENT_TURNS], offset
+
+
+async def asummarize_history(session_id: str = DEFAULT_SESSION_ID):
+    """
+    Background task run after a response is returned: folds older turns into the session's rolling summary.
+    """
+    history = history_store.session(session_id)
+    started = start_summary(history)
+    if started is None:
+        return
+    folded_turns, offset = started
     try:
-        results = search_similar_documents(user_query)
+        logger.info(f"Summarizing {len(folded_turns)} turns of session '{session_id}'")
+        summary_system_prompt, summary_user_prompt = summarize(folded_turns, history.get_summary())
+        chatbot = model_registry.get("summary")
+        summary_response: AIMessage = await chatbot.agenerate_response(summary_system_prompt, summary_user_prompt)
+        history.fold(parse_summary(summary_response), folded_turns, offset)
+    except Exception as e:
+        logger.error(f"Error summarizing chat history of session '{session_id}': {str(e)}")
+    finally:
+        history.summarizing = False
+
+
+def summarize_history(session_id: str = DEFAULT_SESSION_ID):
+    """Blocking variant of asummarize_history for the CLI."""
+    history = history_store.session(session_id)
+    started = start_summary(history)
+    if started is None:
+        return
+    folded_turns, offset = started
+    try:
+        logger.info(f"Summarizing {len(folded_turns)} turns of session '{session_id}'")
+        summary_system_prompt, summary_user_prompt = summarize(folded_turns, history.get_summary())
+        chatbot = model_registry.get("summary")
+        summary_response: AIMessage = chatbot.generate_response(summary_system_prompt, summary_user_prompt)
+        history.fold(parse_summary(summary_response), folded_turns, offset)
+    except Exception as e:
+        logger.error(f"Error summarizing chat history of session '{session_id}': {str(e)}")
+    finally:
+        history.summarizing = False
+
+
+async def agenerate_chatbot_response(user_query: str, session_id: str = DEFAULT_SESSION_ID):
+    """
+    Async variant of generate_chatbot_response: retrieval and generation are awaited
+    so a slow Gemini call doesn't stall other requests on the same worker.
+    The prompt uses the last cached summary; schedule asummarize_history after returning to refresh it.
+    """
+    try:
+        results = await asearch_similar_documents(user_query)
         relevant_chunks = get_chunk_text(results)
 
-        chat_history = chat_history_manager.get()
+        history = history_store.session(session_id)
+        async with history.turn_lock:
+            chat_summary = format_chat_history(history.get(), history.get_summary())
 
-        if len(chat_history) >= 4:
-            first_two = chat_history[:2]
+            # Response from LLM for user's query
+            system_prompt, user_prompt = basic_prompt(chat_summary, relevant_chunks, user_query)
+            chatbot = model_registry.get("answer")
+            response: AIMessage = await chatbot.agenerate_response(system_prompt, user_prompt)
+
+            history.add(user_query, response.content if isinstance(response, AIMessage) else str(response))
+        logger.info("Chatbot response generated successfully.")
+
+        return relevant_chunks, response
+
+    except CustomException as e:
+        logger.error(f"Error during async chatbot response generation: {str(e)}")
+        raise e
 
-            summary_system_prompt, summary_user_prompt = summarize(first_two)
-            logger.info("Summarizing chat history")
-            print("Summarizing chat history")
-            
-            chatbot = LegalChatbot()
-            summary_response: AIMessage = chatbot.generate_response(summary_system_prompt, summary_user_prompt)
 
-            chat_history_manager.clear()  # Clear all temporarily
-            chat_history_manager.add("Summary of earlier chat", summary_response.content if isinstance(summary_response, AIMessage) else str(summary_response))
+async def astream_chatbot_response(user_query: str, session_id: str = DEFAULT_SESSION_ID):
+    """
+    Streaming variant of agenerate_chatbot_response.
+
+    Yields:
+        tuple: ("inner_monologue" | "answer", text) as sections arrive, then
+        ("done", {"relevant_chunks", "response", "parsed"}) once generation ends.
+    """
+    try:
+        results = await asearch_similar_documents(user_query)
+        relevant_chunks = get_chunk_text(results)
 
-            # Add remaining messages after the first two
-            for msg in chat_history[2:]:
-                chat_history_manager.add(msg['user'], msg['system'])
+        history = history_store.session(session_id)
+        async with history.turn_lock:
+            chat_summary = format_chat_history(history.get(), history.get_summary())
+            system_prompt, user_prompt = basic_prompt(chat_summary, relevant_chunks, user_query)
 
-        chat_summary = "\n".join(
-            [f"User: {msg['user']}\nAssistant: {msg['system']}" for msg in chat_history_manager.get()]
-        ) if chat_history_manager.get() else "This is the start of the conversation."
+            chatbot = model_registry.get("answer")
+            parser = StreamingAnswerParser()
+            response: AIMessageChunk = None
+            async for chunk in chatbot.astream_response(system_prompt, user_prompt):
+                response = chunk if response is None else response + chunk
+                for event in parser.feed(chunk.content if isinstance(chunk.content, str) else str(chunk.content)):
+                    yield event
+            for event in parser.close():
+                yield event
 
-        # Response from LLM for user's query
-        system_prompt, user_prompt = basic_prompt(chat_summary, relevant_chunks, user_query)
-        chatbot = LegalChatbot()
-        response: AIMessage = chatbot.generate_response(system_prompt, user_prompt)
+            history.add(user_query, response.content if response is not None else "")
+        logger.info("Chatbot response streamed successfully.")
+
+        yield "done", {"relevant_chunks": relevant_chunks, "response": response, "parsed": parser.result()}
+
+    except CustomException as e:
+        logger.error(f"Error during chatbot response streaming: {str(e)}")
+        raise e
 
-        chat_history_manager.add(user_query, response.content if isinstance(response, AIMessage) else str(response))
+
+def generate_chatbot_response(user_query: str, session_id: str = DEFAULT_SESSION_ID) -> AIMessage:
+    try:
+        results = search_similar_documents(user_query)
+        relevant_chunks = get_chunk_text(results)
+
+        history = history_store.session(session_id)
+        with history.lock:
+            chat_summary = format_chat_history(history.get(), history.get_summary())
+
+            # Response from LLM for user's query
+            system_prompt, user_prompt = basic_prompt(chat_summary, relevant_chunks, user_query)
+            chatbot = model_registry.get("answer")
+            response: AIMessage = chatbot.generate_response(system_prompt, user_prompt)
+
+            history.add(user_query, response.content if isinstance(response, AIMessage) else str(response))
         logger.info("Chatbot response generated successfully.")
         
         return relevant_chunks, response
@@ -129,6 +342,7 @@ if __name__ == "__main__":
                 print("\n🤖 Assistant:", parsed["answer"])
                 print("\n************************************************\n")
                 print("Input tokens:", token_info["input_tokens"])
+                print("Cached input tokens:", token_info["cached_input_tokens"])
                 print("Output tokens:", token_info["output_tokens"])
                 print("Total tokens:", token_info["total_tokens"])
                 print("\n************************************************\n")
@@ -143,10 +357,13 @@ if __name__ == "__main__":
                 if user_followup == "y":
                     # You can pass chat history if desired
                     history_str = "\n".join(
-                        [f"User: {msg['user']}\nAssistant: {msg['system']}" for msg in chat_history_manager.get()]
+                        [f"User: {msg['user']}\nAssistant: {msg['system']}" for msg in history_store.session().get()]
                     )
                     # print(history_str)
                     enhanced_response = get_enhanced_legal_answer(query, chat_history=history_str)
                     print("\n🤖 Enhanced Assistant:", enhanced_response)
+
+            # Fold older turns into the rolling summary once the answer has been shown
+            summarize_history()
         except CustomException as e:
             print("Error:", str(e))
\ No newline at end of file
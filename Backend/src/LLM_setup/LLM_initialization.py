@@ -1,43 +1,144 @@
 import os
+import asyncio
+import threading
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import SystemMessage, HumanMessage
 from pydantic import BaseModel, Field
 from src.exception import CustomException
 from src.logger import logger
+from src.LLM_setup.prompt_cache import prompt_cache
 import sys
 
+load_dotenv()
+
 class ChatbotConfig(BaseModel):
     model_name: str = Field(default="gemini-2.0-flash")
     temperature: float = Field(default=0.1)
     verbose: bool = Field(default=True)
     google_api_key: str
 
+# Named model configs; a cheaper model is enough for folding chat history into summaries
+MODEL_CONFIGS = {
+    "answer": {"model_name": os.getenv("ANSWER_MODEL", "gemini-2.0-flash")},
+    "summary": {"model_name": os.getenv("SUMMARY_MODEL", "gemini-2.0-flash-lite")},
+}
+# Sends one billed request per model at every worker start, so it is off by default
+WARMUP_PING = os.getenv("WARMUP_PING", "false").lower() == "true"
+
 class LegalChatbot:
-    def __init__(self):
+    def __init__(self, config: ChatbotConfig = None):
         try:
-            load_dotenv()
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("GOOGLE_API_KEY is missing in the .env file.")
-            
-            self.config = ChatbotConfig(google_api_key=api_key)
-            
+            if config is None:
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    raise ValueError("GOOGLE_API_KEY is missing in the .env file.")
+                config = ChatbotConfig(google_api_key=api_key)
+
+            self.config = config
+
             self.llm = ChatGoogleGenerativeAI(
                 model=self.config.model_name,
                 temperature=self.config.temperature,
                 verbose=self.config.verbose,
                 google_api_key=self.config.google_api_key
             )
-            logger.info("LegalChatbot model initialized successfully.")
+            logger.info(f"LegalChatbot model '{self.config.model_name}' initialized successfully.")
 
         except Exception as e:
             logger.error(f"Error initializing LegalChatbot: {str(e)}")
             raise CustomException(e, sys)
 
+    def build_request(self, system_prompt: str, user_prompt: str):
+        """
+        Returns:
+            tuple: (messages, invoke kwargs). When the system prompt is held in a provider cache,
+            it is referenced by name instead of being sent.
+        """
+        cache_name = prompt_cache.lookup(self.config.model_name, system_prompt)
+        if cache_name is not None and prompt_cache.provider:
+            return [HumanMessage(content=user_prompt)], {"cached_content": cache_name}
+        return [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)], {}
+
     def generate_response(self, system_prompt: str, user_prompt: str) -> str:
         try:
             logger.info("Generating response from LLM.")
-            return self.llm.invoke(system_prompt + "\n\n" + user_prompt)
+            messages, kwargs = self.build_request(system_prompt, user_prompt)
+            return self.llm.invoke(messages, **kwargs)
         except Exception as e:
             logger.error(f"Error during response generation: {str(e)}")
             raise CustomException(e, sys)
+
+    async def agenerate_response(self, system_prompt: str, user_prompt: str):
+        try:
+            logger.info("Generating response from LLM asynchronously.")
+            messages, kwargs = await asyncio.to_thread(self.build_request, system_prompt, user_prompt)
+            return await self.llm.ainvoke(messages, **kwargs)
+        except Exception as e:
+            logger.error(f"Error during async response generation: {str(e)}")
+            raise CustomException(e, sys)
+
+    async def astream_response(self, system_prompt: str, user_prompt: str):
+        """Yields AIMessageChunks as Gemini generates them."""
+        try:
+            logger.info("Streaming response from LLM.")
+            messages, kwargs = await asyncio.to_thread(self.build_request, system_prompt, user_prompt)
+            async for chunk in self.llm.astream(messages, **kwargs):
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error during response streaming: {str(e)}")
+            raise CustomException(e, sys)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of configured chat models.
+    Each named config is built once and shared, so every call reuses the same client and its open connection.
+    """
+
+    def __init__(self, configs=MODEL_CONFIGS):
+        self.configs = dict(configs)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, **config):
+        """Adds or replaces a named config; an existing model for that name is rebuilt on next use."""
+        with self._lock:
+            self.configs[name] = config
+            self._models.pop(name, None)
+
+    def get(self, name: str = "answer") -> LegalChatbot:
+        chatbot = self._models.get(name)
+        if chatbot is not None:
+            return chatbot
+        with self._lock:
+            if name not in self._models:
+                try:
+                    if name not in self.configs:
+                        raise ValueError(f"Unknown model config '{name}'")
+                    api_key = os.getenv("GOOGLE_API_KEY")
+                    if not api_key:
+                        raise ValueError("GOOGLE_API_KEY is missing in the .env file.")
+                except ValueError as e:
+                    logger.error(f"Error creating model '{name}': {str(e)}")
+                    raise CustomException(e, sys)
+                self._models[name] = LegalChatbot(ChatbotConfig(google_api_key=api_key, **self.configs[name]))
+            return self._models[name]
+
+    async def awarm_up(self, ping: bool = WARMUP_PING):
+        """
+        Builds every registered model at startup. With ping, also sends a tiny async request from
+        the serving event loop: the async Gemini client requests use (ainvoke/astream) is created
+        lazily inside the running loop, so this opens its channel before the first user arrives.
+        """
+        for name in list(self.configs):
+            chatbot = await asyncio.to_thread(self.get, name)
+            if ping:
+                try:
+                    await chatbot.llm.ainvoke("ping")
+                except Exception as e:
+                    logger.warning(f"Warm-up call for model '{name}' failed: {str(e)}")
+        logger.info(f"Model registry warmed up: {', '.join(self.configs)}")
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,144 @@
+"""
+Prompt prefix cache
+
+Prompts are a static system prefix (SYSTEM_PROMPT, SUMMARY_SYSTEM_PROMPT) plus a per-request
+user suffix. With PROMPT_CACHE_BACKEND=gemini the prefix is uploaded once per model as Gemini
+cached content, and requests reference it by name, so its tokens are billed at the cached
+rate instead of being resent. Caches are recreated shortly before their TTL runs out.
+
+Prefixes shorter than PROMPT_CACHE_MIN_TOKENS are sent as a plain system message, which models
+with implicit caching still reuse. Gemini also enforces its own per-model minimum; a prefix it
+rejects as too small is sent inline until the entry's TTL runs out instead of being retried.
+PROMPT_CACHE_BACKEND=none always sends the prefix.
+
+PROMPT_CACHE_BACKEND=local keeps the same bookkeeping without calling Gemini, as a stand-in
+for tests and local runs; its names are never sent to the model.
+"""
+
+import os
+import sys
+import time
+import hashlib
+import datetime
+import threading
+from src.exception import CustomException
+from src.logger import logger
+from src.token_counter import token_counter
+
+PROMPT_CACHE_BACKEND = os.getenv("PROMPT_CACHE_BACKEND", "gemini").lower()
+# Seconds a cached prefix lives at the provider
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", 3600))
+# Low enough that SYSTEM_PROMPT (~600 tokens) qualifies; raise it for models whose minimum it can't meet
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", 256))
+# Recreate a cache this many seconds before it expires, so no request references a dead one
+REFRESH_MARGIN = 60
+# Seconds before retrying a prefix whose cache creation failed
+RETRY_AFTER = 300
+
+
+def prefix_key(model_name, prefix):
+    return model_name, hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+class PromptCacheManager:
+
+    def __init__(self, backend=PROMPT_CACHE_BACKEND, ttl=PROMPT_CACHE_TTL, min_tokens=PROMPT_CACHE_MIN_TOKENS):
+        try:
+            if backend not in ("gemini", "local", "none"):
+                raise ValueError(f"Unknown PROMPT_CACHE_BACKEND '{backend}', expected gemini, local or none")
+        except ValueError as e:
+            logger.error(f"Error configuring prompt cache: {str(e)}")
+            raise CustomException(e, sys)
+        self.backend = backend
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        # google.generativeai.caching, configured with the API key on first use
+        self._caching = None
+        # (model, prefix hash) -> {"name", "expires"}; failed or too-short prefixes hold name None
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+
+    @property
+    def provider(self):
+        """Whether names returned by lookup refer to provider-side caches that requests can use."""
+        return self.backend == "gemini"
+
+    def _client(self):
+        """Configures the Gemini SDK once; the caller holds the lock."""
+        if self._caching is None:
+            # Imported here: only the gemini backend needs the SDK
+            import google.generativeai as genai
+            from google.generativeai import caching
+
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            self._caching = caching
+        return self._caching
+
+    def _create(self, model_name, prefix):
+        """
+        Returns:
+            str: Name of a Gemini cached content holding prefix as the system instruction.
+        """
+        if self.backend == "local":
+            return f"local/{model_name}/{prefix_key(model_name, prefix)[1][:16]}"
+        cache = self._client().CachedContent.create(
+            model=model_name if model_name.startswith("models/") else f"models/{model_name}",
+            system_instruction=prefix,
+            ttl=datetime.timedelta(seconds=self.ttl),
+        )
+        return cache.name
+
+    def lookup(self, model_name, prefix):
+        """
+        Returns:
+            str or None: Name of the cached content holding prefix for model_name, created on first use;
+            None when the prefix isn't cached and has to be sent with the request.
+        """
+        if self.backend == "none" or not prefix:
+            return None
+        key = prefix_key(model_name, prefix)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] > now:
+                if entry["name"] is not None:
+                    self._hits += 1
+                return entry["name"]
+
+            self._misses += 1
+            if token_counter.count(prefix) < self.min_tokens:
+                # Remembered for a TTL, so the prefix isn't re-counted on every call
+                self._entries[key] = {"name": None, "expires": now + self.ttl}
+                return None
+            try:
+                # Created under the lock: concurrent first requests wait for one cache instead of each creating one
+                name = self._create(model_name, prefix)
+                self._entries[key] = {"name": name, "expires": now + self.ttl - REFRESH_MARGIN}
+                logger.info(f"Cached prompt prefix for model '{model_name}' as {name}")
+                return name
+            except Exception as e:
+                if "too small" in str(e).lower():
+                    # Below the model's own minimum; retrying won't help until the prefix changes
+                    logger.info(f"Prompt prefix for model '{model_name}' is below its cache minimum, sending it uncached")
+                    self._entries[key] = {"name": None, "expires": now + self.ttl}
+                    return None
+                self._errors += 1
+                logger.warning(f"Could not cache prompt prefix for model '{model_name}', sending it uncached: {str(e)}")
+                self._entries[key] = {"name": None, "expires": now + RETRY_AFTER}
+                return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "cached_prefixes": sum(1 for entry in self._entries.values() if entry["name"] is not None),
+                "hits": self._hits,
+                "misses": self._misses,
+                "errors": self._errors,
+            }
+
+
+prompt_cache = PromptCacheManager()
@@ -0,0 +1,5 @@
+import os
+
+# Backend/artifacts holds the indexes, caches and queues shared by the API (started from src/)
+# and ingestion (started from Backend/), so paths don't depend on the working directory
+ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "artifacts")
@@ -1,20 +1,221 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from contextlib import closing
+from collections import OrderedDict
+from src.logger import logger
+
+DEFAULT_SESSION_ID = "default"
+HISTORY_MAX_SESSIONS = int(os.getenv("HISTORY_MAX_SESSIONS", 1000))
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 20))
+# Sessions idle for longer than this are dropped from memory (persisted history is kept)
+HISTORY_IDLE_TTL = int(os.getenv("HISTORY_IDLE_TTL", 3600))
+# Optional SQLite file shared by all workers; empty keeps history in memory only
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "")
+
+
+class SQLiteHistoryBackend:
+    """
+    Persists each session's rolling summary and turns as one JSON row so any worker can pick the session up.
+    Every change is a read-modify-write inside BEGIN IMMEDIATE, so concurrent workers never overwrite each other's turns.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    history TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    @staticmethod
+    def _decode(row):
+        if row is None:
+            return [], "", 0, 0.0
+        history = json.loads(row[0])
+        return history["turns"], history["summary"], history.get("offset", 0), row[1]
+
+    def version(self, session_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT updated_at FROM chat_sessions WHERE session_id = ?;", (session_id,)).fetchone()
+        return row[0] if row else 0.0
+
+    def load(self, session_id):
+        """
+        Returns:
+            tuple: (list of turns, summary, offset, version)
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT history, updated_at FROM chat_sessions WHERE session_id = ?;", (session_id,)).fetchone()
+        return self._decode(row)
+
+    def update(self, session_id, change):
+        """
+        Applies change(turns, summary, offset) -> (turns, summary, offset) to the stored session atomically.
+
+        Returns:
+            tuple: (list of turns, summary, offset, version) after the change
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = conn.execute("SELECT history, updated_at FROM chat_sessions WHERE session_id = ?;", (session_id,)).fetchone()
+                turns, summary, offset, previous = self._decode(row)
+                turns, summary, offset = change(turns, summary, offset)
+                # Strictly increasing, so refresh() in other workers always sees the change
+                version = max(time.time(), previous + 1e-6)
+                conn.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (session_id, history, updated_at) VALUES (?, ?, ?);",
+                    (session_id, json.dumps({"turns": turns, "summary": summary, "offset": offset}), version)
+                )
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+        return turns, summary, offset, version
+
+
 class ChatHistoryManager:
-    _instance = None
-    chat_history = []
+    """
+    Chat history of a single session: a rolling summary of older turns plus the recent turns, capped at max_turns.
+    offset counts the turns dropped from the front so far, so turns are addressed by position across workers.
+    """
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ChatHistoryManager, cls).__new__(cls)
-            cls.chat_history = []
-        return cls._instance
+    def __init__(self, session_id=DEFAULT_SESSION_ID, max_turns=HISTORY_MAX_TURNS, backend=None):
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.backend = backend
+        self.chat_history = []
+        self.summary = ""
+        self.offset = 0
+        # Set while a background task is folding turns into the summary
+        self.summarizing = False
+        self.version = 0.0
+        self.last_access = time.monotonic()
+        self.lock = threading.RLock()
+        # Serializes whole chat turns of this session on the async path
+        self.turn_lock = asyncio.Lock()
+        if backend is not None:
+            self.chat_history, self.summary, self.offset, self.version = backend.load(session_id)
+
+    def _apply(self, change):
+        """Applies change(turns, summary, offset) to the stored session, or to memory without a backend."""
+        if self.backend is not None:
+            self.chat_history, self.summary, self.offset, self.version = self.backend.update(self.session_id, change)
+        else:
+            self.chat_history, self.summary, self.offset = change(list(self.chat_history), self.summary, self.offset)
 
     def add(self, user, system):
-        self.chat_history.append({"user": user, "system": system})
+        def append(turns, summary, offset):
+            turns.append({"user": user, "system": system})
+            dropped = max(0, len(turns) - self.max_turns)
+            return turns[dropped:], summary, offset + dropped
+
+        with self.lock:
+            self._apply(append)
 
     def get(self):
-        return self.chat_history
+        with self.lock:
+            return list(self.chat_history)
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: (list of turns, offset of the first one)
+        """
+        with self.lock:
+            return list(self.chat_history), self.offset
+
+    def get_summary(self):
+        with self.lock:
+            return self.summary
+
+    def fold(self, summary, folded_turns, offset):
+        """
+        Replaces folded_turns, taken from snapshot() at offset, with the updated rolling summary.
+        Turns are removed by position, so identical later turns and turns added while the
+        summary was being generated are kept.
+        """
+        end = offset + len(folded_turns)
+
+        def replace(turns, _, current_offset):
+            dropped = min(len(turns), max(0, end - current_offset))
+            return turns[dropped:], summary, current_offset + dropped
+
+        with self.lock:
+            self._apply(replace)
 
     def clear(self):
-        self.chat_history.clear()
+        with self.lock:
+            self._apply(lambda turns, summary, offset: ([], "", offset + len(turns)))
+
+    def refresh(self):
+        """Reloads from the backend if another worker wrote a newer version."""
+        if self.backend is None:
+            return
+        with self.lock:
+            if self.backend.version(self.session_id) > self.version:
+                self.chat_history, self.summary, self.offset, self.version = self.backend.load(self.session_id)
+
+
+class SessionHistoryStore:
+    """
+    Session-scoped chat histories with LRU eviction of idle sessions.
+    With a backend configured, histories are persisted and shared between uvicorn workers.
+    """
+
+    def __init__(self, max_sessions=HISTORY_MAX_SESSIONS, max_turns=HISTORY_MAX_TURNS, idle_ttl=HISTORY_IDLE_TTL, backend=None):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.backend = backend
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def session(self, session_id=DEFAULT_SESSION_ID):
+        """
+        Returns:
+            ChatHistoryManager: History of the session, created if unknown.
+        """
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = ChatHistoryManager(session_id, self.max_turns, self.backend)
+                self._sessions[session_id] = history
+            else:
+                self._sessions.move_to_end(session_id)
+            history.last_access = time.monotonic()
+            self._evict()
+
+        history.refresh()
+        return history
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_access <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            logger.info(f"Evicted chat session '{session_id}' from memory")
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
 
-chat_history_manager = ChatHistoryManager()
+history_store = SessionHistoryStore(backend=SQLiteHistoryBackend(HISTORY_DB_PATH) if HISTORY_DB_PATH else None)
@@ -0,0 +1,140 @@
+"""
+Prompt context assembly
+
+Runs between retrieval and basic_prompt, so Gemini is sent fewer, non-redundant tokens:
+
+1. Chunks are ordered by relevance: cited provisions first, then rerank score.
+2. Text a chunk shares with a chunk already kept is removed. This catches the 50-token
+   overlap TokenTextSplitter leaves between neighbouring chunks, in either order.
+3. Chunks whose word shingles are near-duplicates of a kept chunk (MinHash estimate of
+   Jaccard similarity) are dropped, e.g. the same section ingested from two sources.
+4. What remains is packed into CONTEXT_TOKEN_BUDGET tokens. A chunk that doesn't fit is
+   cut down when enough room is left for it to be useful, otherwise skipped.
+"""
+
+import os
+import re
+import sys
+import hashlib
+import numpy as np
+from src.exception import CustomException
+from src.logger import logger
+from src.token_counter import token_counter
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+# Estimated Jaccard similarity of word shingles above which a chunk counts as a duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.8))
+SHINGLE_SIZE = 5
+MINHASH_PERMUTATIONS = 64
+# Shortest shared run of words treated as split overlap rather than coincidence
+MIN_OVERLAP_WORDS = 8
+# Longest overlap looked for; TokenTextSplitter's 50 tokens are well under this many words
+MAX_OVERLAP_WORDS = 80
+# A chunk is only cut to fit when at least this many tokens of budget are left
+MIN_PARTIAL_TOKENS = 100
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_random = np.random.RandomState(1)
+_PERMUTATION_A = _random.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+def minhash(words, shingle_size=SHINGLE_SIZE):
+    """
+    Returns:
+        np.ndarray: MinHash signature of the text's word shingles.
+    """
+    shingles = {" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little") for shingle in shingles],
+        dtype=np.uint64
+    )
+    permuted = (np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % _MERSENNE_PRIME
+    return permuted.min(axis=0)
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(signature == other))
+
+
+def overlap_length(head, tail):
+    """
+    Returns:
+        int: Number of words at the end of head that repeat at the start of tail, 0 below MIN_OVERLAP_WORDS.
+    """
+    longest = min(len(head), len(tail), MAX_OVERLAP_WORDS)
+    for size in range(longest, MIN_OVERLAP_WORDS - 1, -1):
+        if head[-size:] == tail[:size]:
+            return size
+    return 0
+
+
+def relevance_order(documents):
+    """Cited provisions first, then by rerank score; documents without scores keep their retrieval order."""
+    def key(doc):
+        # RERANKER_BACKEND=none scores nothing
+        score = doc.metadata.get("rerank_score")
+        return "citation" not in doc.metadata, -score if score is not None else float("inf")
+
+    return sorted(documents, key=key)
+
+
+def strip_overlaps(words, kept):
+    """
+    Returns:
+        tuple: (first, last) word indices of the chunk left after removing what it shares
+               with the end or start of any kept chunk.
+    """
+    first, last = 0, len(words)
+    for other, _ in kept:
+        first += overlap_length(other, words[first:last])
+        last -= overlap_length(words[first:last], other)
+    return first, last
+
+
+def assemble_context(documents, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Returns:
+        str: Deduplicated chunk texts, most relevant first, within token_budget tokens.
+    """
+    try:
+        kept = []  # (words, signature) of the chunks kept so far
+        texts = []
+        dropped = 0
+        for doc in relevance_order(documents):
+            spans = [match.span() for match in re.finditer(r"\S+", doc.page_content)]
+            words = [doc.page_content[start:end] for start, end in spans]
+            if not words:
+                continue
+            signature = minhash(words)
+            if any(similarity(signature, other) >= NEAR_DUPLICATE_THRESHOLD for _, other in kept):
+                dropped += 1
+                continue
+            first, last = strip_overlaps(words, kept)
+            if last - first < MIN_OVERLAP_WORDS and last - first < len(words):
+                dropped += 1  # little left besides the overlap
+                continue
+            kept.append((words, signature))
+            # Slice the original text, so the chunk keeps its line breaks
+            texts.append(doc.page_content[spans[first][0]:spans[last - 1][1]])
+
+        counts = token_counter.count_batch(texts)
+        packed, used = [], 0
+        for text, tokens in zip(texts, counts):
+            room = token_budget - used
+            if tokens <= room:
+                packed.append(text)
+                used += tokens
+            elif room >= MIN_PARTIAL_TOKENS:
+                packed.append(token_counter.truncate(text, room))
+                used = token_budget
+        if dropped or len(packed) < len(texts) or used >= token_budget:
+            logger.info(
+                f"Context: {len(documents)} chunks -> {len(packed)} ({dropped} duplicates dropped, "
+                f"{used}/{token_budget} tokens, {sum(counts)} before packing)"
+            )
+        return "\n".join(packed)
+    except Exception as e:
+        logger.error(f"Error assembling prompt context: {str(e)}")
+        raise CustomException(e, sys)
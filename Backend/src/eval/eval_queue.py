@@ -0,0 +1,350 @@
+"""
+Background evaluation queue
+
+RAGAS evaluation makes several LLM calls per answer and is often rate limited, so it is
+kept off the request path. /chat enqueues a job and returns its id; a pool of worker
+threads drains the queue and stores the scores, which GET /evaluate/{id} reads back.
+
+- Queue and results store: a local SQLite file, so pending jobs survive restarts
+- Ownership: a claimed job carries its worker pool's id and a lease; only jobs whose lease
+  has expired (their process died) are claimed again, so other uvicorn workers never take
+  over jobs that are still running
+- Scheduling: a limiter spaces job starts to EVAL_REQUESTS_PER_MINUTE and backs off
+  exponentially when Gemini answers with a 429, instead of sleeping inside a request. Its
+  slot lives in the same SQLite file, so the budget is shared by every worker process
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from contextlib import closing
+from src.eval.llm_evaluation import run_evaluation_job, is_rate_limit_error
+from src.exception import CustomException
+from src import ARTIFACTS_DIR
+from src.logger import logger
+
+EVAL_QUEUE_PATH = os.getenv("EVAL_QUEUE_PATH", os.path.join(ARTIFACTS_DIR, "eval_queue.db"))
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", 2))
+EVAL_MAX_ATTEMPTS = int(os.getenv("EVAL_MAX_ATTEMPTS", 5))
+# Each job makes several evaluator LLM calls, so this is kept well under the model's RPM quota
+EVAL_REQUESTS_PER_MINUTE = float(os.getenv("EVAL_REQUESTS_PER_MINUTE", 4))
+# Seconds a claimed job stays owned by its worker; kept well above the longest evaluation
+EVAL_LEASE_SECONDS = float(os.getenv("EVAL_LEASE_SECONDS", 900))
+EVAL_POLL_INTERVAL = 1.0
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class EvaluationQueue:
+    """Persistent SQLite-backed job queue and results store for evaluations."""
+
+    def __init__(self, db_path=EVAL_QUEUE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    context TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    scores TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    not_before REAL NOT NULL DEFAULT 0,
+                    claimed_by TEXT,
+                    lease_expires REAL NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+            # Queues created before leases existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(evaluations);")}
+            if "claimed_by" not in columns:
+                conn.execute("ALTER TABLE evaluations ADD COLUMN claimed_by TEXT;")
+                conn.execute("ALTER TABLE evaluations ADD COLUMN lease_expires REAL NOT NULL DEFAULT 0;")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_pending ON evaluations (status, not_before);")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit (
+                    name TEXT PRIMARY KEY,
+                    next_slot REAL NOT NULL,
+                    strikes INTEGER NOT NULL
+                );
+            """)
+
+    def _connect(self):
+        # Autocommit; callers close the connection with contextlib.closing
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def enqueue(self, query, context, answer):
+        """
+        Returns:
+            str: Id of the queued evaluation.
+        """
+        try:
+            evaluation_id = uuid.uuid4().hex
+            now = time.time()
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT INTO evaluations (id, status, query, context, answer, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?);",
+                    (evaluation_id, PENDING, query, json.dumps(context), answer, now, now)
+                )
+            logger.info(f"Queued evaluation {evaluation_id} for query: {query}")
+            return evaluation_id
+        except sqlite3.Error as e:
+            logger.error(f"Error queuing evaluation: {str(e)}")
+            raise CustomException(e, sys)
+
+    def claim(self, owner, lease=EVAL_LEASE_SECONDS):
+        """
+        Atomically moves the oldest due job to running under owner's lease. Jobs left running
+        by a process that died are due again once their lease has expired.
+
+        Returns:
+            dict or None: The claimed job.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            now = time.time()
+            row = conn.execute(
+                """
+                SELECT id, query, context, answer, attempts, status FROM evaluations
+                WHERE (status = ? AND not_before <= ?) OR (status = ? AND lease_expires <= ?)
+                ORDER BY created_at LIMIT 1;
+                """,
+                (PENDING, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT;")
+                return None
+            conn.execute(
+                "UPDATE evaluations SET status = ?, attempts = attempts + 1, claimed_by = ?, lease_expires = ?, updated_at = ? WHERE id = ?;",
+                (RUNNING, owner, now + lease, now, row[0])
+            )
+            if row[5] == RUNNING:
+                logger.info(f"Re-claimed evaluation {row[0]} after its lease expired")
+            conn.execute("COMMIT;")
+            return {
+                "id": row[0],
+                "query": row[1],
+                "context": json.loads(row[2]),
+                "answer": row[3],
+                "attempts": row[4] + 1,
+            }
+        except sqlite3.Error:
+            conn.execute("ROLLBACK;")
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, evaluation_id, owner, **fields):
+        """Updates a running job, unless its lease expired and another owner has claimed it since."""
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with closing(self._connect()) as conn:
+            updated = conn.execute(
+                f"UPDATE evaluations SET {assignments}, claimed_by = NULL WHERE id = ? AND status = ? AND claimed_by = ?;",
+                (*fields.values(), evaluation_id, RUNNING, owner)
+            ).rowcount
+        if not updated:
+            logger.warning(f"Evaluation {evaluation_id} is no longer owned by {owner}, result discarded")
+
+    def complete(self, evaluation_id, owner, scores):
+        self._update(evaluation_id, owner, status=DONE, scores=json.dumps(scores), error=None)
+
+    def retry_later(self, evaluation_id, owner, delay, error):
+        self._update(evaluation_id, owner, status=PENDING, not_before=time.time() + delay, error=str(error))
+
+    def fail(self, evaluation_id, owner, error):
+        self._update(evaluation_id, owner, status=FAILED, error=str(error))
+
+    def release(self, evaluation_id, owner):
+        """Hands a claimed job that was never started back to the queue, without counting the attempt."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE evaluations SET status = ?, claimed_by = NULL, attempts = attempts - 1, updated_at = ? WHERE id = ? AND status = ? AND claimed_by = ?;",
+                (PENDING, time.time(), evaluation_id, RUNNING, owner)
+            )
+
+    def get(self, evaluation_id):
+        """
+        Returns:
+            dict or None: Status, scores and error for the evaluation.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id, status, query, scores, error, attempts FROM evaluations WHERE id = ?;",
+                (evaluation_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "evaluation_id": row[0],
+            "status": row[1],
+            "query": row[2],
+            "evaluation_scores": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "attempts": row[5],
+        }
+
+
+class RateLimitScheduler:
+    """
+    Spaces job starts across all workers and backs off after rate-limit errors.
+    The next free slot is a row of the queue's SQLite file, updated under BEGIN IMMEDIATE, so
+    every worker process draws from one EVAL_REQUESTS_PER_MINUTE budget.
+    """
+
+    def __init__(self, db_path=EVAL_QUEUE_PATH, requests_per_minute=EVAL_REQUESTS_PER_MINUTE, base_backoff=10, max_backoff=300, name="evaluator"):
+        self.db_path = db_path
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.name = name
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _update(self, change):
+        """
+        Applies change(now, next_slot, strikes) -> (next_slot, strikes, result) atomically.
+
+        Returns:
+            The result of change.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                row = conn.execute("SELECT next_slot, strikes FROM rate_limit WHERE name = ?;", (self.name,)).fetchone()
+                next_slot, strikes = row if row else (0.0, 0)
+                next_slot, strikes, result = change(time.time(), next_slot, strikes)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit (name, next_slot, strikes) VALUES (?, ?, ?);",
+                    (self.name, next_slot, strikes)
+                )
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+        return result
+
+    def wait_time(self):
+        """
+        Returns:
+            float: Seconds until the next job may start. Polling doesn't use up a slot.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT next_slot FROM rate_limit WHERE name = ?;", (self.name,)).fetchone()
+        return max(0.0, row[0] - time.time()) if row else 0.0
+
+    def reserve(self):
+        """
+        Reserves the next start slot for a job that has been claimed.
+
+        Returns:
+            float: Seconds to wait before starting it, when another worker took the current slot first.
+        """
+        def take(now, next_slot, strikes):
+            start = max(now, next_slot)
+            return start + self.interval, strikes, start - now
+
+        return self._update(take)
+
+    def rate_limited(self):
+        """
+        Returns:
+            float: Backoff applied to all workers, doubling on consecutive 429s.
+        """
+        def back_off(now, next_slot, strikes):
+            backoff = min(self.base_backoff * (2 ** strikes), self.max_backoff)
+            return max(next_slot, now + backoff), strikes + 1, backoff
+
+        return self._update(back_off)
+
+    def succeeded(self):
+        self._update(lambda now, next_slot, strikes: (next_slot, 0, None))
+
+
+class EvaluationWorkerPool:
+    """Worker threads that drain the evaluation queue."""
+
+    def __init__(self, queue, job=run_evaluation_job, workers=EVAL_WORKERS, scheduler=None, max_attempts=EVAL_MAX_ATTEMPTS):
+        self.queue = queue
+        self.job = job
+        self.workers = workers
+        self.scheduler = scheduler or RateLimitScheduler(queue.db_path)
+        self.max_attempts = max_attempts
+        # Lease owner recorded on claimed jobs; unique per process start
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"eval-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} evaluation workers")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Evaluation workers stopped")
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.scheduler.wait_time()
+            if wait:
+                self._stop.wait(min(wait, EVAL_POLL_INTERVAL))
+                continue
+
+            try:
+                job = self.queue.claim(self.owner)
+            except sqlite3.Error as e:
+                logger.error(f"Error claiming evaluation job: {str(e)}")
+                job = None
+            if job is None:
+                self._stop.wait(EVAL_POLL_INTERVAL)
+                continue
+
+            delay = self.scheduler.reserve()
+            if delay and self._stop.wait(delay):
+                # Not started yet, so another worker can take it right away
+                self.queue.release(job["id"], self.owner)
+                break
+            self._process(job)
+
+    def _process(self, job):
+        try:
+            scores = self.job(job["query"], job["context"], job["answer"])
+            self.queue.complete(job["id"], self.owner, scores)
+            self.scheduler.succeeded()
+            logger.info(f"Evaluation {job['id']} completed: {scores}")
+        except Exception as e:
+            if job["attempts"] >= self.max_attempts:
+                logger.error(f"Evaluation {job['id']} failed after {job['attempts']} attempts: {str(e)}")
+                self.queue.fail(job["id"], self.owner, e)
+            elif is_rate_limit_error(e):
+                backoff = self.scheduler.rate_limited()
+                logger.warning(f"Evaluation {job['id']} rate limited, retrying in {backoff} seconds")
+                self.queue.retry_later(job["id"], self.owner, backoff, e)
+            else:
+                logger.warning(f"Evaluation {job['id']} failed (attempt {job['attempts']}): {str(e)}")
+                self.queue.retry_later(job["id"], self.owner, self.scheduler.base_backoff, e)
+
+
+evaluation_queue = EvaluationQueue()
+evaluation_workers = EvaluationWorkerPool(evaluation_queue)
@@ -5,62 +5,102 @@ from ragas.llms import LangchainLLMWrapper
 from ragas.embeddings.base import LangchainEmbeddingsWrapper
 from datasets import Dataset
 import os
+import sys
+import json
 import time
+import threading
 from dotenv import load_dotenv
 from src.logger import logger
 
 load_dotenv()
 google_api_key = os.getenv("GOOGLE_API_KEY")
+# Samples per ragas.evaluate call in batch mode
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", 32))
 
 
-def evaluate_llm_response(user_prompt, context_docs, llm_answer):
-    gemini_llm = ChatGoogleGenerativeAI(
-        model='gemini-1.5-flash',
-        temperature=0.1,
-        google_api_key=google_api_key,
-        max_retries=3,
-        request_timeout=60,
-        max_tokens_per_minute=30000,
-        max_requests_per_minute=15
-    )
-
-    gemini_embeddings = GoogleGenerativeAIEmbeddings(
-        model="models/text-embedding-004",
-        google_api_key=google_api_key,
-        task_type="retrieval_document"
-    )
-
-    evaluator_llm = LangchainLLMWrapper(gemini_llm)
-    evaluator_embeddings = LangchainEmbeddingsWrapper(gemini_embeddings)
-
-    sample_data = {
-        "user_input": user_prompt,
-        "retrieved_contexts": context_docs,
-        "response": llm_answer
-    }
+class EvaluatorRuntime:
+    """
+    Holds the RAGAS evaluator LLM, embeddings and metric objects.
+    They are built on first use and reused for every evaluation, and samples are scored in batches.
+    """
 
-    evaluation_data = Dataset.from_list([sample_data])
+    def __init__(self):
+        self.evaluator_llm = None
+        self.evaluator_embeddings = None
+        self.metrics = None
+        self._lock = threading.Lock()
 
-    metrics = [
-        Faithfulness(llm=evaluator_llm),
-        ResponseRelevancy(llm=evaluator_llm, embeddings=evaluator_embeddings),
-        LLMContextPrecisionWithoutReference(llm=evaluator_llm)
-    ]
+    def _build(self):
+        with self._lock:
+            if self.metrics is not None:
+                return
+            gemini_llm = ChatGoogleGenerativeAI(
+                model='gemini-1.5-flash',
+                temperature=0.1,
+                google_api_key=google_api_key,
+                max_retries=3,
+                request_timeout=60,
+                max_tokens_per_minute=30000,
+                max_requests_per_minute=15
+            )
 
-    try:
-        results = evaluate(
+            gemini_embeddings = GoogleGenerativeAIEmbeddings(
+                model="models/text-embedding-004",
+                google_api_key=google_api_key,
+                task_type="retrieval_document"
+            )
+
+            self.evaluator_llm = LangchainLLMWrapper(gemini_llm)
+            self.evaluator_embeddings = LangchainEmbeddingsWrapper(gemini_embeddings)
+            self.metrics = [
+                Faithfulness(llm=self.evaluator_llm),
+                ResponseRelevancy(llm=self.evaluator_llm, embeddings=self.evaluator_embeddings),
+                LLMContextPrecisionWithoutReference(llm=self.evaluator_llm)
+            ]
+            logger.info("RAGAS evaluator runtime initialized")
+
+    def evaluate(self, samples, raise_exceptions=False):
+        """
+        Scores many (query, contexts, answer) triples with a single ragas.evaluate call.
+
+        Returns:
+            EvaluationResult: One row per sample, in input order.
+        """
+        self._build()
+        evaluation_data = Dataset.from_list([
+            {
+                "user_input": user_prompt,
+                "retrieved_contexts": context_docs,
+                "response": llm_answer
+            }
+            for user_prompt, context_docs, llm_answer in samples
+        ])
+        return evaluate(
             dataset=evaluation_data,
-            metrics=metrics,
-            llm=evaluator_llm,
-            embeddings=evaluator_embeddings,
-            raise_exceptions=False
+            metrics=self.metrics,
+            llm=self.evaluator_llm,
+            embeddings=self.evaluator_embeddings,
+            raise_exceptions=raise_exceptions
         )
-        return results
+
+
+evaluator_runtime = EvaluatorRuntime()
+
+
+def evaluate_llm_response(user_prompt, context_docs, llm_answer, raise_exceptions=False):
+    try:
+        return evaluator_runtime.evaluate([(user_prompt, context_docs, llm_answer)], raise_exceptions=raise_exceptions)
     except Exception as retry_error:
         logger.error(f"Evaluation failed: {retry_error}")
+        if raise_exceptions:
+            raise
         return None
 
 
+def is_rate_limit_error(error):
+    return "429" in str(error) or "ResourceExhausted" in str(error)
+
+
 def evaluate_with_backoff( user_prompt, context_docs, llm_answer, max_retries=3):
     for attempt in range(max_retries):
         try:
@@ -69,7 +109,7 @@ def evaluate_with_backoff( user_prompt, context_docs, llm_answer, max_retries=3)
             if results is not None:
                 return results
         except Exception as e:
-            if "429" in str(e) or "ResourceExhausted" in str(e):
+            if is_rate_limit_error(e):
                 wait_time = (2 ** attempt) * 10
                 logger.warning(f"Rate limited. Waiting {wait_time} seconds before retry...")
                 time.sleep(wait_time)
@@ -79,22 +119,43 @@ def evaluate_with_backoff( user_prompt, context_docs, llm_answer, max_retries=3)
     return None
 
 
+def to_context_docs(context_text):
+    # RAGAS expects context as a list of documents
+    return context_text.split("\n\n") if isinstance(context_text, str) else context_text
+
+
+def format_row(results_dict):
+    return {
+        "Faithfulness": round(results_dict.get("faithfulness", 0.0), 4),
+        "Response Relevancy": round(results_dict.get("response_relevancy", 0.0), 4),
+        "Context_precision": round(results_dict.get("llm_context_precision_without_reference", 0.0), 4)
+    }
+
+
+def format_scores(scores):
+    return format_row(scores.to_pandas().iloc[0].to_dict())
+
+
+def run_evaluation_job(user_prompt, context_text, llm_answer):
+    """
+    Job body for the background evaluation workers (src/eval/eval_queue.py).
+    Errors are raised rather than slept on, so the queue can reschedule rate-limited jobs.
+    """
+    scores = evaluate_llm_response(user_prompt, to_context_docs(context_text), llm_answer, raise_exceptions=True)
+    formatted = format_scores(scores)
+    logger.info(f"LLM evaluation scores: {formatted}")
+    return formatted
+
+
 def run_llm_evaluation( user_prompt, context_text, llm_answer):
     """
     Wrapper to be called from chatbot: evaluates LLM output using RAGAS metrics.
     """
-    # RAGAS expects context as a list of documents
-    context_docs = context_text.split("\n\n") if isinstance(context_text, str) else context_text
-    scores = evaluate_with_backoff( user_prompt, context_docs, llm_answer)
+    scores = evaluate_with_backoff( user_prompt, to_context_docs(context_text), llm_answer)
 
     if scores is not None:
         try:
-            results_dict = scores.to_pandas().iloc[0].to_dict()
-            formatted = {
-                "Faithfulness": round(results_dict.get("faithfulness", 0.0), 4),
-                "Response Relevancy": round(results_dict.get("response_relevancy", 0.0), 4),
-                "Context_precision": round(results_dict.get("llm_context_precision_without_reference", 0.0), 4)
-            }
+            formatted = format_scores(scores)
             logger.info(f"LLM evaluation scores: {formatted}")
             return formatted
         except Exception as e:
@@ -103,3 +164,48 @@ def run_llm_evaluation( user_prompt, context_text, llm_answer):
     else:
         logger.warning("Evaluation failed after retries.")
         return None
+
+
+def run_batch_evaluation(samples, batch_size=EVAL_BATCH_SIZE, max_retries=3):
+    """
+    Evaluates (query, context, answer) triples in batches, e.g. for nightly scoring of logged answers.
+
+    Returns:
+        list: Formatted scores per sample in input order, None where a batch failed.
+    """
+    formatted = []
+    for start in range(0, len(samples), batch_size):
+        batch = [(query, to_context_docs(context), answer) for query, context, answer in samples[start:start + batch_size]]
+        scores = None
+        for attempt in range(max_retries):
+            try:
+                scores = evaluator_runtime.evaluate(batch)
+                break
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    logger.error(f"Batch evaluation failed: {e}")
+                    break
+                wait_time = (2 ** attempt) * 10
+                logger.warning(f"Rate limited. Waiting {wait_time} seconds before retry...")
+                time.sleep(wait_time)
+
+        if scores is None:
+            formatted.extend([None] * len(batch))
+        else:
+            formatted.extend(format_row(row) for row in scores.to_pandas().to_dict(orient="records"))
+        logger.info(f"Evaluated {min(start + batch_size, len(samples))}/{len(samples)} samples")
+    return formatted
+
+
+if __name__ == "__main__":
+    # Scores a JSONL file of logged answers: {"query": ..., "context": ..., "answer": ...} per line
+    input_path, output_path = sys.argv[1], sys.argv[2]
+    with open(input_path, "r", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+
+    results = run_batch_evaluation([(r["query"], r["context"], r["answer"]) for r in records])
+
+    with open(output_path, "w", encoding="utf-8") as file:
+        for record, scores in zip(records, results):
+            file.write(json.dumps({**record, "evaluation_scores": scores}) + "\n")
+    print(f"Evaluated {len(records)} answers, results written to {output_path}")
@@ -0,0 +1,87 @@
+"""
+Load test for the /chat endpoint.
+
+Fires the same set of legal queries at a running API with an increasing number of
+concurrent clients and reports throughput and latency for each level, so we can check
+that one uvicorn worker keeps scaling while chats are in flight.
+
+Queries repeat across requests, so they bypass the semantic answer cache unless --use-cache
+is given; otherwise every request after the first few would be a cache hit.
+
+Usage:
+    python load_test.py --url http://localhost:8000/chat --clients 1 4 16 32 --requests 64
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+QUERIES = [
+    "What is the punishment for theft under IPC?",
+    "What is the POCSO act?",
+    "How do I file a consumer complaint for a defective product?",
+    "What are the grounds for divorce under the Hindu Marriage Act?",
+    "What is the procedure for filing a civil case?",
+    "When can the police arrest without a warrant?",
+]
+
+
+def send_chat(url, query, timeout, bypass_cache=True):
+    """
+    Returns:
+        tuple: (status code, latency in seconds)
+    """
+    start = time.perf_counter()
+    try:
+        response = requests.post(url, json={"query": query, "bypass_cache": bypass_cache}, timeout=timeout)
+        status = response.status_code
+    except requests.RequestException:
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run_level(url, clients, total_requests, timeout, bypass_cache=True):
+    """Runs total_requests chats with `clients` concurrent callers."""
+    queries = [QUERIES[i % len(QUERIES)] for i in range(total_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda q: send_chat(url, q, timeout, bypass_cache), queries))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    failures = sum(1 for status, _ in results if status != 200)
+    return {
+        "clients": clients,
+        "ok": len(latencies),
+        "failed": failures,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /chat endpoint")
+    parser.add_argument("--url", default="http://localhost:8000/chat")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--use-cache", action="store_true", help="Let repeated queries hit the semantic answer cache")
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'ok':>5} {'failed':>7} {'req/s':>8} {'p50 (s)':>9} {'p95 (s)':>9}")
+    baseline = None
+    for clients in args.clients:
+        stats = run_level(args.url, clients, max(args.requests, clients), args.timeout, not args.use_cache)
+        baseline = baseline or stats["throughput"]
+        speedup = stats["throughput"] / baseline if baseline else 0.0
+        print(
+            f"{stats['clients']:>8} {stats['ok']:>5} {stats['failed']:>7} {stats['throughput']:>8.2f} "
+            f"{stats['p50']:>9.2f} {stats['p95']:>9.2f}   x{speedup:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,84 @@
 import os
 import sys
+import json
+import uuid
+import asyncio
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from src.processing_db.vectordb_setup import initialize_pinecone, search_documents
+from typing import Optional
+from src.processing_db.vectordb_setup import vector_backend, reranker, asearch_documents
 from src.exception import CustomException
 from src.logger import logger
 from src.utils import *
-from LLM_setup.llm_call import generate_chatbot_response, parse_gemini_response, extract_token_usage, evaluate_llm_output
+from src.eval.eval_queue import evaluation_queue, evaluation_workers
+from src.LLM_setup.LLM_initialization import model_registry
+from src.LLM_setup.prompt_cache import prompt_cache
+from src.processing_db.embedding_cache import embedding_cache
+from src.processing_db.retrieval_cache import retrieval_cache
+from src.processing_db.gemini_embed import gemini_embeddings
+from src.semantic_cache import semantic_cache
+from src.chat_history_manager import history_store
+from src.processing_db.citation_resolver import citation_resolver
+from LLM_setup.llm_call import agenerate_chatbot_response, astream_chatbot_response, asummarize_history, parse_gemini_response, extract_token_usage, aevaluate_llm_output
 
 app = FastAPI(title="Pinecone RAG API", version="1.0")
 
-try:
-    pinecone_client = initialize_pinecone()
-    logger.info("Pinecone initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize Pinecone: {str(e)}")
-    sys.exit(1)
+# Upper bound on chats in flight per worker; extra requests wait up to CHAT_QUEUE_TIMEOUT seconds for a slot
+MAX_CONCURRENT_CHATS = int(os.getenv("MAX_CONCURRENT_CHATS", 32))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", 30))
+chat_limiter = asyncio.Semaphore(MAX_CONCURRENT_CHATS)
+
+
+@app.on_event("startup")
+def connect_vector_store():
+    """Open the configured vector store once, before the first request."""
+    try:
+        vector_backend.connect()
+        logger.info(f"Vector store '{vector_backend.name}' initialized successfully.")
+    except Exception as e:
+        logger.error(f"Failed to initialize vector store '{vector_backend.name}': {str(e)}")
+        sys.exit(1)
+
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Create the shared Gemini clients before the first request instead of during it."""
+    await model_registry.awarm_up()
+
+
+@app.on_event("startup")
+async def load_reranker():
+    """Load the local cross-encoder (a few hundred MB) at startup rather than inside the first chat."""
+    try:
+        await asyncio.to_thread(reranker.warm_up)
+    except Exception as e:
+        logger.error(f"Failed to load reranker '{reranker.name}': {str(e)}")
+        sys.exit(1)
+
+
+@app.on_event("startup")
+async def build_citation_index():
+    """Load the act/section index used to resolve citations like "IPC 420" without retrieval."""
+    await asyncio.to_thread(citation_resolver.load)
+
+
+@app.on_event("startup")
+def start_evaluation_workers():
+    evaluation_workers.start()
+
+
+@app.on_event("shutdown")
+def stop_evaluation_workers():
+    evaluation_workers.stop()
+
+
+@app.on_event("startup")
+async def size_thread_pool():
+    """Blocking Pinecone and RAGAS calls run in the default executor, so give it room for every chat slot."""
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CHATS * 2))
 
 
 # Request Model for retreiving user's query
@@ -28,10 +90,10 @@ class SearchRequest(BaseModel):
 @app.post("/search")
 async def search_similar_documents(request: SearchRequest):
     """
-        list: Top-k matched documents with metadata.
+        list: Reranked documents with their ids, vector and rerank scores and metadata.
     """
     try:
-        results = search_documents(request.query, initial_k=request.top_k)
+        results = await asearch_documents(request.query, initial_k=request.top_k)
         logger.info(f"Retrieved {len(results)} documents for query: '{request.query}'")
 
         if not results:
@@ -40,6 +102,9 @@ async def search_similar_documents(request: SearchRequest):
         return [
             {
                 "rank": i + 1,
+                "id": doc.metadata.get("id"),
+                "vector_score": doc.metadata.get("vector_score"),
+                "rerank_score": doc.metadata.get("rerank_score"),
                 "content": doc.page_content.strip(),  
                 "metadata": doc.metadata,
             }
@@ -54,39 +119,196 @@ async def search_similar_documents(request: SearchRequest):
 # Chatbot endpoint
 class ChatRequest(BaseModel):
     query: str
+    # Conversation to continue; a new one is started when omitted
+    session_id: Optional[str] = None
+    # Skip the semantic answer cache and always generate a fresh answer
+    bypass_cache: bool = False
+
+
+async def find_cached_answer(request: ChatRequest, session_id: str):
+    """
+    Looks up a semantically similar earlier query for the opening turn of a conversation.
+
+    Returns:
+        tuple: (cached answer or None, query embedding to cache a fresh answer under, or None if not cacheable)
+    """
+    if semantic_cache is None or request.bypass_cache:
+        return None, None
+    history = history_store.session(session_id)
+    if history.get() or history.get_summary():
+        return None, None
+    try:
+        embedding = await gemini_embeddings.aembed_query(request.query)
+    except Exception as e:
+        logger.warning(f"Semantic cache lookup skipped, query embedding failed: {str(e)}")
+        return None, None
+
+    hit = semantic_cache.get(embedding)
+    if hit is None:
+        return None, embedding
+    answer, matched_query, similarity = hit
+    logger.info(f"Semantic cache hit for query: '{request.query}' (matched '{matched_query}', similarity {similarity:.3f})")
+    # Later turns of this conversation still see the cached exchange
+    history.add(request.query, answer["response"])
+    return answer, embedding
+
+
+def cache_answer(query: str, embedding, parsed: dict, response, relevant_chunks, evaluation_id: str):
+    answer = parsed["answer"].strip()
+    # An empty answer or the <additional> "not enough information" fallback would be served to every similar query
+    if embedding is None or not answer or "<additional>" in answer.lower():
+        return
+    semantic_cache.put(query, embedding, {
+        "inner_monologue": parsed["inner_monologue"],
+        "answer": parsed["answer"],
+        "response": getattr(response, "content", str(response)),
+        "relevant_chunks": relevant_chunks,
+        "evaluation_id": evaluation_id,
+    })
+
+
+def cached_chat_response(query: str, session_id: str, cached: dict) -> dict:
+    return {
+        "session_id": session_id,
+        "query": query,
+        "inner_monologue": cached["inner_monologue"],
+        "answer": cached["answer"],
+        "Input tokens": 0,
+        "Cached input tokens": 0,
+        "Output tokens": 0,
+        "Total tokens": 0,
+        "Relevant chunks": cached["relevant_chunks"],
+        "Evaluation id": cached["evaluation_id"],
+        "Cached": True
+    }
+
 
 @app.post("/chat")
-async def chat_with_legal_bot(request: ChatRequest):
+async def chat_with_legal_bot(request: ChatRequest, background_tasks: BackgroundTasks):
     """
-    Accepts a legal query, runs LLM, and returns parsed answer + inner monologue + token info + evaluation.
+    Accepts a legal query, runs LLM, and returns parsed answer + inner monologue + token info.
+    Evaluation is queued in the background; poll GET /evaluate/{evaluation_id} for the scores.
+    Paraphrases of earlier opening queries are answered from the semantic cache.
     """
+    session_id = request.session_id or uuid.uuid4().hex
+    cached, query_embedding = await find_cached_answer(request, session_id)
+    if cached is not None:
+        return cached_chat_response(request.query, session_id, cached)
+
+    try:
+        await asyncio.wait_for(chat_limiter.acquire(), timeout=CHAT_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Chat limiter saturated, rejecting query: {request.query}")
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly")
+
     try:
-        relevant_chunks, response = generate_chatbot_response(request.query)
+        relevant_chunks, response = await agenerate_chatbot_response(request.query, session_id)
         parsed = parse_gemini_response(response)
         token_info = extract_token_usage(response)
 
-        eval_scores = evaluate_llm_output(
-            query=request.query,
-            context=relevant_chunks,
-            llm_answer=parsed["answer"]
+        evaluation_id = await asyncio.to_thread(
+            evaluation_queue.enqueue,
+            request.query,
+            relevant_chunks,
+            parsed["answer"]
         )
-
-        logger.info(f"Evaluation results for query: {request.query} => {eval_scores}")
+        cache_answer(request.query, query_embedding, parsed, response, relevant_chunks, evaluation_id)
+        # Runs after the response is sent, so summarization never delays an answer
+        background_tasks.add_task(asummarize_history, session_id)
 
         return {
+            "session_id": session_id,
             "query": request.query,
             "inner_monologue": parsed["inner_monologue"],
             "answer": parsed["answer"],
             "Input tokens": token_info["input_tokens"],
+            "Cached input tokens": token_info["cached_input_tokens"],
             "Output tokens": token_info["output_tokens"],
             "Total tokens": token_info["total_tokens"],
             "Relevant chunks": relevant_chunks,
-            "Evaluation scores": eval_scores
+            "Evaluation id": evaluation_id,
+            "Cached": False
         }
 
     except CustomException as e:
         logger.error(f"Error while generating response for query: {request.query} | {str(e)}")
         raise HTTPException(status_code=500, detail="Error during chatbot response generation")
+    finally:
+        chat_limiter.release()
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def stream_chat_with_legal_bot(request: ChatRequest, background_tasks: BackgroundTasks):
+    """
+    Streams the answer as server-sent events:
+    - "answer" events carry answer tokens as soon as <answer> opens
+    - a final "done" event carries the inner monologue, token info and evaluation id
+    - an "error" event is sent if generation fails mid-stream
+    """
+    session_id = request.session_id or uuid.uuid4().hex
+    # Runs after the stream completes
+    background_tasks.add_task(asummarize_history, session_id)
+
+    async def event_stream():
+        cached, query_embedding = await find_cached_answer(request, session_id)
+        if cached is not None:
+            yield sse_event("session", {"session_id": session_id})
+            yield sse_event("answer", {"text": cached["answer"]})
+            yield sse_event("done", cached_chat_response(request.query, session_id, cached))
+            return
+
+        try:
+            await asyncio.wait_for(chat_limiter.acquire(), timeout=CHAT_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Chat limiter saturated, rejecting query: {request.query}")
+            yield sse_event("error", {"detail": "Server is busy, please retry shortly"})
+            return
+
+        try:
+            yield sse_event("session", {"session_id": session_id})
+            async for section, payload in astream_chatbot_response(request.query, session_id):
+                if section == "answer":
+                    yield sse_event("answer", {"text": payload})
+                elif section == "done":
+                    token_info = extract_token_usage(payload["response"])
+                    evaluation_id = await asyncio.to_thread(
+                        evaluation_queue.enqueue,
+                        request.query,
+                        payload["relevant_chunks"],
+                        payload["parsed"]["answer"]
+                    )
+                    cache_answer(
+                        request.query, query_embedding, payload["parsed"], payload["response"],
+                        payload["relevant_chunks"], evaluation_id
+                    )
+                    yield sse_event("done", {
+                        "session_id": session_id,
+                        "query": request.query,
+                        "inner_monologue": payload["parsed"]["inner_monologue"],
+                        "answer": payload["parsed"]["answer"],
+                        "Input tokens": token_info["input_tokens"],
+                        "Cached input tokens": token_info["cached_input_tokens"],
+                        "Output tokens": token_info["output_tokens"],
+                        "Total tokens": token_info["total_tokens"],
+                        "Relevant chunks": payload["relevant_chunks"],
+                        "Evaluation id": evaluation_id,
+                        "Cached": False
+                    })
+        except CustomException as e:
+            logger.error(f"Error while streaming response for query: {request.query} | {str(e)}")
+            yield sse_event("error", {"detail": "Error during chatbot response generation"})
+        finally:
+            chat_limiter.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Evaluation Request Model
 class EvaluationRequest(BaseModel):
@@ -100,7 +322,7 @@ async def evaluate_response(request: EvaluationRequest):
     Evaluate the chatbot's answer for a given query and context.
     """
     try:
-        scores = evaluate_llm_output(request.query, request.context, request.llm_answer)
+        scores = await aevaluate_llm_output(request.query, request.context, request.llm_answer)
         return {
             "query": request.query,
             "evaluation_scores": scores
@@ -110,9 +332,35 @@ async def evaluate_response(request: EvaluationRequest):
         raise HTTPException(status_code=500, detail="Evaluation error")
 
 
+@app.get("/evaluate/{evaluation_id}")
+async def get_evaluation(evaluation_id: str):
+    """
+    Returns the status of a queued evaluation and its scores once done.
+    """
+    result = await asyncio.to_thread(evaluation_queue.get, evaluation_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    return result
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Cache statistics for this worker."""
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "retrieval_cache": retrieval_cache.stats() if retrieval_cache else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache else None,
+        "prompt_cache": prompt_cache.stats(),
+    }
+
+
 @app.get("/")
 async def health_check():
-    return {"status": "ok", "message": "RAG API is running"}
+    return {
+        "status": "ok",
+        "message": "RAG API is running",
+        "vector_store": "ok" if await asyncio.to_thread(vector_backend.health_check) else "unavailable"
+    }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,185 @@
+"""
+Citation resolver
+
+Detects direct citations such as "IPC 420", "Section 125 CrPC", "u/s 498A of the IPC" or
+"Article 21" and looks them up in an in-memory act -> section -> Document index built once
+from IndiaLaw.db and constitution_of_india.json.
+
+search_documents puts resolved provisions first. When the query is nothing but citations
+("section 302 ipc", "what is article 21"), it returns them directly, without vector retrieval
+or reranking.
+"""
+
+import os
+import re
+import sys
+import json
+import threading
+from langchain.schema import Document
+from src.exception import CustomException
+from src.logger import logger
+from src.processing_db.db_reader import DatabaseManager
+from src.processing_db.source_documents import row_to_document, table_chunk_id, item_to_document, item_chunk_id
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data source")
+CITATION_DB_PATH = os.getenv("CITATION_DB_PATH", os.path.join(DATA_DIR, "IndiaLaw.db"))
+CONSTITUTION_PATH = os.getenv("CONSTITUTION_PATH", os.path.join(DATA_DIR, "constitution_of_india.json"))
+CITATION_FAST_PATH = os.getenv("CITATION_FAST_PATH", "true").lower() == "true"
+# Source name the constitution is ingested under (json_in_vdb derives it from the file name)
+CONSTITUTION_SOURCE = "json:constitution_of_india"
+
+# Ways users name each act; matched after dots are stripped ("Cr.P.C." -> "crpc")
+ACT_ALIASES = {
+    "IPC": ["ipc", "indian penal code", "penal code"],
+    "CRPC": ["crpc", "cr pc", "code of criminal procedure", "criminal procedure code"],
+    "CPC": ["cpc", "code of civil procedure", "civil procedure code"],
+    "IEA": ["iea", "indian evidence act", "evidence act"],
+    "HMA": ["hma", "hindu marriage act"],
+    "IDA": ["ida", "indian divorce act", "divorce act"],
+    "MVA": ["mva", "mv act", "motor vehicles act", "motor vehicle act"],
+    "NIA": ["nia", "ni act", "negotiable instruments act", "negotiable instrument act"],
+}
+ALIAS_TO_ACT = {alias: act for act, aliases in ACT_ALIASES.items() for alias in aliases}
+
+_ACT = "(" + "|".join(re.escape(alias) for alias in sorted(ALIAS_TO_ACT, key=len, reverse=True)) + ")"
+_NUMBER = r"(\d+[a-z]{0,2})\b"
+_SECTION = r"(?:sections?|sec|s|u/s)"
+SECTION_FIRST = re.compile(rf"\b{_SECTION}\s*{_NUMBER}\s*(?:of\s+)?(?:the\s+)?{_ACT}\b")
+ACT_FIRST = re.compile(rf"\b{_ACT}\s*,?\s*(?:{_SECTION}\s*)?{_NUMBER}")
+ARTICLE = re.compile(rf"\b(?:article|art)\s*{_NUMBER}")
+
+# Words that may surround a bare citation lookup without asking anything more
+FILLER_WORDS = {
+    "what", "whats", "is", "are", "the", "of", "a", "an", "in", "under", "section", "sections", "article",
+    "explain", "text", "define", "show", "me", "tell", "about", "give", "provision", "provisions", "read",
+    "full", "please", "say", "says", "does", "meaning", "indian", "constitution", "india", "act", "code", "and",
+}
+
+
+def normalize_citation_query(query):
+    query = query.lower()
+    # "Cr.P.C." -> "crpc", "s. 302" -> "s 302"
+    query = re.sub(r"(?<=[a-z])\.(?=[a-z])", "", query)
+    return re.sub(r"[^\w/]+", " ", query).strip()
+
+
+def normalize_number(number):
+    return str(number).strip().upper()
+
+
+class CitationResolver:
+
+    def __init__(self, db_path=CITATION_DB_PATH, constitution_path=CONSTITUTION_PATH):
+        self.db_path = db_path
+        self.constitution_path = constitution_path
+        # act -> section number -> Document; articles live under "CONSTITUTION"
+        self._index = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Builds the index once; missing sources are skipped with a warning."""
+        if self._index is not None:
+            return self._index
+        with self._lock:
+            if self._index is None:
+                self._index = self._build()
+        return self._index
+
+    def _build(self):
+        index = {}
+        try:
+            if os.path.exists(self.db_path):
+                db = DatabaseManager(self.db_path)
+                for table in db.get_all_tables():
+                    sections = index.setdefault(table.upper(), {})
+                    for row in db.iter_rows(table):
+                        document = row_to_document(table, row)
+                        number = next((value for key, value in row.items() if key.lower() == "section"), None)
+                        if document is None or number is None:
+                            continue
+                        document.metadata["id"] = table_chunk_id(table, document)
+                        sections[normalize_number(number)] = document
+            else:
+                logger.warning(f"Citation resolver: {self.db_path} not found, acts won't be resolved")
+
+            if os.path.exists(self.constitution_path):
+                with open(self.constitution_path, "r", encoding="utf-8") as file:
+                    items = json.load(file)
+                articles = index.setdefault("CONSTITUTION", {})
+                for item in items:
+                    document = item_to_document(item)
+                    if document is None:
+                        continue
+                    document.metadata["id"] = item_chunk_id(CONSTITUTION_SOURCE, document)
+                    articles[normalize_number(item.get("article"))] = document
+            else:
+                logger.warning(f"Citation resolver: {self.constitution_path} not found, articles won't be resolved")
+
+            logger.info(f"Citation index built: {', '.join(f'{act} ({len(rows)})' for act, rows in index.items())}")
+            return index
+        except Exception as e:
+            logger.error(f"Error building citation index: {str(e)}")
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def find(query):
+        """
+        Returns:
+            tuple: ([(act, number)] cited in the query, the query with the citations removed)
+        """
+        text = normalize_citation_query(query)
+        citations = []
+
+        def collect(pattern, act_group, number_group):
+            def replace(match):
+                act = ALIAS_TO_ACT[match.group(act_group)] if act_group else "CONSTITUTION"
+                citations.append((act, normalize_number(match.group(number_group))))
+                return " "
+            return pattern.sub(replace, text)
+
+        text = collect(SECTION_FIRST, 2, 1)
+        text = collect(ACT_FIRST, 1, 2)
+        text = collect(ARTICLE, None, 1)
+        return list(dict.fromkeys(citations)), text
+
+    def resolve(self, query):
+        """
+        Returns:
+            tuple: (Documents of the cited provisions in query order,
+                    True if the query asks for nothing beyond provisions that all resolved)
+        """
+        if not CITATION_FAST_PATH:
+            return [], False
+        citations, remainder = self.find(query)
+        if not citations:
+            return [], False
+
+        index = self.load()
+        documents = []
+        for act, number in citations:
+            document = index.get(act, {}).get(number)
+            if document is not None:
+                # Copies, so callers can annotate metadata without touching the index
+                metadata = {**document.metadata, "citation": f"Article {number}" if act == "CONSTITUTION" else f"{act} {number}"}
+                documents.append(Document(page_content=document.page_content, metadata=metadata))
+
+        leftover = [word for word in remainder.split() if word not in FILLER_WORDS]
+        exact = bool(documents) and len(documents) == len(citations) and not leftover
+        if documents:
+            logger.info(f"Resolved citations {[doc.metadata['citation'] for doc in documents]} (exact: {exact})")
+        return documents, exact
+
+
+def with_citations(citations, results, final_k):
+    """
+    Returns:
+        list: Cited provisions first, then retrieved documents not already cited, up to final_k in total.
+    """
+    if not citations:
+        return results
+    cited_ids = {doc.metadata["id"] for doc in citations}
+    remaining = max(0, final_k - len(citations))
+    return citations + [doc for doc in results if doc.metadata.get("id") not in cited_ids][:remaining]
+
+
+citation_resolver = CitationResolver()
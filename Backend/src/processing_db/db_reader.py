@@ -1,8 +1,12 @@
+import os
 import sqlite3
 import sys
 from src.exception import CustomException
 from src.logger import logger
 
+# Rows per keyset page of a streaming read
+DB_READ_BATCH_SIZE = int(os.getenv("DB_READ_BATCH_SIZE", 500))
+
 class DatabaseManager:
     
     def __init__(self, db_path):
@@ -42,12 +46,36 @@ class DatabaseManager:
             logger.error(f"Error executing query: {query} - {str(e)}")
             raise CustomException(e, sys)
     
+    def _open(self):
+        """Read-only connection owned by a single streaming read, so shards can run in parallel threads"""
+        try:
+            return sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        except sqlite3.Error as e:
+            logger.error(f"Error connecting to database: {str(e)}")
+            raise CustomException(e, sys)
+
+    def validate_table(self, table_name):
+        """Check the table exists and return it quoted for use as an identifier"""
+        conn = self._open()
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?;", (table_name,)
+            ).fetchone()
+            if not exists:
+                raise ValueError(f"Unknown table '{table_name}'")
+            return '"' + table_name.replace('"', '""') + '"'
+        except ValueError as e:
+            logger.error(f"Invalid table name: {str(e)}")
+            raise CustomException(e, sys)
+        finally:
+            conn.close()
+    
     def get_table_columns(self, table_name):
         """Get columns for a specific table"""
+        table = self.validate_table(table_name)
         try:
             self.connect()
-            query = f"PRAGMA table_info({table_name});"
-            results = self.execute_query(query)
+            results = self.execute_query(f"PRAGMA table_info({table});")
             columns = [col[1] for col in results]
             logger.info(f"Retrieved columns for table '{table_name}'")
             return columns
@@ -65,28 +93,81 @@ class DatabaseManager:
             return tables
         finally:
             self.disconnect()
-    
-    def fetch_table_data(self, table_name, limit=10):
-        """Fetch data from a specific table with optional limit"""
+
+    def count_rows(self, table_name):
+        """Count the rows of a specific table"""
+        table = self.validate_table(table_name)
         try:
             self.connect()
-            columns = self.get_table_columns(table_name)
-            
-            # Reconnect since the previous method disconnected
-            self.connect()
-            query = f"SELECT * FROM {table_name} LIMIT {limit};"
-            rows = self.execute_query(query)
-            
-            formatted_data = []
-            for row in rows:
-                formatted_row = {columns[i]: row[i] for i in range(len(columns))}
-                formatted_data.append(formatted_row)
-            
-            logger.info(f"Retrieved {len(formatted_data)} rows from table '{table_name}'")
-            return formatted_data
+            return self.execute_query(f"SELECT COUNT(*) FROM {table};")[0][0]
         finally:
             self.disconnect()
 
+    def iter_batches(self, table_name, batch_size=DB_READ_BATCH_SIZE, start_rowid=None, end_rowid=None):
+        """
+        Stream a table as lists of row dicts, paging by rowid over one open connection.
+        Only rows with start_rowid < rowid <= end_rowid are read when bounds are given.
+        """
+        table = self.validate_table(table_name)
+        conn = self._open()
+        try:
+            last_rowid = start_rowid if start_rowid is not None else -1
+            upper = "AND rowid <= ?" if end_rowid is not None else ""
+            while True:
+                params = (last_rowid, end_rowid, batch_size) if end_rowid is not None else (last_rowid, batch_size)
+                cursor = conn.execute(
+                    f"SELECT rowid, * FROM {table} WHERE rowid > ? {upper} ORDER BY rowid LIMIT ?;", params
+                )
+                columns = [column[0] for column in cursor.description[1:]]
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                last_rowid = rows[-1][0]
+                yield [dict(zip(columns, row[1:])) for row in rows]
+                if len(rows) < batch_size:
+                    return
+        except sqlite3.Error as e:
+            logger.error(f"Error streaming table '{table_name}': {str(e)}")
+            raise CustomException(e, sys)
+        finally:
+            conn.close()
+
+    def iter_rows(self, table_name, batch_size=DB_READ_BATCH_SIZE, start_rowid=None, end_rowid=None):
+        """Stream a table row by row as dicts"""
+        for batch in self.iter_batches(table_name, batch_size, start_rowid, end_rowid):
+            yield from batch
+
+    def shard_ranges(self, table_name, shards):
+        """
+        Split a table's rowid range into contiguous shards for parallel reads.
+
+        Returns:
+            list: (start_rowid, end_rowid) bounds for iter_rows, start exclusive and end inclusive.
+        """
+        table = self.validate_table(table_name)
+        conn = self._open()
+        try:
+            low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table};").fetchone()
+        finally:
+            conn.close()
+        if low is None:
+            return [(None, None)]
+        shards = max(1, min(shards, high - low + 1))
+        step = (high - low + 1) / shards
+        bounds = [low - 1 + round(step * i) for i in range(shards + 1)]
+        return [(bounds[i], bounds[i + 1]) for i in range(shards)]
+    
+    def fetch_table_data(self, table_name, limit=10):
+        """Fetch data from a specific table with optional limit"""
+        formatted_data = []
+        for batch in self.iter_batches(table_name, batch_size=min(limit, DB_READ_BATCH_SIZE)):
+            formatted_data.extend(batch[:limit - len(formatted_data)])
+            if len(formatted_data) >= limit:
+                break
+        
+        logger.info(f"Retrieved {len(formatted_data)} rows from table '{table_name}'")
+        return formatted_data
+
 # def main():
 #     DB_PATH = "data source/IndiaLaw.db" 
 #     db_manager = DatabaseManager(DB_PATH)
@@ -132,5 +213,6 @@ Available tables in the database:
 8. MVA
 """
 
-DB_PATH = "data source/IndiaLaw.db" 
+# Anchored to this package, so the API (run from src/) and ingestion (run from Backend/) open the same file
+DB_PATH = os.getenv("INDIA_LAW_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data source", "IndiaLaw.db"))
 db_manager = DatabaseManager(DB_PATH)
\ No newline at end of file
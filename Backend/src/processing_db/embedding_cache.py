@@ -0,0 +1,172 @@
+"""
+Persistent content-addressed embedding cache
+
+Embeddings are keyed by sha256(model name, task type, text) and stored in a local SQLite
+file as float32 blobs, so re-ingesting unchanged documents, re-chunking the same PDF and
+repeated user queries don't call Gemini again. The least recently used entries are evicted
+once the cache grows past max_entries.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from src.exception import CustomException
+from src import ARTIFACTS_DIR
+from src.logger import logger
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(ARTIFACTS_DIR, "embedding_cache.db"))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 500000))
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK_SIZE = 500
+# Access times of hits are buffered and written at most this often (seconds) or once this many are pending,
+# so cache hits don't each commit a write
+ACCESS_FLUSH_INTERVAL = 30
+ACCESS_FLUSH_SIZE = 1000
+
+
+class EmbeddingCache:
+
+    def __init__(self, db_path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        try:
+            self.db_path = db_path
+            self.max_entries = max_entries
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    task_type TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL
+                );
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access);")
+            self._conn.commit()
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings;").fetchone()[0]
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            # key -> last access time not yet written
+            self._pending_access = {}
+            self._last_flush = time.monotonic()
+            logger.info(f"Embedding cache opened at {db_path} with {self._entries} entries")
+        except sqlite3.Error as e:
+            logger.error(f"Error opening embedding cache: {str(e)}")
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def make_key(model, task_type, text):
+        return hashlib.sha256(f"{model}\x1f{task_type}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model, task_type, texts):
+        """
+        Returns:
+            list: Cached embedding per text, None for misses.
+        """
+        keys = [self.make_key(model, task_type, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders});", chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._pending_access.update((key, now) for key in found)
+                if (len(self._pending_access) >= ACCESS_FLUSH_SIZE
+                        or time.monotonic() - self._last_flush >= ACCESS_FLUSH_INTERVAL):
+                    self._flush_access()
+                    self._conn.commit()
+            hits = sum(1 for key in keys if key in found)
+            self._hits += hits
+            self._misses += len(keys) - hits
+
+        return [
+            np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None
+            for key in keys
+        ]
+
+    def get(self, model, task_type, text):
+        return self.get_many(model, task_type, [text])[0]
+
+    def put_many(self, model, task_type, texts, vectors):
+        now = time.time()
+        rows = [
+            (self.make_key(model, task_type, text), model, task_type, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, task_type, vector, last_access) VALUES (?, ?, ?, ?, ?);", rows
+            )
+            self._entries += self._conn.total_changes - before
+            # Buffered access times ride along with this commit
+            self._flush_access()
+            self._conn.commit()
+            if self._entries > self.max_entries:
+                self._evict()
+
+    def put(self, model, task_type, text, vector):
+        self.put_many(model, task_type, [text], [vector])
+
+    def _flush_access(self):
+        """Writes buffered access times; the caller holds the lock and commits."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?;",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access = {}
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def _evict(self):
+        # Evict down to 90% of capacity so eviction doesn't run on every insert
+        excess = self._entries - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?);", (excess,)
+        )
+        self._conn.commit()
+        self._entries -= excess
+        self._evictions += excess
+        logger.info(f"Evicted {excess} least recently used embeddings from cache")
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "size_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings;")
+            self._conn.commit()
+            self._entries = 0
+            self._pending_access = {}
+
+
+embedding_cache = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
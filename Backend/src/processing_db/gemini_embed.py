@@ -1,9 +1,14 @@
 import os
+import sys
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import google.generativeai as genai
 from langchain_core.embeddings import Embeddings
 from src.exception import CustomException
 from src.logger import logger
+from src.processing_db.embedding_cache import embedding_cache
 import asyncio
 
 load_dotenv()
@@ -12,35 +17,154 @@ load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=API_KEY)
 
+# Texts per embed_content request (the batch endpoint accepts up to 100)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 100))
+# Batches in flight at once
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", 4))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 5))
+
+
+def is_retryable_error(error):
+    """Rate limits and transient server errors are worth retrying."""
+    message = str(error)
+    return any(marker in message for marker in ("429", "ResourceExhausted", "503", "ServiceUnavailable", "DeadlineExceeded"))
+
+
+def backoff_delay(attempt):
+    # Exponential backoff with jitter so concurrent batches don't retry in lockstep
+    return min(2 ** attempt, 60) + random.uniform(0, 1)
+
+
 class GeminiEmbeddings(Embeddings):
-    
-    def __init__(self, model_name="models/embedding-001"):
+
+    def __init__(self, model_name="models/embedding-001", batch_size=EMBED_BATCH_SIZE, max_concurrency=EMBED_MAX_CONCURRENCY, max_retries=EMBED_MAX_RETRIES, cache=embedding_cache):
         self.model_name = model_name
-        
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.cache = cache
+
+    def _batches(self, texts):
+        return [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+    def _embed_batch(self, texts, task_type):
+        """Embeds one batch in a single request, retrying rate-limited calls with backoff."""
+        for attempt in range(self.max_retries):
+            try:
+                embedding_result = genai.embed_content(
+                    model=self.model_name,
+                    content=texts,
+                    task_type=task_type
+                )
+                return embedding_result['embedding']
+            except Exception as e:
+                if not is_retryable_error(e) or attempt == self.max_retries - 1:
+                    logger.error(f"Error embedding batch of {len(texts)} texts: {str(e)}")
+                    raise CustomException(e, sys)
+                delay = backoff_delay(attempt)
+                logger.warning(f"Embedding request throttled ({str(e)}), retrying in {delay:.1f} seconds")
+                time.sleep(delay)
+
+    async def _aembed_batch(self, texts, task_type, semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries):
+                try:
+                    embedding_result = await genai.embed_content_async(
+                        model=self.model_name,
+                        content=texts,
+                        task_type=task_type
+                    )
+                    return embedding_result['embedding']
+                except Exception as e:
+                    if not is_retryable_error(e) or attempt == self.max_retries - 1:
+                        logger.error(f"Error embedding batch of {len(texts)} texts: {str(e)}")
+                        raise CustomException(e, sys)
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"Embedding request throttled ({str(e)}), retrying in {delay:.1f} seconds")
+                    await asyncio.sleep(delay)
+
+    def _split_cached(self, texts, task_type):
+        """
+        Returns:
+            tuple: (cached embedding or None per text, unique texts still to embed)
+        """
+        cached = self.cache.get_many(self.model_name, task_type, texts) if self.cache else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, cached) if embedding is None))
+        return cached, missing
+
+    def _merge_cached(self, texts, cached, missing, embeddings, task_type):
+        if self.cache and missing:
+            self.cache.put_many(self.model_name, task_type, missing, embeddings)
+        fresh = dict(zip(missing, embeddings))
+        return [embedding if embedding is not None else fresh[text] for text, embedding in zip(texts, cached)]
+
     def embed_documents(self, texts):
-        """Generate embeddings for documents."""
-        results = []
-        for text in texts:
-            embedding_result = genai.embed_content(
-                model=self.model_name,
-                content=text,
-                task_type="RETRIEVAL_DOCUMENT"
-            )
-            results.append(embedding_result['embedding'])
-        return results
-    
+        """
+        Generate embeddings for documents, embedding only texts missing from the cache.
+        """
+        texts = list(texts)
+        cached, missing = self._split_cached(texts, "RETRIEVAL_DOCUMENT")
+        embeddings = self._embed_uncached(missing) if missing else []
+        return self._merge_cached(texts, cached, missing, embeddings, "RETRIEVAL_DOCUMENT")
+
+    def _embed_uncached(self, texts):
+        """
+        Texts are sent in batches of batch_size, with up to max_concurrency batches in flight; output order matches input.
+        """
+        batches = self._batches(texts)
+        if len(batches) <= 1:
+            return self._embed_batch(batches[0], "RETRIEVAL_DOCUMENT") if batches else []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            results = pool.map(lambda batch: self._embed_batch(batch, "RETRIEVAL_DOCUMENT"), batches)
+            embeddings = [embedding for batch in results for embedding in batch]
+        logger.info(f"Embedded {len(embeddings)} documents in {len(batches)} batches")
+        return embeddings
+
     def embed_query(self, text):
         """Generate embedding for a query."""
+        cached = self.cache.get(self.model_name, "RETRIEVAL_QUERY", text) if self.cache else None
+        if cached is not None:
+            return cached
         embedding_result = genai.embed_content(
             model=self.model_name,
             content=text,
             task_type="RETRIEVAL_QUERY"
         )
+        if self.cache:
+            self.cache.put(self.model_name, "RETRIEVAL_QUERY", text, embedding_result['embedding'])
+        return embedding_result['embedding']
+
+    async def aembed_documents(self, texts):
+        """Generate embeddings for documents without blocking the event loop."""
+        texts = list(texts)
+        # SQLite lookups and writes run in a worker thread, off the event loop
+        cached, missing = await asyncio.to_thread(self._split_cached, texts, "RETRIEVAL_DOCUMENT")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*[
+            self._aembed_batch(batch, "RETRIEVAL_DOCUMENT", semaphore)
+            for batch in self._batches(missing)
+        ])
+        embeddings = [embedding for batch in results for embedding in batch]
+        return await asyncio.to_thread(self._merge_cached, texts, cached, missing, embeddings, "RETRIEVAL_DOCUMENT")
+
+    async def aembed_query(self, text):
+        """Generate embedding for a query without blocking the event loop."""
+        cached = await asyncio.to_thread(self.cache.get, self.model_name, "RETRIEVAL_QUERY", text) if self.cache else None
+        if cached is not None:
+            return cached
+        embedding_result = await genai.embed_content_async(
+            model=self.model_name,
+            content=text,
+            task_type="RETRIEVAL_QUERY"
+        )
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, self.model_name, "RETRIEVAL_QUERY", text, embedding_result['embedding'])
         return embedding_result['embedding']
-    
+
     # Generate embedding for a query asynchronously
     async def aget_text_embedding(self, text):
-        return await asyncio.to_thread(self.embed_query, text)
+        return await self.aembed_query(text)
 
 # Initialize
 gemini_embeddings = GeminiEmbeddings()
@@ -0,0 +1,381 @@
+"""
+Streaming ingestion pipeline
+
+Single entry point for ingesting the SQLite tables, JSON files and PDFs. Records stream
+through three stages connected by bounded queues, so memory stays flat however large the
+corpus is:
+
+    read + chunk (one source per reader) -> embed (embed workers) -> upsert (upsert workers)
+
+Readers compare each chunk's deterministic id against the ingestion manifest and only pass
+new or changed chunks on. Every CHECKPOINT_BATCHES upserted batches the backend is flushed and
+the batches are recorded in the manifest, which doubles as the checkpoint: after a failure,
+re-running the same command skips everything already persisted. Sources read in full are then pruned of chunks that disappeared.
+
+Usage (from Backend/):
+    python -m src.processing_db.ingest_pipeline --sql --json "src/processing_db/data source/constitution_of_india.json"
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import ntpath
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import Callable
+from src.exception import CustomException
+from src.logger import logger
+from src.processing_db.db_reader import DatabaseManager, db_manager, DB_PATH
+from src.processing_db.gemini_embed import gemini_embeddings
+from src.processing_db.ingestion_manifest import ingestion_manifest, make_chunk_id
+from src.processing_db.retrieval_cache import bump_index_version
+from src.processing_db.lexical_index import lexical_index
+from src.processing_db.vectordb_setup import vector_backend, CHECKPOINT_BATCHES
+from src.processing_db.source_documents import row_to_document, table_chunk_id, item_to_document, item_chunk_id
+from src.processing_db.json_in_vdb import load_json_from_file
+
+# Chunks per embed/upsert batch
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 100))
+INGEST_READ_WORKERS = int(os.getenv("INGEST_READ_WORKERS", 2))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", 4))
+INGEST_UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", 2))
+# Batches buffered between two stages
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 8))
+# Rows fetched per cursor round trip
+SQL_FETCH_SIZE = int(os.getenv("SQL_FETCH_SIZE", 500))
+# Rowid ranges each table is split into, read by parallel readers
+SQL_SHARDS = int(os.getenv("INGEST_SQL_SHARDS", 1))
+# Seconds between progress reports
+PROGRESS_INTERVAL = int(os.getenv("INGEST_PROGRESS_INTERVAL", 10))
+
+_DONE = object()
+
+
+@dataclass
+class IngestionSource:
+    """
+    A named source whose records() yields (chunk_id, Document) lazily.
+    A source read in several shards is split into `shards` IngestionSources sharing its name.
+    """
+    name: str
+    records: Callable
+    shards: int = 1
+
+
+def sql_sources(tables=None, shards=SQL_SHARDS, batch_size=SQL_FETCH_SIZE, db=db_manager):
+    """
+    Returns:
+        list: IngestionSources covering each table of db, split into up to `shards` rowid ranges.
+    """
+    tables = tables or db.get_all_tables()
+
+    def shard_records(table, start_rowid, end_rowid):
+        def records():
+            for row in db.iter_rows(table, batch_size, start_rowid, end_rowid):
+                document = row_to_document(table, row)
+                if document is not None:
+                    yield table_chunk_id(table, document), document
+        return records
+
+    sources = []
+    for table in tables:
+        ranges = db.shard_ranges(table, shards)
+        sources.extend(
+            IngestionSource(f"sql:{table}", shard_records(table, start, end), len(ranges))
+            for start, end in ranges
+        )
+    return sources
+
+
+def json_source(path):
+    name = f"json:{os.path.splitext(ntpath.basename(path))[0]}"
+
+    def records():
+        data = load_json_from_file(path)
+        for item in [data] if isinstance(data, dict) else data:
+            document = item_to_document(item)
+            if document is not None:
+                yield item_chunk_id(name, document), document
+
+    return IngestionSource(name, records)
+
+
+def pdf_source(path):
+    name = f"pdf:{os.path.splitext(ntpath.basename(path))[0]}"
+
+    def records():
+        # Semantic chunking needs the whole document; imported lazily as it loads the chunker stack
+        from src.processing_db.pdf_in_vdb import process_pdf
+        for document in process_pdf(path):
+            yield make_chunk_id(name, None, document.page_content), document
+
+    return IngestionSource(name, records)
+
+
+class IngestionProgress:
+    """Thread-safe stage counters with throughput."""
+
+    STAGES = ("read", "unchanged", "embedded", "upserted", "deleted")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, stage, count=1):
+        with self._lock:
+            self.counts[stage] += count
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            return {
+                **self.counts,
+                "elapsed_seconds": round(elapsed, 1),
+                "upserted_per_second": round(self.counts["upserted"] / elapsed, 2) if elapsed else 0.0,
+            }
+
+    def report(self):
+        stats = self.snapshot()
+        logger.info(
+            f"Ingestion progress: read {stats['read']}, unchanged {stats['unchanged']}, embedded {stats['embedded']}, "
+            f"upserted {stats['upserted']} ({stats['upserted_per_second']}/s) in {stats['elapsed_seconds']}s"
+        )
+
+
+class IngestionPipeline:
+
+    def __init__(self, backend=vector_backend, embedding=gemini_embeddings, manifest=ingestion_manifest,
+                 batch_size=INGEST_BATCH_SIZE, read_workers=INGEST_READ_WORKERS, embed_workers=INGEST_EMBED_WORKERS,
+                 upsert_workers=INGEST_UPSERT_WORKERS, queue_size=INGEST_QUEUE_SIZE, prune=True):
+        self.backend = backend
+        self.embedding = embedding
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.read_workers = read_workers
+        self.embed_workers = embed_workers
+        self.upsert_workers = upsert_workers
+        self.queue_size = queue_size
+        self.prune = prune
+        self.progress = IngestionProgress()
+        self._stop = threading.Event()
+        self._errors = []
+        # Source name -> [indexed ids, ids seen, shards read], used for pruning complete sources
+        self._complete = {}
+        # (source name, ids) of batches upserted since the last checkpoint
+        self._pending = []
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+
+    def _put(self, target, item):
+        """Blocks while the next stage is full, giving up if the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source):
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _worker(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            logger.error(f"Ingestion worker failed: {str(e)}")
+            self._errors.append(e)
+            self._stop.set()
+
+    def _read(self, sources, embed_queue):
+        backend = self.backend.name
+        while not self._stop.is_set():
+            try:
+                source = sources.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                if source.name not in self._complete:
+                    self._complete[source.name] = [self.manifest.indexed_ids(backend, source.name), set(), 0]
+                indexed = self._complete[source.name][0]
+            seen, batch = set(), []
+            for chunk_id, document in source.records():
+                self.progress.add("read")
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                if chunk_id in indexed:
+                    self.progress.add("unchanged")
+                    continue
+                batch.append((chunk_id, document))
+                if len(batch) == self.batch_size:
+                    if not self._put(embed_queue, (source.name, batch)):
+                        return
+                    batch = []
+            if batch and not self._put(embed_queue, (source.name, batch)):
+                return
+            with self._lock:
+                self._complete[source.name][1].update(seen)
+                self._complete[source.name][2] += 1
+            logger.info(f"Finished reading a shard of source '{source.name}': {len(seen)} chunks")
+
+    def _embed(self, embed_queue, upsert_queue):
+        while True:
+            item = self._get(embed_queue)
+            if item is _DONE:
+                return
+            source_name, batch = item
+            embeddings = self.embedding.embed_documents([document.page_content for _, document in batch])
+            self.progress.add("embedded", len(batch))
+            if not self._put(upsert_queue, (source_name, batch, embeddings)):
+                return
+
+    def _upsert(self, upsert_queue):
+        while True:
+            item = self._get(upsert_queue)
+            if item is _DONE:
+                return
+            source_name, batch, embeddings = item
+            ids = [chunk_id for chunk_id, _ in batch]
+            documents = [document for _, document in batch]
+            self.backend.upsert_embeddings(documents, embeddings, ids)
+            lexical_index.upsert(ids, documents)
+            self.progress.add("upserted", len(batch))
+            with self._lock:
+                self._pending.append((source_name, ids))
+                due = len(self._pending) >= CHECKPOINT_BATCHES
+            if due:
+                self._checkpoint()
+
+    def _checkpoint(self):
+        """Flushes the backend, then records the batches it persisted; a re-run skips everything recorded here."""
+        with self._checkpoint_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            self.backend.flush()
+            for source_name, ids in pending:
+                self.manifest.record(self.backend.name, source_name, added_ids=ids)
+
+    def _start(self, count, target, *args):
+        threads = [threading.Thread(target=self._worker, args=(target, *args), daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _report_progress(self, finished):
+        while not finished.wait(PROGRESS_INTERVAL):
+            self.progress.report()
+
+    def _prune(self, shards):
+        for source_name, (indexed, seen, shards_read) in self._complete.items():
+            if shards_read < shards[source_name]:
+                continue
+            stale_ids = sorted(indexed - seen)
+            if stale_ids:
+                self.backend.delete(stale_ids)
+                lexical_index.delete(stale_ids)
+                self.backend.flush()
+                self.manifest.record(self.backend.name, source_name, deleted_ids=stale_ids)
+                self.progress.add("deleted", len(stale_ids))
+                logger.info(f"Deleted {len(stale_ids)} stale chunks of source '{source_name}'")
+
+    def run(self, sources):
+        """
+        Returns:
+            dict: Final stage counts and throughput.
+        """
+        self.backend.connect()
+        source_queue = queue.Queue()
+        for source in sources:
+            source_queue.put(source)
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        upsert_queue = queue.Queue(maxsize=self.queue_size)
+
+        finished = threading.Event()
+        threading.Thread(target=self._report_progress, args=(finished,), daemon=True).start()
+        try:
+            readers = self._start(self.read_workers, self._read, source_queue, embed_queue)
+            embedders = self._start(self.embed_workers, self._embed, embed_queue, upsert_queue)
+            upserters = self._start(self.upsert_workers, self._upsert, upsert_queue)
+
+            # Each stage is closed once the previous one has drained into it
+            for thread in readers:
+                thread.join()
+            for _ in embedders:
+                self._put(embed_queue, _DONE)
+            for thread in embedders:
+                thread.join()
+            for _ in upserters:
+                self._put(upsert_queue, _DONE)
+            for thread in upserters:
+                thread.join()
+
+            # Batches upserted before a failure are kept, so the re-run doesn't redo them
+            self._checkpoint()
+            if self._errors:
+                raise self._errors[0]
+            if self.prune:
+                self._prune({source.name: source.shards for source in sources})
+            stats = self.progress.snapshot()
+            if stats["upserted"] or stats["deleted"]:
+                bump_index_version()
+            self.progress.report()
+            return stats
+        except Exception as e:
+            logger.error(f"Ingestion pipeline failed, re-run to resume: {str(e)}")
+            raise CustomException(e, sys)
+        finally:
+            finished.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream SQLite, JSON and PDF sources into the vector store")
+    parser.add_argument("--sql", nargs="*", metavar="TABLE", help="Tables of the --db database to ingest (all when none given)")
+    parser.add_argument("--json", nargs="*", default=[], metavar="PATH", help="JSON files to ingest")
+    parser.add_argument("--pdf", nargs="*", default=[], metavar="PATH", help="PDF files to ingest")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database the --sql tables are read from")
+    parser.add_argument("--sql-shards", type=int, default=SQL_SHARDS, help="Rowid ranges each table is read in, in parallel")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--read-workers", type=int, default=INGEST_READ_WORKERS)
+    parser.add_argument("--embed-workers", type=int, default=INGEST_EMBED_WORKERS)
+    parser.add_argument("--upsert-workers", type=int, default=INGEST_UPSERT_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=INGEST_QUEUE_SIZE)
+    parser.add_argument("--no-prune", action="store_true", help="Keep chunks that no longer appear in their source")
+    args = parser.parse_args()
+
+    sources = []
+    if args.sql is not None:
+        db = db_manager if args.db == DB_PATH else DatabaseManager(args.db)
+        sources.extend(sql_sources(args.sql, shards=args.sql_shards, db=db))
+    sources.extend(json_source(path) for path in args.json)
+    sources.extend(pdf_source(path) for path in args.pdf)
+    if not sources:
+        parser.error("Nothing to ingest, pass --sql, --json or --pdf")
+
+    pipeline = IngestionPipeline(
+        batch_size=args.batch_size,
+        read_workers=args.read_workers,
+        embed_workers=args.embed_workers,
+        upsert_workers=args.upsert_workers,
+        queue_size=args.queue_size,
+        prune=not args.no_prune,
+    )
+    print(json.dumps(pipeline.run(sources), indent=2))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except CustomException as e:
+        print(f"An error occurred: {e}")
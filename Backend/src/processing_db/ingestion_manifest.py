@@ -0,0 +1,104 @@
+"""
+Ingestion manifest
+
+Every ingested chunk gets a deterministic vector id built from its source, its row/section
+key and a hash of its text (make_chunk_id). The manifest records which ids are indexed per
+vector backend and source, so re-running an ingestion script only embeds and upserts chunks
+whose id is new (new or edited text) and deletes ids that no longer appear in the source.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from src.exception import CustomException
+from src import ARTIFACTS_DIR
+from src.logger import logger
+
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", os.path.join(ARTIFACTS_DIR, "ingestion_manifest.db"))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def make_chunk_id(source, key, text):
+    """
+    Returns:
+        str: "<source>:<key>:<content hash>", or "<source>:<content hash>" when the chunk has no natural key.
+    """
+    if key is None or key == "":
+        return f"{source}:{content_hash(text)}"
+    return f"{source}:{key}:{content_hash(text)}"
+
+
+class IngestionManifest:
+
+    def __init__(self, db_path=INGESTION_MANIFEST_PATH):
+        try:
+            self.db_path = db_path
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    backend TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    indexed_at REAL NOT NULL,
+                    PRIMARY KEY (backend, chunk_id)
+                );
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (backend, source);")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error opening ingestion manifest: {str(e)}")
+            raise CustomException(e, sys)
+
+    def indexed_ids(self, backend, source):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE backend = ? AND source = ?;", (backend, source)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def diff(self, backend, source, chunk_ids, prune=True):
+        """
+        Returns:
+            tuple: (ids to upsert, ids to delete). Deletions are only computed with prune,
+                   i.e. when chunk_ids covers the whole source.
+        """
+        indexed = self.indexed_ids(backend, source)
+        wanted = set(chunk_ids)
+        new_ids = [chunk_id for chunk_id in dict.fromkeys(chunk_ids) if chunk_id not in indexed]
+        stale_ids = sorted(indexed - wanted) if prune else []
+        return new_ids, stale_ids
+
+    def record(self, backend, source, added_ids=(), deleted_ids=()):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (backend, source, chunk_id, indexed_at) VALUES (?, ?, ?, ?);",
+                [(backend, source, chunk_id, now) for chunk_id in added_ids]
+            )
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE backend = ? AND chunk_id = ?;",
+                [(backend, chunk_id) for chunk_id in deleted_ids]
+            )
+            self._conn.commit()
+
+    def sources(self, backend):
+        """
+        Returns:
+            dict: Indexed chunk count per source.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, COUNT(*) FROM chunks WHERE backend = ? GROUP BY source;", (backend,)
+            ).fetchall()
+        return dict(rows)
+
+
+ingestion_manifest = IngestionManifest()
@@ -1,7 +1,10 @@
 import sys
 import json
 from langchain.schema import Document
-from src.processing_db.vectordb_setup import initialize_pinecone, create_vector_store, search_documents
+from src.processing_db.source_documents import item_to_document, item_chunk_id
+import os
+import ntpath
+from src.processing_db.vectordb_setup import sync_documents
 from src.exception import CustomException
 from src.logger import logger 
 from src.utils import search_similar_documents, display_results
@@ -12,31 +15,8 @@ def process_json_data(json_data):
         list: List of Document objects with page_content and metadata
     """
     try:
-        documents = []
         json_items = [json_data] if isinstance(json_data, dict) else json_data
-        
-        for item in json_items:
-            if 'description' in item:
-                page_content = item['description']
-                
-                # Skip if page_content is None
-                if page_content is None:
-                    logger.warning(f"Skipping item with None description: {item.get('title', 'unknown')}")
-                    continue
-                
-                # Ensure page_content is a string
-                page_content = str(page_content)
-                
-                # Create metadata from all other fields
-                metadata = {}
-                for k, v in item.items():
-                    if k != 'description':
-                        metadata[k] = str(v) if v is not None else ""
-                
-                document = Document(page_content=page_content, metadata=metadata)
-                documents.append(document)
-            else:
-                logger.warning(f"No 'description' field found in item: {item.get('title', 'unknown')}")
+        documents = [doc for doc in map(item_to_document, json_items) if doc is not None]
         
         logger.info(f"Created {len(documents)} documents from JSON data")
         return documents
@@ -59,10 +39,13 @@ def load_json_from_file(file_path):
         logger.error(f"Error loading JSON from {file_path}: {str(e)}")
         raise CustomException(e, sys)
 
-def upsert_json_data(json_data=None, json_file=None):
+def upsert_json_data(json_data=None, json_file=None, source=None):
     """
+    Only new or changed items are embedded; items no longer in the data are deleted.
+    Items are keyed by their article number, scoped to `source` (defaults to the file name).
+
     Returns:
-        PineconeVectorStore: The vector store
+        dict: Counts of added, deleted and unchanged chunks.
     """
     try:
         # Load JSON from file if json_data not provided
@@ -79,22 +62,24 @@ def upsert_json_data(json_data=None, json_file=None):
         if not documents:
             logger.warning("No valid documents found to upsert")
             return None
-            
-        initialize_pinecone()
-        vector_store = create_vector_store(documents)
+
+        if source is None:
+            source = os.path.splitext(ntpath.basename(json_file))[0] if json_file else "json"
+        ids = [item_chunk_id(f"json:{source}", doc) for doc in documents]
+        stats = sync_documents(f"json:{source}", documents, ids)
         
-        logger.info(f"Upserted {len(documents)} documents to vector store.")
-        return vector_store
+        logger.info(f"Upserted JSON documents to vector store: {stats}")
+        return stats
     
     except Exception as e:
-        logger.error(f"Error upserting JSON data into Pinecone database: {str(e)}")
+        logger.error(f"Error upserting JSON data into vector database: {str(e)}")
         raise CustomException(e, sys)
 
 
 if __name__ == "__main__":
     try:
         json_file_path = r"data source\constitution_of_india.json" 
-        vector_store = upsert_json_data(json_file=json_file_path)
+        stats = upsert_json_data(json_file=json_file_path)
         
         query = "What is the preamble of the Indian Constitution?"
         results = search_similar_documents(query)
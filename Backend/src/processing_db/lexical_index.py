@@ -0,0 +1,233 @@
+"""
+Lexical (BM25) index over ingested chunks
+
+Dense embeddings are weak on exact citations like "section 302 IPC" or "order 39 CPC".
+Every chunk the ingestion upserts into the vector store is also written to a local SQLite
+FTS5 index, with a heading (act, section/article number, title) indexed alongside the text.
+search_documents fuses BM25 hits with the vector hits by reciprocal rank before reranking.
+
+Indexes built before this existed can be backfilled without re-embedding (from Backend/):
+    python -m src.processing_db.lexical_index --sql --json "src/processing_db/data source/constitution_of_india.json"
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import argparse
+import threading
+from langchain.schema import Document
+from src.exception import CustomException
+from src import ARTIFACTS_DIR
+from src.logger import logger
+
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(ARTIFACTS_DIR, "lexical_index.db"))
+# BM25 weight of the heading column relative to the chunk text
+HEADING_WEIGHT = float(os.getenv("LEXICAL_HEADING_WEIGHT", 3.0))
+# Reciprocal-rank fusion constant; larger values flatten the advantage of top ranks
+RRF_K = int(os.getenv("RRF_K", 60))
+
+# Table names in IndiaLaw.db and the acts they hold
+ACT_NAMES = {
+    "IPC": "Indian Penal Code",
+    "CRPC": "Code of Criminal Procedure",
+    "CPC": "Code of Civil Procedure",
+    "IEA": "Indian Evidence Act",
+    "HMA": "Hindu Marriage Act",
+    "IDA": "Indian Divorce Act",
+    "MVA": "Motor Vehicles Act",
+    "NIA": "Negotiable Instruments Act",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "was", "what", "which",
+    "who", "how", "when", "under", "as", "by", "with", "about", "me", "tell", "explain", "does", "do", "i",
+}
+
+
+def chunk_heading(metadata):
+    """Act, section/article number and title of a chunk, indexed next to its text."""
+    parts = []
+    act = metadata.get("source_table", "")
+    if act:
+        parts += [act, ACT_NAMES.get(act.upper(), "")]
+    section = next((value for key, value in metadata.items() if key.lower() == "section"), None)
+    if section:
+        parts.append(f"section {section}")
+    if metadata.get("article"):
+        parts += [f"article {metadata['article']}", "Constitution of India"]
+    title = metadata.get("section_title") or metadata.get("title")
+    if title:
+        parts.append(title)
+    return " ".join(part.strip() for part in parts if part)
+
+
+def build_match_query(query):
+    """
+    Returns:
+        str: An FTS5 OR-query of the query's terms, or "" when nothing is left to match.
+    """
+    terms = [term for term in re.findall(r"\w+", query.lower()) if term not in STOPWORDS]
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+
+
+def fuse_candidates(vector_results, lexical_results, rrf_k=RRF_K):
+    """
+    Reciprocal-rank fusion: each chunk scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    Chunks found by both retrievers are merged by id.
+
+    Returns:
+        list: The union of both lists, best fused score first, with rrf_score in metadata.
+    """
+    if not lexical_results:
+        return vector_results
+    fused = {}
+    for results in (vector_results, lexical_results):
+        for rank, doc in enumerate(results, start=1):
+            doc_id = doc.metadata["id"]
+            if doc_id in fused:
+                fused[doc_id].metadata.update({k: v for k, v in doc.metadata.items() if k not in fused[doc_id].metadata})
+            else:
+                fused[doc_id] = doc
+                doc.metadata["rrf_score"] = 0.0
+            fused[doc_id].metadata["rrf_score"] += 1.0 / (rrf_k + rank)
+    return sorted(fused.values(), key=lambda doc: doc.metadata["rrf_score"], reverse=True)
+
+
+class LexicalIndex:
+
+    def __init__(self, db_path=LEXICAL_INDEX_PATH):
+        try:
+            self.db_path = db_path
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            # chunk ids map onto FTS rowids, so updates and deletes don't scan the FTS table
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunk_ids (
+                    row INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chunk_id TEXT UNIQUE NOT NULL,
+                    metadata TEXT NOT NULL
+                );
+            """)
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(heading, text, tokenize='porter unicode61');"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error opening lexical index: {str(e)}")
+            raise CustomException(e, sys)
+
+    def _remove(self, ids):
+        placeholders = ",".join("?" * len(ids))
+        rows = [row[0] for row in self._conn.execute(
+            f"SELECT row FROM chunk_ids WHERE chunk_id IN ({placeholders});", list(ids)
+        )]
+        if rows:
+            self._conn.executemany("DELETE FROM chunks WHERE rowid = ?;", [(row,) for row in rows])
+            self._conn.executemany("DELETE FROM chunk_ids WHERE row = ?;", [(row,) for row in rows])
+
+    def upsert(self, ids, documents):
+        """Indexes documents under their chunk ids, replacing earlier versions."""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            try:
+                self._remove(ids)
+                for chunk_id, doc in zip(ids, documents):
+                    cursor = self._conn.execute(
+                        "INSERT INTO chunk_ids (chunk_id, metadata) VALUES (?, ?);", (chunk_id, json.dumps(doc.metadata))
+                    )
+                    self._conn.execute(
+                        "INSERT INTO chunks (rowid, heading, text) VALUES (?, ?, ?);",
+                        (cursor.lastrowid, chunk_heading(doc.metadata), doc.page_content)
+                    )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.error(f"Error adding chunks to lexical index: {str(e)}")
+                raise CustomException(e, sys)
+
+    def delete(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            try:
+                self._remove(ids)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.error(f"Error deleting chunks from lexical index: {str(e)}")
+                raise CustomException(e, sys)
+
+    def search(self, query, k=6):
+        """
+        Returns:
+            list: Top-k (Document, BM25 score) pairs, higher is better; metadata["id"] is the chunk id.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT chunk_ids.chunk_id, chunks.text, chunk_ids.metadata, bm25(chunks, ?, 1.0) AS score
+                    FROM chunks JOIN chunk_ids ON chunk_ids.row = chunks.rowid
+                    WHERE chunks MATCH ?
+                    ORDER BY score
+                    LIMIT ?;
+                    """,
+                    (HEADING_WEIGHT, match, k)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Lexical search failed for query '{query}': {str(e)}")
+                return []
+        # FTS5's bm25() is negative, lower meaning more relevant
+        return [
+            (Document(page_content=text, metadata={**json.loads(metadata), "id": chunk_id}), -score)
+            for chunk_id, text, metadata, score in rows
+        ]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunk_ids;").fetchone()[0]
+
+
+lexical_index = LexicalIndex()
+
+
+def main():
+    # Imported here: the pipeline itself writes to this index
+    from src.processing_db.ingest_pipeline import sql_sources, json_source, pdf_source, INGEST_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Backfill the lexical index from the ingestion sources")
+    parser.add_argument("--sql", nargs="*", metavar="TABLE", help="Tables of IndiaLaw.db to index (all when none given)")
+    parser.add_argument("--json", nargs="*", default=[], metavar="PATH")
+    parser.add_argument("--pdf", nargs="*", default=[], metavar="PATH")
+    args = parser.parse_args()
+
+    sources = sql_sources(args.sql) if args.sql is not None else []
+    sources += [json_source(path) for path in args.json] + [pdf_source(path) for path in args.pdf]
+    for source in sources:
+        ids, documents = [], []
+        for chunk_id, document in source.records():
+            ids.append(chunk_id)
+            documents.append(document)
+            if len(ids) == INGEST_BATCH_SIZE:
+                lexical_index.upsert(ids, documents)
+                ids, documents = [], []
+        lexical_index.upsert(ids, documents)
+        logger.info(f"Indexed source '{source.name}' for lexical search")
+    print(f"Lexical index holds {lexical_index.count()} chunks")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except CustomException as e:
+        print(f"An error occurred: {e}")
@@ -0,0 +1,63 @@
+"""
+Streaming PDF reader
+
+Yields (page number, text) one page at a time instead of building the whole document in
+one string, so large gazette PDFs are read without memory spikes. Files can be opened from
+a read-only memory map (pages are faulted in by the OS as PyMuPDF touches them). Page ranges
+are read and chunked in parallel by semantic_chunking's process pool.
+
+Kept free of the vector store / LLM imports so worker processes start cheaply.
+"""
+
+import os
+import sys
+import mmap
+from contextlib import contextmanager, ExitStack
+import fitz
+from src.exception import CustomException
+from src.logger import logger
+
+PDF_USE_MMAP = os.getenv("PDF_USE_MMAP", "true").lower() == "true"
+
+
+@contextmanager
+def open_pdf(path, use_mmap=PDF_USE_MMAP):
+    """Opens a PDF from disk or from a read-only memory map of it."""
+    with ExitStack() as stack:
+        try:
+            if use_mmap:
+                file = stack.enter_context(open(path, "rb"))
+                buffer = stack.enter_context(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+                view = memoryview(buffer)
+                stack.callback(view.release)
+                doc = stack.enter_context(fitz.open(stream=view, filetype="pdf"))
+            else:
+                doc = stack.enter_context(fitz.open(path))
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.error(f"Error opening PDF {path}: {str(e)}")
+            raise CustomException(e, sys)
+        yield doc
+
+
+def page_count(path, use_mmap=PDF_USE_MMAP):
+    with open_pdf(path, use_mmap) as doc:
+        return len(doc)
+
+
+def iter_pdf_pages(path, start=0, end=None, use_mmap=PDF_USE_MMAP):
+    """
+    Yields:
+        tuple: (page number counted from 1, page text) for pages [start, end), 0-based bounds.
+    """
+    with open_pdf(path, use_mmap) as doc:
+        end = len(doc) if end is None else min(end, len(doc))
+        for page_no in range(start, end):
+            yield page_no + 1, doc[page_no].get_text()
+
+
+def page_ranges(start, end, pages_per_shard):
+    """
+    Returns:
+        list: Consecutive [first, last) page ranges of at most pages_per_shard pages covering [start, end).
+    """
+    return [(first, min(first + pages_per_shard, end)) for first in range(start, end, pages_per_shard)]
@@ -0,0 +1,194 @@
+"""
+Reranking subsystem
+
+search_documents re-orders retrieved chunks with a Reranker selected by RERANKER_BACKEND:
+
+- cross-encoder (default): bge-reranker-v2-m3 run locally on CPU via sentence-transformers,
+  scoring all (query, chunk) pairs in batches with no remote round trip
+- pinecone: Pinecone's hosted bge-reranker-v2-m3
+- none: keep the vector store order
+
+Chunks longer than the model's window are split into overlapping windows and a chunk scores
+as its best window, so long chunks never hit the token limit. Scores are cached per
+(query, chunk id). The API loads the cross-encoder at startup (warm_up), so no request pays for it.
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+from src.exception import CustomException
+from src.logger import logger
+
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "cross-encoder").lower()
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "BAAI/bge-reranker-v2-m3")
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 16))
+# Tokens per (query + chunk window) pair
+RERANK_MAX_TOKENS = int(os.getenv("RERANK_MAX_TOKENS", 512))
+RERANK_WINDOW_OVERLAP = int(os.getenv("RERANK_WINDOW_OVERLAP", 64))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 20000))
+PINECONE_RERANK_MODEL = "bge-reranker-v2-m3"
+# Pinecone's hosted model rejects pairs above 1024 tokens
+PINECONE_RERANK_MAX_TOKENS = 1024
+
+
+def chunk_id(document):
+    """Stable id of a retrieved chunk: its vector id when known, else a hash of its text."""
+    return document.metadata.get("id") or hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+
+def split_windows(tokens, window, overlap):
+    """Splits a token list into overlapping windows of at most `window` tokens."""
+    if len(tokens) <= window:
+        return [tokens]
+    step = max(1, window - overlap)
+    return [tokens[start:start + window] for start in range(0, len(tokens) - overlap, step)]
+
+
+class Reranker:
+    """Base reranker: caching, windowing and top-n selection around a backend's score()."""
+
+    name = "base"
+
+    def __init__(self, cache_size=RERANK_CACHE_SIZE, max_tokens=RERANK_MAX_TOKENS, overlap=RERANK_WINDOW_OVERLAP):
+        self.cache_size = cache_size
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        """Loads whatever the backend needs before the first query; nothing by default."""
+        return self
+
+    def score_pairs(self, query, texts):
+        """
+        Returns:
+            list: Relevance score per text; texts already fit the model window.
+        """
+        raise NotImplementedError
+
+    def windows(self, query, text):
+        """Splits text on whitespace; subclasses with a tokenizer override this."""
+        budget = max(32, int((self.max_tokens - len(query.split())) * 0.75))
+        return [" ".join(window) for window in split_windows(text.split(), budget, self.overlap)]
+
+    def score(self, query, texts):
+        """
+        Returns:
+            list: Score per text, the best over its windows.
+        """
+        windows, owners = [], []
+        for i, text in enumerate(texts):
+            for window in self.windows(query, text) or [text]:
+                windows.append(window)
+                owners.append(i)
+
+        scores = [float("-inf")] * len(texts)
+        for owner, score in zip(owners, self.score_pairs(query, windows)):
+            scores[owner] = max(scores[owner], float(score))
+        return scores
+
+    def rerank(self, query, documents, top_n=3):
+        """
+        Returns:
+            list: (index into documents, score) for the top_n documents, best first.
+        """
+        keys = [(query, chunk_id(doc)) for doc in documents]
+        with self._lock:
+            scores = [self._cache.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self._cache.move_to_end(key)
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            fresh = self.score(query, [documents[i].page_content for i in missing])
+            with self._lock:
+                for i, score in zip(missing, fresh):
+                    scores[i] = score
+                    self._cache[keys[i]] = score
+                    self._cache.move_to_end(keys[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        ranked = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        return [(i, scores[i]) for i in ranked[:top_n]]
+
+
+class NoopReranker(Reranker):
+    """Keeps the vector store order."""
+
+    name = "none"
+
+    def rerank(self, query, documents, top_n=3):
+        return [(i, None) for i in range(min(top_n, len(documents)))]
+
+
+class CrossEncoderReranker(Reranker):
+    """Local CPU cross-encoder scoring pairs in batches; the model is loaded by warm_up() or on first use."""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name=CROSS_ENCODER_MODEL, batch_size=RERANK_BATCH_SIZE, device="cpu", **kwargs):
+        super().__init__(**kwargs)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.model = None
+        self._model_lock = threading.Lock()
+
+    def load(self):
+        with self._model_lock:
+            if self.model is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self.model = CrossEncoder(self.model_name, max_length=self.max_tokens, device=self.device)
+                    logger.info(f"Loaded cross-encoder reranker '{self.model_name}' on {self.device}")
+                except Exception as e:
+                    logger.error(f"Error loading cross-encoder reranker: {str(e)}")
+                    raise CustomException(e, sys)
+        return self
+
+    def warm_up(self):
+        return self.load()
+
+    def windows(self, query, text):
+        tokenizer = self.load().model.tokenizer
+        # Room for the query and the [CLS]/[SEP] special tokens
+        budget = max(32, self.max_tokens - len(tokenizer.tokenize(query)) - 4)
+        tokens = tokenizer.tokenize(text)
+        return [tokenizer.convert_tokens_to_string(window) for window in split_windows(tokens, budget, self.overlap)]
+
+    def score_pairs(self, query, texts):
+        return self.load().model.predict(
+            [(query, text) for text in texts],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        ).tolist()
+
+
+class PineconeReranker(Reranker):
+    """Pinecone's hosted reranker; client_provider returns the shared Pinecone client."""
+
+    name = "pinecone"
+
+    def __init__(self, client_provider, model_name=PINECONE_RERANK_MODEL, **kwargs):
+        kwargs.setdefault("max_tokens", PINECONE_RERANK_MAX_TOKENS)
+        super().__init__(**kwargs)
+        self.client_provider = client_provider
+        self.model_name = model_name
+
+    def score_pairs(self, query, texts):
+        rerank_results = self.client_provider().inference.rerank(
+            model=self.model_name,
+            query=query,
+            documents=texts,
+            top_n=len(texts),
+            return_documents=False,
+        )
+        scores = [0.0] * len(texts)
+        for item in rerank_results.data:
+            scores[item["index"]] = item["score"]
+        return scores
@@ -0,0 +1,115 @@
+"""
+Retrieval result cache
+
+search_documents/asearch_documents check this cache before embedding, querying the vector
+store and reranking. Entries are keyed by the normalized query plus (initial_k, final_k),
+evicted least recently used and expire after a TTL.
+
+Ingestion bumps an index-version stamp file after every upsert (bump_index_version), and
+entries cached under an older version are treated as misses, so API workers pick up newly
+ingested data without a restart. put() stores a result under the version get() read before
+retrieval, so results computed during an ingestion run are never labelled with the new version.
+"""
+
+import os
+import re
+import copy
+import time
+import threading
+from collections import OrderedDict
+from src import ARTIFACTS_DIR
+from src.logger import logger
+
+RETRIEVAL_CACHE_ENABLED = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 2048))
+# Seconds a cached result stays valid
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", 3600))
+INDEX_VERSION_PATH = os.getenv("INDEX_VERSION_PATH", os.path.join(ARTIFACTS_DIR, "index_version"))
+
+
+def normalize_query(query):
+    """Case-folds, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?.!").strip().lower()
+
+
+def read_index_version(path=INDEX_VERSION_PATH):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def bump_index_version(path=INDEX_VERSION_PATH):
+    """Marks the index as changed; called by ingestion after upserts or deletes."""
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write(str(time.time_ns()))
+    except OSError as e:
+        logger.warning(f"Could not update index version stamp: {str(e)}")
+
+
+class RetrievalCache:
+
+    def __init__(self, max_entries=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL, version_path=INDEX_VERSION_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_path = version_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._latency_saved = 0.0
+
+    @staticmethod
+    def make_key(query, initial_k, final_k):
+        return normalize_query(query), initial_k, final_k
+
+    def get(self, query, initial_k, final_k):
+        """
+        Returns:
+            tuple: (cached documents or None on a miss, index version read before the lookup)
+        """
+        key = self.make_key(query, initial_k, final_k)
+        version = read_index_version(self.version_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, stored_version, documents, latency = entry
+                if time.monotonic() - stored_at <= self.ttl and stored_version == version:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    self._latency_saved += latency
+                    return copy.deepcopy(documents), version
+                del self._entries[key]
+            self._misses += 1
+            return None, version
+
+    def put(self, query, initial_k, final_k, documents, latency, version):
+        """Stores a result along with the seconds it took to compute and the index version get() returned."""
+        key = self.make_key(query, initial_k, final_k)
+        documents = copy.deepcopy(list(documents))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), version, documents, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self._latency_saved, 3),
+            }
+
+
+retrieval_cache = RetrievalCache() if RETRIEVAL_CACHE_ENABLED else None
@@ -0,0 +1,194 @@
+"""
+Sharded semantic chunking for large PDFs
+
+Same breakpoint rule as LangChain's SemanticChunker (percentile of cosine distances between
+neighbouring sentence windows), restructured so large documents chunk in minutes:
+
+1. The PDF is split into page-range shards. A process pool extracts text, splits sentences
+   and counts tokens per shard.
+   Pages come from pdf_reader, so a shard never holds more than its own pages' text.
+2. Shards are stitched back in page order. A sentence cut by a page or shard boundary is
+   re-joined, so breakpoints don't depend on how the document was sharded.
+3. Sentence windows are embedded in batches through GeminiEmbeddings (batched, concurrent,
+   cached). A single global percentile threshold is taken over all distances.
+4. Chunks over max_tokens are split on sentence boundaries using the per-sentence token
+   counts from step 1, so no chunk is re-tokenized. Each chunk carries its page range and
+   character offsets into the text of its first and last page (page.get_text()).
+"""
+
+import os
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from langchain.schema import Document
+from src.exception import CustomException
+from src.logger import logger
+from src.token_counter import token_counter
+from src.processing_db.pdf_reader import iter_pdf_pages, page_count, page_ranges
+
+PAGES_PER_SHARD = int(os.getenv("CHUNK_PAGES_PER_SHARD", 25))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", os.cpu_count() or 1))
+BREAKPOINT_PERCENTILE = float(os.getenv("CHUNK_BREAKPOINT_PERCENTILE", 90))
+# Sentences on each side joined into the window that gets embedded, as in SemanticChunker
+SENTENCE_BUFFER = 1
+MAX_CHUNK_TOKENS = 900
+OVERSIZE_OVERLAP_TOKENS = 50
+
+SENTENCE_END = re.compile(r"(?<=[.?!])\s+")
+# A fragment ending like this is complete; anything else continues on the next page
+TERMINAL = re.compile(r"[.?!:;)\]\"'”]\s*$")
+
+# Pages counted from 1; start/end are character offsets into the raw text of page/end_page
+Sentence = namedtuple("Sentence", ["page", "start", "end_page", "end", "text", "tokens"])
+
+
+def split_sentences(text):
+    """
+    Returns:
+        list: (start offset, end offset, sentence with whitespace collapsed) for the sentences of text.
+    """
+    sentences, start = [], 0
+    for match in list(SENTENCE_END.finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        segment = text[start:end]
+        sentence = " ".join(segment.split())
+        if sentence:
+            offset = start + len(segment) - len(segment.lstrip())
+            sentences.append((offset, start + len(segment.rstrip()), sentence))
+        if match:
+            start = match.end()
+    return sentences
+
+
+def extract_shard(pdf_path, start_page, end_page):
+    """
+    Runs in a worker process.
+
+    Returns:
+        list: Sentences of pages [start_page, end_page), with token counts.
+    """
+    sentences = []
+    for page, text in iter_pdf_pages(pdf_path, start_page, end_page):
+        sentences.extend((page, start, end, sentence) for start, end, sentence in split_sentences(text))
+    counts = token_counter.count_batch([sentence for _, _, _, sentence in sentences])
+    return [
+        Sentence(page, start, page, end, sentence, count)
+        for (page, start, end, sentence), count in zip(sentences, counts)
+    ]
+
+
+def stitch(shards):
+    """Concatenates shard results in order, re-joining sentences split across a page or shard boundary."""
+    sentences = []
+    for shard in shards:
+        for sentence in shard:
+            previous = sentences[-1] if sentences else None
+            if previous and previous.end_page != sentence.page and not TERMINAL.search(previous.text):
+                sentences[-1] = previous._replace(
+                    end_page=sentence.end_page, end=sentence.end,
+                    text=f"{previous.text} {sentence.text}", tokens=previous.tokens + sentence.tokens
+                )
+            else:
+                sentences.append(sentence)
+    return sentences
+
+
+def breakpoints(embeddings, percentile=BREAKPOINT_PERCENTILE):
+    """
+    Returns:
+        list: Indices i such that a chunk ends after sentence i.
+    """
+    if len(embeddings) < 2:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    distances = 1.0 - np.sum(vectors[:-1] * vectors[1:], axis=1)
+    threshold = np.percentile(distances, percentile)
+    return [int(i) for i in np.nonzero(distances > threshold)[0]]
+
+
+class ShardedSemanticChunker:
+
+    def __init__(self, embeddings, pages_per_shard=PAGES_PER_SHARD, workers=CHUNK_WORKERS,
+                 percentile=BREAKPOINT_PERCENTILE, max_tokens=MAX_CHUNK_TOKENS):
+        self.embeddings = embeddings
+        self.pages_per_shard = pages_per_shard
+        self.workers = workers
+        self.percentile = percentile
+        self.max_tokens = max_tokens
+
+    def read_sentences(self, pdf_path, start_page=0):
+        total = page_count(pdf_path)
+        ranges = page_ranges(start_page, total, self.pages_per_shard)
+        if len(ranges) <= 1 or self.workers <= 1:
+            shards = [extract_shard(pdf_path, start, end) for start, end in ranges]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges))) as pool:
+                shards = list(pool.map(extract_shard, [pdf_path] * len(ranges), *zip(*ranges)))
+        sentences = stitch(shards)
+        logger.info(f"Extracted {len(sentences)} sentences from {total - start_page} pages in {len(ranges)} shards")
+        return sentences
+
+    def _windows(self, sentences):
+        texts = [sentence.text for sentence in sentences]
+        return [
+            " ".join(texts[max(0, i - SENTENCE_BUFFER):i + SENTENCE_BUFFER + 1])
+            for i in range(len(texts))
+        ]
+
+    def _split_oversized(self, sentence):
+        """Token windows for a single sentence longer than max_tokens."""
+        return token_counter.split(sentence, self.max_tokens, OVERSIZE_OVERLAP_TOKENS)
+
+    def _pack(self, group):
+        """Splits one semantic group into chunks within max_tokens, on sentence boundaries."""
+        chunks, current, current_tokens = [], [], 0
+        for sentence in group:
+            if sentence.tokens > self.max_tokens:
+                if current:
+                    chunks.append(current)
+                # Parts keep the offsets of the whole sentence
+                chunks.extend([[sentence._replace(text=part)] for part in self._split_oversized(sentence.text)])
+                current, current_tokens = [], 0
+                continue
+            if current and current_tokens + sentence.tokens > self.max_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += sentence.tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def chunk(self, pdf_path, start_page=0, metadata=None):
+        """
+        Returns:
+            list: Documents in document order, with page_start/page_end and char_start/char_end in metadata.
+        """
+        try:
+            sentences = self.read_sentences(pdf_path, start_page)
+            if not sentences:
+                return []
+            ends = breakpoints(self.embeddings.embed_documents(self._windows(sentences)), self.percentile)
+
+            documents, start = [], 0
+            for end in ends + [len(sentences) - 1]:
+                for chunk in self._pack(sentences[start:end + 1]):
+                    documents.append(Document(
+                        page_content=" ".join(sentence.text for sentence in chunk),
+                        metadata={
+                            **(metadata or {}),
+                            "page_start": chunk[0].page,
+                            "page_end": chunk[-1].end_page,
+                            "char_start": chunk[0].start,
+                            "char_end": chunk[-1].end,
+                        }
+                    ))
+                start = end + 1
+            logger.info(f"Created {len(documents)} semantic chunks from {pdf_path}")
+            return documents
+        except Exception as e:
+            logger.error(f"Error chunking PDF {pdf_path}: {str(e)}")
+            raise CustomException(e, sys)
@@ -0,0 +1,80 @@
+"""
+Documents built from the legal sources
+
+Shared by the ingestion scripts, the streaming pipeline and the citation resolver, so every
+path builds identical Documents and chunk ids for the same row or article.
+"""
+
+from langchain.schema import Document
+from src.logger import logger
+from src.processing_db.ingestion_manifest import make_chunk_id
+
+
+def row_to_document(table_name, row):
+    """
+    Returns:
+        Document: The row's description as page_content and its other columns as metadata, or None if it has no description.
+    """
+    # Find the column with 'desc' in the name
+    desc_column = None
+    for column in row.keys():
+        if 'desc' in column.lower():
+            desc_column = column
+            break
+    
+    if desc_column is None:
+        logger.warning(f"No description column found in table '{table_name}', skipping row")
+        return None
+    
+    page_content = row[desc_column]
+    
+    if page_content is None:
+        logger.warning(f"Skipping row with None description in table '{table_name}'")
+        return None
+        
+    page_content = str(page_content)
+    
+    metadata = {}
+    for k, v in row.items():
+        if k != desc_column:
+            metadata[k] = str(v) if v is not None else ""
+    
+    metadata['source_table'] = table_name
+    
+    return Document(page_content=page_content, metadata=metadata)
+
+def table_chunk_id(table_name, document):
+    """Deterministic id of a table row: table + section number + content hash."""
+    section = next((v for k, v in document.metadata.items() if k.lower() == "section"), None)
+    return make_chunk_id(f"sql:{table_name}", section, document.page_content)
+
+def item_to_document(item):
+    """
+    Returns:
+        Document: The item's description as page_content and its other fields as metadata, or None if it has none.
+    """
+    if 'description' not in item:
+        logger.warning(f"No 'description' field found in item: {item.get('title', 'unknown')}")
+        return None
+
+    page_content = item['description']
+    
+    # Skip if page_content is None
+    if page_content is None:
+        logger.warning(f"Skipping item with None description: {item.get('title', 'unknown')}")
+        return None
+    
+    # Ensure page_content is a string
+    page_content = str(page_content)
+    
+    # Create metadata from all other fields
+    metadata = {}
+    for k, v in item.items():
+        if k != 'description':
+            metadata[k] = str(v) if v is not None else ""
+    
+    return Document(page_content=page_content, metadata=metadata)
+
+def item_chunk_id(source_name, document):
+    """Deterministic id of a JSON item: source + article number + content hash."""
+    return make_chunk_id(source_name, document.metadata.get("article"), document.page_content)
@@ -1,6 +1,8 @@
 import sys
 from langchain.schema import Document
-from src.processing_db.vectordb_setup import initialize_pinecone, create_vector_store, search_documents
+from src.processing_db.source_documents import row_to_document, table_chunk_id
+from src.processing_db.vectordb_setup import sync_documents
+from src.processing_db.ingestion_manifest import make_chunk_id
 from src.exception import CustomException
 from src.logger import logger 
 from src.processing_db.db_reader import db_manager
@@ -18,34 +20,9 @@ def extract_documents_from_table(table_name, limit=100):
         
         documents = []
         for row in table_data:
-            # Find the column with 'desc' in the name
-            desc_column = None
-            for column in row.keys():
-                if 'desc' in column.lower():
-                    desc_column = column
-                    break
-            
-            if desc_column is None:
-                logger.warning(f"No description column found in table '{table_name}', skipping row")
-                continue
-            
-            page_content = row[desc_column]
-            
-            if page_content is None:
-                logger.warning(f"Skipping row with None description in table '{table_name}'")
-                continue
-                
-            page_content = str(page_content) if page_content is not None else ""
-            
-            metadata = {}
-            for k, v in row.items():
-                if k != desc_column:
-                    metadata[k] = str(v) if v is not None else ""
-            
-            metadata['source_table'] = table_name
-            
-            document = Document(page_content=page_content, metadata=metadata)
-            documents.append(document)
+            document = row_to_document(table_name, row)
+            if document is not None:
+                documents.append(document)
         
         logger.info(f"Created {len(documents)} documents from table '{table_name}'")
         return documents
@@ -80,10 +57,18 @@ def upsert_data(docs=None, metadata_list=None, tables=None, limit_per_table=100)
     Upsert documents to the vector database.
     If docs is provided, use those directly.
     If docs is None, extract documents from the database tables.
+    Only new or changed rows are embedded; rows removed from a fully read table are deleted.
+
+    Returns:
+        dict: Counts of added, deleted and unchanged chunks.
     """
     try:
-        documents = []
-        
+        totals = {"added": 0, "deleted": 0, "unchanged": 0}
+
+        def add_stats(stats):
+            for key in totals:
+                totals[key] += stats[key]
+
         if docs is not None:
             if metadata_list is None:
                 metadata_list = [{"id": str(i), "source": "manual"} for i in range(len(docs))]
@@ -101,27 +86,35 @@ def upsert_data(docs=None, metadata_list=None, tables=None, limit_per_table=100)
                 Document(page_content=doc, metadata=meta)
                 for doc, meta in zip(processed_docs, processed_metadata)
             ]
+            if not documents:
+                logger.warning("No valid documents found to upsert")
+                return None
+
+            ids = [make_chunk_id("manual", doc.metadata.get("id"), doc.page_content) for doc in documents]
+            # Manual batches are partial by nature, never prune on them
+            add_stats(sync_documents("manual", documents, ids, prune=False))
         else:
-            documents = process_all_tables(tables, limit_per_table)
-        
-        if not documents:
-            logger.warning("No valid documents found to upsert")
-            return None
-            
-        initialize_pinecone()
-        vector_store = create_vector_store(documents)
-        
-        logger.info(f"Upserted {len(documents)} documents to vector store.")
-        return vector_store
+            if tables is None:
+                tables = db_manager.get_all_tables()
+
+            for table in tables:
+                documents = extract_documents_from_table(table, limit=limit_per_table)
+                ids = [table_chunk_id(table, doc) for doc in documents]
+                # Rows past the limit weren't read, so only prune tables that were read in full
+                prune = db_manager.count_rows(table) <= limit_per_table
+                add_stats(sync_documents(f"sql:{table}", documents, ids, prune=prune))
+
+        logger.info(f"Upserted documents to vector store: {totals}")
+        return totals
     
     except Exception as e:
-        logger.error(f"Error upserting documents into Pinecone database: {str(e)}")
+        logger.error(f"Error upserting documents into vector database: {str(e)}")
         raise CustomException(e, sys)
 
 if __name__ == "__main__":
     try:
         # Process all tables and upsert to vector store
-        vector_store = upsert_data(tables=None, limit_per_table=999999)
+        stats = upsert_data(tables=None, limit_per_table=999999)
         
         query = "What is the procedure for filing a civil case?"
         results = search_similar_documents(query)
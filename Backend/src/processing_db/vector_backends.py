@@ -0,0 +1,387 @@
+"""
+Vector store backends
+
+create_vector_store/search_documents in vectordb_setup talk to a VectorStoreBackend, so the
+store can be swapped by configuration (VECTOR_BACKEND=pinecone|faiss):
+
+- PineconeBackend (vectordb_setup.py): the managed serverless index
+- FaissBackend (this module): an in-process FAISS index persisted under FAISS_INDEX_DIR,
+  memory-mapped on load. Supports flat (exact), IVF and HNSW indexes; runs fully offline.
+
+Writers call flush() at checkpoints to persist the index; API processes reload it when the
+index-version stamp changes after an ingestion run elsewhere.
+"""
+
+import os
+import sys
+import json
+import uuid
+import atexit
+import sqlite3
+import threading
+import numpy as np
+import faiss
+from langchain.schema import Document
+from src.exception import CustomException
+from src import ARTIFACTS_DIR
+from src.logger import logger
+from src.processing_db.retrieval_cache import read_index_version
+
+FAISS_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", os.path.join(ARTIFACTS_DIR, "faiss_index"))
+# flat | ivf | hnsw
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+FAISS_DIMENSION = int(os.getenv("FAISS_DIMENSION", 768))
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", 1024))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 16))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", 128))
+# HNSW can't remove vectors; flush() rebuilds the graph once deleted vectors exceed this fraction of it
+FAISS_HNSW_REBUILD_FRACTION = float(os.getenv("FAISS_HNSW_REBUILD_FRACTION", 0.2))
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+# An IVF index is only trained once this many vectors exist (up to ~39 per list); smaller corpora stay flat
+FAISS_IVF_MIN_VECTORS = int(os.getenv("FAISS_IVF_MIN_VECTORS", 10000))
+# FAISS samples at most 256 training points per list
+IVF_MAX_TRAINING_POINTS_PER_LIST = 256
+
+
+class VectorStoreBackend:
+    """Interface implemented by every vector store backend."""
+
+    name = "base"
+
+    def connect(self):
+        """Open clients or load the index; called once at startup."""
+        return self
+
+    def health_check(self):
+        return True
+
+    def add_documents(self, documents, ids=None):
+        """
+        Returns:
+            list: Ids of the stored documents.
+        """
+        raise NotImplementedError
+
+    def upsert_embeddings(self, documents, embeddings, ids=None):
+        """
+        Stores documents with precomputed embeddings, replacing existing ids.
+
+        Returns:
+            list: Ids of the stored documents.
+        """
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def flush(self):
+        """Persists buffered writes; writers call it at checkpoints and before bumping the index version."""
+
+    def similarity_search(self, query, k=6):
+        """
+        Returns:
+            list: Top-k Documents for the query.
+        """
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding, k=6):
+        """
+        Returns:
+            list: Top-k Documents for a precomputed query embedding.
+        """
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=6):
+        """
+        Returns:
+            list: Top-k (Document, similarity score) pairs; metadata["id"] holds the stored id.
+        """
+        raise NotImplementedError
+
+    def similarity_search_by_vector_with_score(self, embedding, k=6):
+        """
+        Returns:
+            list: Top-k (Document, similarity score) pairs for a precomputed query embedding.
+        """
+        raise NotImplementedError
+
+
+class FaissBackend(VectorStoreBackend):
+    """
+    Local FAISS index over normalized embeddings (inner product = cosine similarity, as in the Pinecone index).
+    Texts and metadata live in a SQLite docstore next to the index, keyed by FAISS int64 ids.
+    """
+
+    name = "faiss"
+
+    def __init__(self, embedding, index_dir=FAISS_INDEX_DIR, index_type=FAISS_INDEX_TYPE, dimension=FAISS_DIMENSION,
+                 nlist=FAISS_NLIST, nprobe=FAISS_NPROBE, hnsw_m=FAISS_HNSW_M, ef_search=FAISS_HNSW_EF_SEARCH, mmap=FAISS_MMAP):
+        if index_type not in ("flat", "ivf", "hnsw"):
+            raise ValueError(f"Unknown FAISS index type '{index_type}', expected flat, ivf or hnsw")
+        self.embedding = embedding
+        self.index_dir = index_dir
+        self.index_path = os.path.join(index_dir, "index.faiss")
+        self.index_type = index_type
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.mmap = mmap
+        self.index = None
+        self._mmapped = False
+        self._docstore = None
+        # Unsaved changes since the last flush(); a dirty index is never reloaded from disk
+        self._dirty = False
+        self._loaded_version = 0
+        # Vectors still in the index whose docstore rows were deleted (HNSW only)
+        self._tombstones = 0
+        self._lock = threading.RLock()
+
+    def connect(self):
+        with self._lock:
+            if self._docstore is not None:
+                return self
+            try:
+                os.makedirs(self.index_dir, exist_ok=True)
+                self._docstore = sqlite3.connect(os.path.join(self.index_dir, "docstore.db"), check_same_thread=False)
+                # Readers in other processes keep seeing committed rows while a writer is ingesting
+                self._docstore.execute("PRAGMA journal_mode=WAL;")
+                self._docstore.execute("""
+                    CREATE TABLE IF NOT EXISTS documents (
+                        faiss_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        doc_id TEXT UNIQUE NOT NULL,
+                        text TEXT NOT NULL,
+                        metadata TEXT NOT NULL
+                    );
+                """)
+                self._docstore.commit()
+
+                self._load()
+                if self.index is None:
+                    logger.info(f"No FAISS index at {self.index_path}; it will be created on first insert")
+                # Writers that exit without a final flush still persist what they added
+                atexit.register(self.flush)
+                return self
+            except Exception as e:
+                logger.error(f"Error loading FAISS index: {str(e)}")
+                raise CustomException(e, sys)
+
+    def _load(self):
+        """(Re)loads the saved index, recording the index version it corresponds to."""
+        self._loaded_version = read_index_version()
+        if not os.path.exists(self.index_path):
+            return
+        # Memory-mapping keeps start-up instant and lets workers share the index pages
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if self.mmap else 0
+        self.index = faiss.read_index(self.index_path, flags)
+        self._mmapped = bool(flags)
+        self._configure_search()
+        live = self._docstore.execute("SELECT COUNT(*) FROM documents;").fetchone()[0]
+        self._tombstones = max(0, self.index.ntotal - live)
+        logger.info(f"Loaded FAISS {self.index_type} index with {self.index.ntotal} vectors from {self.index_path}")
+
+    def _reload_if_changed(self):
+        """Picks up an index saved by an ingestion run in another process."""
+        if self._dirty:
+            return
+        version = read_index_version()
+        if version != self._loaded_version:
+            with self._lock:
+                if not self._dirty and version != self._loaded_version:
+                    self._load()
+
+    def health_check(self):
+        return self._docstore is not None
+
+    def _build_index(self):
+        if self.index_type == "hnsw":
+            base = faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        else:
+            # IVF starts flat and is trained in flush() once enough vectors exist to sample from
+            base = faiss.IndexFlatIP(self.dimension)
+        self.index = faiss.IndexIDMap2(base)
+        self._tombstones = 0
+        self._configure_search()
+        logger.info(f"Created FAISS {self.index_type} index")
+
+    def _base_index(self):
+        return faiss.downcast_index(self.index.index) if isinstance(self.index, faiss.IndexIDMap2) else self.index
+
+    def _train_ivf(self):
+        """
+        Rebuilds a flat index as IVF once it holds FAISS_IVF_MIN_VECTORS vectors, training the
+        coarse quantizer on a random sample of everything stored rather than on one batch.
+        """
+        if self.index_type != "ivf" or self.index is None or not isinstance(self._base_index(), faiss.IndexFlat):
+            return
+        total = self.index.ntotal
+        if total < FAISS_IVF_MIN_VECTORS:
+            return
+        nlist = max(1, min(self.nlist, total // 39))
+        vectors = self._base_index().reconstruct_n(0, total)
+        ids = faiss.vector_to_array(self.index.id_map)
+        sample_size = min(total, nlist * IVF_MAX_TRAINING_POINTS_PER_LIST)
+        sample = vectors[np.random.RandomState(0).choice(total, sample_size, replace=False)]
+
+        quantizer = faiss.IndexFlatIP(self.dimension)
+        base = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        base.train(sample)
+        index = faiss.IndexIDMap2(base)
+        index.add_with_ids(vectors, ids)
+        # The wrapper doesn't own the Python-side base/quantizer objects; keep them referenced
+        index.referenced_objects = [base, quantizer]
+        self.index = index
+        self._configure_search()
+        logger.info(f"Trained FAISS IVF index with {nlist} lists on {sample_size} of {total} vectors")
+
+    def _compact_hnsw(self):
+        """Rebuilds an HNSW index from its live vectors once deleted ones pass FAISS_HNSW_REBUILD_FRACTION."""
+        if self.index_type != "hnsw" or self.index is None or self._tombstones <= self.index.ntotal * FAISS_HNSW_REBUILD_FRACTION:
+            return
+        total = self.index.ntotal
+        vectors = self._base_index().reconstruct_n(0, total)
+        ids = faiss.vector_to_array(self.index.id_map)
+        live = np.asarray([row[0] for row in self._docstore.execute("SELECT faiss_id FROM documents;")], dtype=np.int64)
+        keep = np.isin(ids, live)
+
+        self._build_index()
+        self.index.add_with_ids(vectors[keep], ids[keep])
+        logger.info(f"Rebuilt FAISS HNSW index without {total - int(keep.sum())} deleted vectors")
+
+    def _configure_search(self):
+        base = self._base_index()
+        if isinstance(base, faiss.IndexIVF):
+            base.nprobe = self.nprobe
+        elif isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = self.ef_search
+
+    def _ensure_writable(self):
+        """Memory-mapped indexes are read-only; load a private copy before mutating."""
+        if self._mmapped:
+            self.index = faiss.read_index(self.index_path)
+            self._mmapped = False
+            self._configure_search()
+
+    def flush(self):
+        """Writes the index file once for everything added or deleted since the last flush."""
+        with self._lock:
+            if not self._dirty or self.index is None:
+                return
+            try:
+                self._train_ivf()
+                self._compact_hnsw()
+                tmp_path = self.index_path + ".tmp"
+                faiss.write_index(self.index, tmp_path)
+                os.replace(tmp_path, self.index_path)
+                self._dirty = False
+                logger.info(f"Saved FAISS index with {self.index.ntotal} vectors to {self.index_path}")
+            except Exception as e:
+                logger.error(f"Error saving FAISS index: {str(e)}")
+                raise CustomException(e, sys)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def add_documents(self, documents, ids=None):
+        embeddings = self.embedding.embed_documents([doc.page_content for doc in documents])
+        return self.upsert_embeddings(documents, embeddings, ids)
+
+    def upsert_embeddings(self, documents, embeddings, ids=None):
+        self.connect()
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in documents]
+        vectors = self._normalize(embeddings)
+
+        with self._lock:
+            try:
+                if self.index is None:
+                    self._build_index()
+                self._ensure_writable()
+
+                # Upsert semantics: a re-added id replaces its previous vector
+                self._remove(ids)
+                faiss_ids = []
+                for doc_id, doc in zip(ids, documents):
+                    cursor = self._docstore.execute(
+                        "INSERT INTO documents (doc_id, text, metadata) VALUES (?, ?, ?);",
+                        (doc_id, doc.page_content, json.dumps(doc.metadata))
+                    )
+                    faiss_ids.append(cursor.lastrowid)
+                self.index.add_with_ids(vectors, np.asarray(faiss_ids, dtype=np.int64))
+                # Docstore rows are committed per batch; the index file is written by flush()
+                self._docstore.commit()
+                self._dirty = True
+                logger.info(f"Added {len(documents)} documents to FAISS index ({self.index.ntotal} total)")
+                return ids
+            except Exception as e:
+                self._docstore.rollback()
+                logger.error(f"Error adding documents to FAISS index: {str(e)}")
+                raise CustomException(e, sys)
+
+    def _remove(self, ids):
+        placeholders = ",".join("?" * len(ids))
+        rows = self._docstore.execute(
+            f"SELECT faiss_id FROM documents WHERE doc_id IN ({placeholders});", list(ids)
+        ).fetchall()
+        if not rows:
+            return
+        faiss_ids = np.asarray([row[0] for row in rows], dtype=np.int64)
+        self._docstore.execute(f"DELETE FROM documents WHERE doc_id IN ({placeholders});", list(ids))
+        try:
+            self.index.remove_ids(faiss_ids)
+        except RuntimeError:
+            # HNSW can't remove vectors; the docstore rows are gone, so searches skip them until flush() compacts
+            self._tombstones += len(faiss_ids)
+
+    def delete(self, ids):
+        self.connect()
+        if not ids or self.index is None:
+            return
+        with self._lock:
+            try:
+                self._ensure_writable()
+                self._remove(list(ids))
+                self._docstore.commit()
+                self._dirty = True
+            except Exception as e:
+                self._docstore.rollback()
+                logger.error(f"Error deleting documents from FAISS index: {str(e)}")
+                raise CustomException(e, sys)
+
+    def similarity_search_with_score(self, query, k=6):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=6):
+        self.connect()
+        self._reload_if_changed()
+        if self.index is None or self.index.ntotal == 0:
+            return []
+        query = self._normalize([embedding])
+        with self._lock:
+            # Over-fetch by the number of deleted HNSW vectors so they can't push live ones out of the top k
+            scores, faiss_ids = self.index.search(query, min(k + self._tombstones, self.index.ntotal))
+            hits = [(int(faiss_id), float(score)) for faiss_id, score in zip(faiss_ids[0], scores[0]) if faiss_id != -1]
+            if not hits:
+                return []
+            placeholders = ",".join("?" * len(hits))
+            rows = {
+                row[0]: row[1:]
+                for row in self._docstore.execute(
+                    f"SELECT faiss_id, doc_id, text, metadata FROM documents WHERE faiss_id IN ({placeholders});",
+                    [faiss_id for faiss_id, _ in hits]
+                )
+            }
+
+        documents = []
+        for faiss_id, score in hits:
+            if faiss_id not in rows:
+                continue
+            doc_id, text, metadata = rows[faiss_id]
+            documents.append((Document(page_content=text, metadata={**json.loads(metadata), "id": doc_id}), score))
+            if len(documents) == k:
+                break
+        return documents
@@ -1,9 +1,21 @@
 import os
 import sys
+import time
+import uuid
+import asyncio
+import threading
 from dotenv import load_dotenv
+import urllib3
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import PineconeProtocolError
 from langchain_pinecone import PineconeVectorStore
 from src.processing_db.gemini_embed import gemini_embeddings
+from src.processing_db.vector_backends import VectorStoreBackend, FaissBackend
+from src.processing_db.ingestion_manifest import ingestion_manifest
+from src.processing_db.lexical_index import lexical_index, fuse_candidates
+from src.processing_db.citation_resolver import citation_resolver, with_citations
+from src.processing_db.retrieval_cache import retrieval_cache, bump_index_version
+from src.processing_db.reranker import RERANKER_BACKEND, chunk_id, CrossEncoderReranker, PineconeReranker, NoopReranker
 from src.exception import CustomException
 from src.logger import logger
 
@@ -12,6 +24,19 @@ load_dotenv()
 # Pinecone
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "senor-2"
+# Seconds between index health checks on the request path
+HEALTH_CHECK_INTERVAL = int(os.getenv("PINECONE_HEALTH_CHECK_INTERVAL", 60))
+# pinecone | faiss
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+# Fuse BM25 hits from the local lexical index with the vector hits
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+# Vectors per Pinecone upsert request (requests are capped at 2MB)
+PINECONE_UPSERT_BATCH_SIZE = int(os.getenv("PINECONE_UPSERT_BATCH_SIZE", 100))
+# Chunks upserted and recorded in the manifest per step, so an interrupted sync resumes where it stopped
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", 500))
+# Batches between checkpoints: the backend flushes its index, then the manifest records the batches.
+# The FAISS backend rewrites its index file on each flush, so checkpoints are kept infrequent.
+CHECKPOINT_BATCHES = int(os.getenv("INGEST_CHECKPOINT_BATCHES", 20))
 
 def initialize_pinecone():
     """Initialize Pinecone client and create index if it doesn't exist."""
@@ -34,70 +59,395 @@ def initialize_pinecone():
         logger.error(f"Error creating Pinecone database: {str(e)}")
         raise CustomException(e, sys)
 
+def is_transient_error(error):
+    """
+    Returns:
+        bool: True for dropped connections, timeouts and 5xx responses, which a reconnect may fix;
+              auth, validation and other 4xx errors would fail again.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, urllib3.exceptions.HTTPError, PineconeProtocolError)):
+        return True
+    status = getattr(error, "status", None)
+    return isinstance(status, int) and status >= 500
+
+
+class PineconeConnection:
+    """
+    Process-wide Pinecone client, index handle and vector store.
+    Created once at startup so queries don't pay for a new client, list_indexes() and vector store on every call.
+    """
+
+    def __init__(self, index_name=INDEX_NAME, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.index_name = index_name
+        self.health_check_interval = health_check_interval
+        self.client = None
+        self.index = None
+        self.vector_store = None
+        self._last_health_check = 0.0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Create the client, index handle and vector store."""
+        with self._lock:
+            try:
+                pc = initialize_pinecone()
+                index = pc.Index(self.index_name)
+                vector_store = PineconeVectorStore(
+                    index=index,
+                    embedding=gemini_embeddings,
+                    text_key="text"
+                )
+                self.client, self.index, self.vector_store = pc, index, vector_store
+                self._last_health_check = time.monotonic()
+                logger.info(f"Pinecone connection to index '{self.index_name}' has been established")
+                return self
+            except Exception as e:
+                logger.error(f"Error connecting to Pinecone index: {str(e)}")
+                raise CustomException(e, sys)
+
+    def close(self):
+        """Drop the current client so the next call reconnects."""
+        with self._lock:
+            self.client = None
+            self.index = None
+            self.vector_store = None
+
+    def reconnect(self):
+        logger.warning("Reconnecting to Pinecone")
+        self.close()
+        return self.connect()
+
+    def is_connected(self):
+        return self.vector_store is not None
+
+    def health_check(self):
+        """
+        Returns:
+            bool: True if the index answers a stats request.
+        """
+        if not self.is_connected():
+            return False
+        try:
+            self.index.describe_index_stats()
+            self._last_health_check = time.monotonic()
+            return True
+        except Exception as e:
+            logger.warning(f"Pinecone health check failed: {str(e)}")
+            return False
+
+    def ensure_connected(self):
+        """Connect lazily and re-check health once the check interval has elapsed."""
+        if not self.is_connected():
+            return self.connect()
+        if time.monotonic() - self._last_health_check > self.health_check_interval and not self.health_check():
+            return self.reconnect()
+        return self
+
+    def run(self, operation):
+        """
+        Runs operation(connection), reconnecting and retrying once if it fails with a transient error.
+        """
+        self.ensure_connected()
+        try:
+            return operation(self)
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+            logger.warning(f"Pinecone operation failed: {str(e)}. Reconnecting and retrying once.")
+            self.reconnect()
+            return operation(self)
+
+
+pinecone_connection = PineconeConnection()
+
+
+class PineconeBackend(VectorStoreBackend):
+    """Pinecone serverless index, reached through the shared PineconeConnection."""
+
+    name = "pinecone"
+
+    def __init__(self, connection=pinecone_connection):
+        self.connection = connection
+
+    def connect(self):
+        self.connection.connect()
+        return self
+
+    def health_check(self):
+        return self.connection.health_check()
+
+    def add_documents(self, documents, ids=None):
+        return self.connection.run(lambda conn: conn.vector_store.add_documents(documents, ids=ids))
+
+    def upsert_embeddings(self, documents, embeddings, ids=None):
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in documents]
+        vectors = [
+            {
+                "id": doc_id,
+                "values": list(embedding),
+                # Same layout as PineconeVectorStore, so search returns these as Documents
+                "metadata": {**doc.metadata, "text": doc.page_content},
+            }
+            for doc_id, doc, embedding in zip(ids, documents, embeddings)
+        ]
+        for start in range(0, len(vectors), PINECONE_UPSERT_BATCH_SIZE):
+            batch = vectors[start:start + PINECONE_UPSERT_BATCH_SIZE]
+            self.connection.run(lambda conn: conn.index.upsert(vectors=batch))
+        return ids
+
+    def delete(self, ids):
+        if ids:
+            self.connection.run(lambda conn: conn.vector_store.delete(ids=list(ids)))
+
+    @staticmethod
+    def _with_ids(results):
+        # langchain-pinecone returns the vector id on Document.id; keep it in metadata like the other backends
+        for doc, _ in results:
+            if getattr(doc, "id", None):
+                doc.metadata["id"] = doc.id
+        return results
+
+    def similarity_search_with_score(self, query, k=6):
+        return self._with_ids(self.connection.run(lambda conn: conn.vector_store.similarity_search_with_score(query, k=k)))
+
+    def similarity_search_by_vector_with_score(self, embedding, k=6):
+        return self._with_ids(self.connection.run(
+            lambda conn: conn.vector_store.similarity_search_by_vector_with_score(embedding, k=k)
+        ))
+
+
+def get_vector_backend(name=VECTOR_BACKEND):
+    """
+    Returns:
+        VectorStoreBackend: The backend selected by VECTOR_BACKEND.
+    """
+    if name == "faiss":
+        return FaissBackend(embedding=gemini_embeddings)
+    if name == "pinecone":
+        return PineconeBackend()
+    raise ValueError(f"Unknown vector backend '{name}', expected pinecone or faiss")
+
+
+vector_backend = get_vector_backend()
+
+
 def create_vector_store(documents=None):
-    """Get or create a vector store."""
+    """
+    Get the configured vector store, adding documents if provided.
+
+    Returns:
+        VectorStoreBackend: The shared backend.
+    """
     try:
-        pc = initialize_pinecone()
-        index = pc.Index(INDEX_NAME)
-        
-        vector_store = PineconeVectorStore(
-            index=index,
-            embedding=gemini_embeddings,
-            text_key="text"
-        )
+        vector_backend.connect()
         
         # If documents are provided, add them to the store
         if documents:
-            vector_store.add_documents(documents)
+            vector_backend.add_documents(documents)
+            vector_backend.flush()
+            # Running API workers drop retrieval results cached before this upsert
+            bump_index_version()
             
-        logger.info("Pinecone index has been initialized and documents have been inserted")
-        return vector_store, pc
+        logger.info(f"{vector_backend.name} index has been initialized and documents have been inserted")
+        return vector_backend
         
     except Exception as e:
-        logger.error(f"Error inserting documents inside Pinecone index: {str(e)}")
+        logger.error(f"Error inserting documents inside {vector_backend.name} index: {str(e)}")
         raise CustomException(e, sys)
 
 
-# Rerank has been implemented, model = bge-reranker-v2-m3, retrieves 6 inital chunks and then re ranks the top 3
-# Facing an error where re ranker doesnt work when token length of the retrieved documents is greater than 1024, hence a fallback mechanism has been implemented where if the error occurs than return first 3 retrieved documents
+def sync_documents(source, documents, ids, prune=True):
+    """
+    Incrementally syncs one source into the vector store using its deterministic chunk ids.
+    Only chunks whose id isn't indexed yet are embedded and upserted; with prune, indexed ids
+    missing from `ids` (deleted or edited chunks) are removed.
+
+    Returns:
+        dict: Counts of added, deleted and unchanged chunks.
+    """
+    try:
+        vector_backend.connect()
+        backend = vector_backend.name
+        new_ids, stale_ids = ingestion_manifest.diff(backend, source, ids, prune=prune)
+        documents_by_id = dict(zip(ids, documents))
+
+        pending = []
+        for start in range(0, len(new_ids), SYNC_BATCH_SIZE):
+            batch_ids = new_ids[start:start + SYNC_BATCH_SIZE]
+            batch_documents = [documents_by_id[chunk_id] for chunk_id in batch_ids]
+            vector_backend.add_documents(batch_documents, ids=batch_ids)
+            lexical_index.upsert(batch_ids, batch_documents)
+            pending.extend(batch_ids)
+            if len(pending) >= SYNC_BATCH_SIZE * CHECKPOINT_BATCHES or start + SYNC_BATCH_SIZE >= len(new_ids):
+                # Only ids the backend has persisted are recorded, so an interrupted sync resumes from here
+                vector_backend.flush()
+                ingestion_manifest.record(backend, source, added_ids=pending)
+                pending = []
+
+        if stale_ids:
+            vector_backend.delete(stale_ids)
+            lexical_index.delete(stale_ids)
+            vector_backend.flush()
+            ingestion_manifest.record(backend, source, deleted_ids=stale_ids)
+
+        if new_ids or stale_ids:
+            bump_index_version()
+
+        stats = {
+            "added": len(new_ids),
+            "deleted": len(stale_ids),
+            "unchanged": len(documents_by_id) - len(new_ids),
+        }
+        logger.info(f"Synced source '{source}' into {backend} index: {stats}")
+        return stats
+
+    except Exception as e:
+        logger.error(f"Error syncing source '{source}' into {vector_backend.name} index: {str(e)}")
+        raise CustomException(e, sys)
+
+
+def get_reranker(name=RERANKER_BACKEND):
+    """
+    Returns:
+        Reranker: The reranker selected by RERANKER_BACKEND.
+    """
+    if name == "cross-encoder":
+        return CrossEncoderReranker()
+    if name == "pinecone":
+        return PineconeReranker(client_provider=lambda: pinecone_connection.ensure_connected().client)
+    if name == "none":
+        return NoopReranker()
+    raise ValueError(f"Unknown reranker '{name}', expected cross-encoder, pinecone or none")
+
+
+reranker = get_reranker()
+
+
+def tag_candidates(results):
+    """
+    Stamps each retrieved (Document, score) pair with its stable id and vector score.
+    A chunk stored twice under the same id is kept once, at its best position.
+
+    Returns:
+        list: Candidate Documents in vector order.
+    """
+    candidates, seen = [], set()
+    for doc, score in results:
+        doc_id = chunk_id(doc)
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        doc.metadata["id"] = doc_id
+        doc.metadata["vector_score"] = float(score)
+        candidates.append(doc)
+    return candidates
+
+
+def lexical_candidates(query, k=6):
+    """
+    Returns:
+        list: Top-k BM25 Documents with lexical_score in metadata; empty when hybrid search is off.
+    """
+    if not HYBRID_SEARCH:
+        return []
+    candidates = []
+    for doc, score in lexical_index.search(query, k):
+        doc.metadata["lexical_score"] = score
+        candidates.append(doc)
+    return candidates
+
+
+# Retrieves initial_k chunks and re-ranks them down to the top final_k.
+def rerank_documents(query, initial_results, final_k=3):
+    """
+    Re-rank retrieved documents with the configured reranker, recording rerank_score in metadata.
+    Fallback: If reranking fails, return top `final_k` from initial retrieval.
+    """
+    if not initial_results:
+        return []
+
+    try:
+        ranked = reranker.rerank(query, initial_results, top_n=final_k)
+        reranked_documents = []
+        for index, score in ranked:
+            doc = initial_results[index]
+            if score is not None:
+                doc.metadata["rerank_score"] = score
+            reranked_documents.append(doc)
+        logger.info(f"Successfully re-ranked {len(reranked_documents)} out of {len(initial_results)} documents with {reranker.name}.")
+        return reranked_documents
+
+    except Exception as rerank_error:
+        logger.warning(f"Reranker failed: {str(rerank_error)}. Falling back to initial retrieval.")
+        return initial_results[:final_k]  # fallback: first N from initial results
+
+
 def search_documents(query, initial_k=6, final_k=3):
     """
-    Search for documents similar to the query with re-ranking using Pinecone's native reranker.
-    Fallback: If reranking fails (e.g., due to token limits), return top `final_k` from initial retrieval.
+    Search the configured vector store for documents similar to the query, fuse them with
+    lexical (BM25) hits, then re-rank them. Repeated queries are answered from the retrieval cache,
+    and provisions cited in the query ("IPC 420", "Article 21") are put first.
     """
     try:
-        vector_store, pc = create_vector_store()
-        
-        retriever = vector_store.as_retriever(search_kwargs={"k": initial_k})
-        initial_results = retriever.invoke(query)
-        
-        documents_for_reranking = [doc.page_content for doc in initial_results]
+        # Provisions cited by number come first; a bare citation lookup needs no retrieval at all
+        citations, exact = citation_resolver.resolve(query)
+        if exact:
+            return citations
 
-        try:
-            rerank_results = pc.inference.rerank(
-                model="bge-reranker-v2-m3",
-                query=query,
-                documents=documents_for_reranking,
-                top_n=final_k,
-                return_documents=True,
-            )
+        if retrieval_cache:
+            cached, index_version = retrieval_cache.get(query, initial_k, final_k)
+            if cached is not None:
+                return with_citations(citations, cached, final_k)
 
-            reranked_documents = []
-            for reranked_item in rerank_results.data:
-                reranked_text = reranked_item['document']['text']
+        start = time.perf_counter()
+        initial_results = fuse_candidates(
+            tag_candidates(vector_backend.similarity_search_with_score(query, k=initial_k)),
+            lexical_candidates(query, initial_k)
+        )
+        results = rerank_documents(query, initial_results, final_k)
+        if retrieval_cache:
+            retrieval_cache.put(query, initial_k, final_k, results, time.perf_counter() - start, index_version)
+        return with_citations(citations, results, final_k)
+
+    except Exception as e:
+        logger.error(f"Error retrieving and re-ranking documents: {str(e)}")
+        raise CustomException(e, sys)
 
-                # Find the matching document in initial results
-                for original_doc in initial_results:
-                    if original_doc.page_content == reranked_text:
-                        reranked_documents.append(original_doc)
-                        break 
 
-            logger.info(f"Successfully re-ranked {final_k} out of {initial_k} documents.")
-            return reranked_documents
+async def asearch_documents(query, initial_k=6, final_k=3):
+    """
+    Async variant of search_documents. The query is embedded with the async Gemini client,
+    while the blocking vector store query and rerank calls run in worker threads.
+    """
+    try:
+        # Provisions cited by number come first; a bare citation lookup needs no retrieval at all
+        citations, exact = citation_resolver.resolve(query)
+        if exact:
+            return citations
 
-        except Exception as rerank_error:
-            logger.warning(f"Reranker failed: {str(rerank_error)}. Falling back to initial retrieval.")
-            return initial_results[:final_k]  # fallback: first N from initial results
+        if retrieval_cache:
+            cached, index_version = retrieval_cache.get(query, initial_k, final_k)
+            if cached is not None:
+                return with_citations(citations, cached, final_k)
+
+        start = time.perf_counter()
+
+        async def vector_candidates():
+            query_embedding = await gemini_embeddings.aembed_query(query)
+            return tag_candidates(
+                await asyncio.to_thread(vector_backend.similarity_search_by_vector_with_score, query_embedding, initial_k)
+            )
+
+        # The local BM25 lookup runs while the query is embedded and sent to the vector store;
+        # gather collects both outcomes, so a failed embedding call never leaves the lookup unawaited
+        vector_results, lexical_results = await asyncio.gather(
+            vector_candidates(), asyncio.to_thread(lexical_candidates, query, initial_k)
+        )
+        initial_results = fuse_candidates(vector_results, lexical_results)
+        results = await asyncio.to_thread(rerank_documents, query, initial_results, final_k)
+        if retrieval_cache:
+            retrieval_cache.put(query, initial_k, final_k, results, time.perf_counter() - start, index_version)
+        return with_citations(citations, results, final_k)
 
     except Exception as e:
         logger.error(f"Error retrieving and re-ranking documents: {str(e)}")
@@ -1,10 +1,52 @@
-def basic_prompt(CHAT_history, RELEVANT_CHUNKS, user_query):
-    system_prompt = f"""
-    <Inputs>
-    CHAT HISTORY - {CHAT_history}
-    RELEVANT_CHUNKS - {RELEVANT_CHUNKS}
-    </Inputs>
+import os
+from src.logger import logger
+from src.token_counter import token_counter
+
+# Token budget for the whole prompt (system + user) sent per request
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 8000))
+# Share of the room left after the template and query that chat history keeps when chunks need it
+PROMPT_HISTORY_SHARE = float(os.getenv("PROMPT_HISTORY_SHARE", 0.25))
 
+_template_tokens = None
+
+
+def template_tokens():
+    """Tokens of the prompt template itself, counted once."""
+    global _template_tokens
+    if _template_tokens is None:
+        _template_tokens = sum(token_counter.count_batch(basic_prompt("", "", "", token_budget=None)))
+    return _template_tokens
+
+
+def fit_to_budget(CHAT_history, RELEVANT_CHUNKS, user_query, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Trims the oldest chat history first, down to PROMPT_HISTORY_SHARE of the room,
+    then the end of RELEVANT_CHUNKS, which holds the least relevant chunks.
+
+    Returns:
+        tuple: (chat history, relevant chunks) that keep the whole prompt within token_budget.
+    """
+    if token_budget is None:
+        return CHAT_history, RELEVANT_CHUNKS
+    room = token_budget - template_tokens() - token_counter.count(user_query)
+    if room > 0 and token_counter.fits([CHAT_history, RELEVANT_CHUNKS], room):
+        return CHAT_history, RELEVANT_CHUNKS
+
+    history_tokens, chunk_tokens = token_counter.count_batch([CHAT_history, RELEVANT_CHUNKS])
+    history_room = max(room - chunk_tokens, min(history_tokens, int(room * PROMPT_HISTORY_SHARE)))
+    chunk_room = room - min(history_tokens, history_room)
+    logger.warning(
+        f"Prompt over budget ({token_budget} tokens): history {history_tokens} -> {max(0, min(history_tokens, history_room))}, "
+        f"chunks {chunk_tokens} -> {max(0, min(chunk_tokens, chunk_room))}"
+    )
+    return (
+        token_counter.truncate(CHAT_history, history_room, keep_end=True),
+        token_counter.truncate(RELEVANT_CHUNKS, chunk_room),
+    )
+
+
+# Static prefix: identical on every call, so the provider can cache it (see LLM_setup/prompt_cache.py)
+SYSTEM_PROMPT = """
     <Instructions>
     You are an AI legal assistant named Senor. You are provided with:
 
@@ -55,28 +97,25 @@ def basic_prompt(CHAT_history, RELEVANT_CHUNKS, user_query):
     
     </Instructions>
     """
+
+
+def basic_prompt(CHAT_history, RELEVANT_CHUNKS, user_query, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Returns:
+        tuple: (SYSTEM_PROMPT, user prompt carrying this request's history, chunks and query).
+    """
+    CHAT_history, RELEVANT_CHUNKS = fit_to_budget(CHAT_history, RELEVANT_CHUNKS, user_query, token_budget)
     user_prompt = f"""
+    <Inputs>
+    CHAT HISTORY - {CHAT_history}
+    RELEVANT_CHUNKS - {RELEVANT_CHUNKS}
+    </Inputs>
+
     <Input>
     User query - {user_query}
     </Input>
-    
-    <Instruction>
-    You are an AI legal assistant named Senor.
-    Your goal is to provide a detailed, user-friendly response to address the legal issue raised User query, utilizing information from the relevant document chunks.
-    
-    Your answer should:
-    - Be extremely detailed and descriptive, explaining complex legal terms/concepts in simple language
-    - Directly utilize evidence from the relevant document chunks to justify your advice
-    - Break down your response into clear step-by-step points when possible
-    - Aim to provide enough information for the user to understand next steps for their legal situation
-    
-    However, if the user's query cannot be satisfactorily answered based on the given chat history and document chunks, simply respond:
-    <answer><additional>I'm afraid I do not have enough relevant information to provide legal advice for your query. Please rephrase your question or provide additional context.</additional></answer>
 
-    Additionally, if the user asks a question completely unrelated to legal matters, respond:
-    <answer>I'm an AI assistant focused on providing legal information and advice. I do not have the capability to answer queries outside of the legal domain.</answer>
-    
-    </Instruction>
+    Answer the user query following your instructions, using the chat history and relevant chunks above.
     """
-    
-    return system_prompt , user_prompt
\ No newline at end of file
+
+    return SYSTEM_PROMPT, user_prompt
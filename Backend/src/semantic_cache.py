@@ -0,0 +1,143 @@
+"""
+Semantic answer cache
+
+/chat answers a new conversation's opening query from this cache when an earlier query's
+embedding is at least SEMANTIC_CACHE_THRESHOLD cosine-similar to it, skipping retrieval
+and Gemini. Query embeddings live in an in-memory FAISS inner-product index over normalized
+vectors; entries expire after a TTL and the least recently used one is evicted at capacity.
+
+Only opening queries are cached: later turns depend on the conversation so far. Like the
+retrieval cache, the whole cache is dropped when ingestion bumps the index-version stamp,
+since cached answers were generated from the old chunks.
+"""
+
+import os
+import time
+import threading
+import numpy as np
+import faiss
+from src.logger import logger
+from src.processing_db.retrieval_cache import INDEX_VERSION_PATH, read_index_version
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Minimum cosine similarity between query embeddings for a hit
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 5000))
+# Seconds a cached answer stays valid
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 86400))
+SEMANTIC_CACHE_DIMENSION = int(os.getenv("SEMANTIC_CACHE_DIMENSION", 768))
+# Neighbours checked per lookup, so an expired nearest entry doesn't hide a valid one
+SEARCH_DEPTH = 4
+
+
+class SemanticAnswerCache:
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_SIZE, ttl=SEMANTIC_CACHE_TTL, dimension=SEMANTIC_CACHE_DIMENSION,
+                 version_path=INDEX_VERSION_PATH):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_path = version_path
+        # Index version the cached answers were generated against
+        self._version = read_index_version(version_path)
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        # id -> {"query", "answer", "created", "last_access"}
+        self._entries = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray([embedding], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _check_version(self):
+        """Drops every entry once the index has changed; the caller holds the lock."""
+        version = read_index_version(self.version_path)
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Index version changed, dropping {len(self._entries)} semantic cache entries")
+            self.index.reset()
+            self._entries.clear()
+            self._version = version
+
+    def _remove(self, entry_ids):
+        self.index.remove_ids(np.asarray(entry_ids, dtype=np.int64))
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+
+    def get(self, embedding):
+        """
+        Returns:
+            tuple: (cached answer payload, matched query, similarity), or None on a miss.
+        """
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            if self.index.ntotal:
+                scores, entry_ids = self.index.search(vector, min(SEARCH_DEPTH, self.index.ntotal))
+                expired = []
+                for score, entry_id in zip(scores[0], entry_ids[0]):
+                    if entry_id == -1 or score < self.threshold:
+                        break
+                    entry = self._entries[int(entry_id)]
+                    if now - entry["created"] > self.ttl:
+                        expired.append(int(entry_id))
+                        continue
+                    entry["last_access"] = now
+                    self._hits += 1
+                    if expired:
+                        self._remove(expired)
+                    return entry["answer"], entry["query"], float(score)
+                if expired:
+                    self._remove(expired)
+            self._misses += 1
+            return None
+
+    def put(self, query, embedding, answer):
+        """Caches an answer payload under its query embedding."""
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            if len(self._entries) >= self.max_entries:
+                self._evict(now)
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(vector, np.asarray([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {"query": query, "answer": answer, "created": now, "last_access": now}
+
+    def _evict(self, now):
+        # Expired entries go first; otherwise make room by dropping the least recently used one
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry["created"] > self.ttl]
+        if not expired:
+            expired = [min(self._entries, key=lambda entry_id: self._entries[entry_id]["last_access"])]
+        self._remove(expired)
+        self._evictions += len(expired)
+        logger.info(f"Evicted {len(expired)} entries from semantic answer cache")
+
+    def clear(self):
+        with self._lock:
+            self.index.reset()
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+semantic_cache = SemanticAnswerCache() if SEMANTIC_CACHE_ENABLED else None
@@ -0,0 +1,119 @@
+"""
+Token counting service
+
+Loads the tiktoken encoding once per process and shares it across callers: chunk splitting
+at ingestion, history summarization checks and prompt budgeting on every request. Batches
+are encoded with tiktoken's threaded encode_batch. approximate() estimates from character
+length without encoding, for checks that are nowhere near a limit.
+
+If the encoding can't be loaded (tiktoken downloads it on first use), counts fall back to
+whitespace-separated words.
+"""
+
+import os
+import math
+import threading
+import tiktoken
+from src.logger import logger
+
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+TOKEN_COUNT_THREADS = int(os.getenv("TOKEN_COUNT_THREADS", 4))
+# Characters per token assumed by approximate counts; cl100k_base averages about 4 on English text
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", 4.0))
+
+
+class TokenCounter:
+
+    def __init__(self, encoding_name=TOKENIZER_ENCODING, num_threads=TOKEN_COUNT_THREADS, chars_per_token=CHARS_PER_TOKEN):
+        self.encoding_name = encoding_name
+        self.num_threads = num_threads
+        self.chars_per_token = chars_per_token
+        self._encoding = None
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        """The tiktoken encoding, or None when it can't be loaded."""
+        if self._encoding is None:
+            with self._lock:
+                if self._encoding is None:
+                    try:
+                        self._encoding = tiktoken.get_encoding(self.encoding_name)
+                    except Exception as e:
+                        logger.warning(f"Tokenizer '{self.encoding_name}' unavailable, counting words instead: {str(e)}")
+                        self._encoding = False
+        return self._encoding or None
+
+    def encode(self, text):
+        """
+        Returns:
+            list: Token ids, or words when the encoding is unavailable.
+        """
+        encoding = self.encoding
+        # User text may contain strings like "<|endoftext|>"; count them as plain text
+        return encoding.encode(text, disallowed_special=()) if encoding else text.split()
+
+    def decode(self, tokens):
+        encoding = self.encoding
+        return encoding.decode(tokens) if encoding else " ".join(tokens)
+
+    def approximate(self, text):
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count(self, text, approximate=False):
+        if not text:
+            return 0
+        return self.approximate(text) if approximate else len(self.encode(text))
+
+    def count_batch(self, texts, approximate=False):
+        """
+        Returns:
+            list: Token count of each text, encoded across TOKEN_COUNT_THREADS threads.
+        """
+        texts = list(texts)
+        encoding = self.encoding
+        if approximate:
+            return [self.approximate(text) for text in texts]
+        if encoding is None:
+            return [len(text.split()) for text in texts]
+        tokens = encoding.encode_batch(texts, num_threads=self.num_threads, disallowed_special=())
+        return [len(ids) for ids in tokens]
+
+    def fits(self, texts, budget):
+        """
+        Returns:
+            bool: Whether the texts together fit in budget tokens; texts are only encoded when they might not.
+        """
+        texts = list(texts)
+        # Every token (or word) spans at least one UTF-8 byte, so the byte length is an upper bound.
+        # An average-based estimate isn't: digits or short words run well under CHARS_PER_TOKEN.
+        if sum(len(text.encode("utf-8")) for text in texts) <= budget:
+            return True
+        return sum(self.count_batch(texts)) <= budget
+
+    def truncate(self, text, max_tokens, keep_end=False):
+        """
+        Returns:
+            str: The first max_tokens tokens of text, or the last ones with keep_end.
+        """
+        if max_tokens <= 0:
+            return ""
+        tokens = self.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return self.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
+
+    def split(self, text, max_tokens, overlap=0):
+        """
+        Returns:
+            list: Windows of at most max_tokens tokens, consecutive windows sharing overlap tokens.
+        """
+        tokens = self.encode(text)
+        if not tokens:
+            return []
+        step = max(1, max_tokens - overlap)
+        # Stop once a window reaches the end, so the last one isn't just overlap
+        return [self.decode(tokens[start:start + max_tokens]) for start in range(0, max(1, len(tokens) - overlap), step)]
+
+
+token_counter = TokenCounter()
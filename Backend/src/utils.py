@@ -3,9 +3,9 @@ import sys
 import sqlite3
 from src.exception import CustomException
 from src.logger import logger
-import fitz
-from src.processing_db.vectordb_setup import search_documents
-import tiktoken
+from src.processing_db.pdf_reader import iter_pdf_pages
+from src.processing_db.vectordb_setup import search_documents, asearch_documents
+from src.token_counter import token_counter
 
 def search_similar_documents(query):
     """
@@ -20,6 +20,19 @@ def search_similar_documents(query):
         logger.error(f"Error searching documents in Pinecone database: {str(e)}")
         raise CustomException(e, sys)
 
+async def asearch_similar_documents(query):
+    """
+    Returns:
+        list: Top k similar documents, retrieved without blocking the event loop
+    """
+    try:
+        results = await asearch_documents(query)
+        logger.info(f"Response has been retrieved")
+        return results
+    except Exception as e:
+        logger.error(f"Error searching documents in Pinecone database: {str(e)}")
+        raise CustomException(e, sys)
+
 def display_results(results):
     """Display search results"""
     print(f"Found {len(results)} relevant documents:")
@@ -33,16 +46,7 @@ def read_pdf_to_string(path,start = 0):
     Returns:
         str: The concatenated text content of all pages in the PDF document.
     """
-    doc = fitz.open(path)
-    content = ""
-    for page_num in range(start,len(doc)):
-        page = doc[page_num]
-        content += page.get_text()
-    return content
+    return "".join(text for _, text in iter_pdf_pages(path, start))
 
 def get_token_count(text: str) -> int:
-    try:
-        enc = tiktoken.get_encoding("cl100k_base")
-        return len(enc.encode(text))
-    except Exception:
-        return len(text.split())
\ No newline at end of file
+    return token_counter.count(text)
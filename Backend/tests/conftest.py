@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import fitz
+import pytest
+
+# Artifact paths are read from the environment at import time; keep test runs out of the real artifacts/
+_ARTIFACTS = tempfile.mkdtemp(prefix="senor-tests-")
+os.environ.setdefault("INDEX_VERSION_PATH", os.path.join(_ARTIFACTS, "index_version"))
+os.environ.setdefault("FAISS_INDEX_DIR", os.path.join(_ARTIFACTS, "faiss_index"))
+os.environ.setdefault("LEXICAL_INDEX_PATH", os.path.join(_ARTIFACTS, "lexical_index.db"))
+os.environ.setdefault("INGESTION_MANIFEST_PATH", os.path.join(_ARTIFACTS, "ingestion_manifest.db"))
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(_ARTIFACTS, "embedding_cache.db"))
+os.environ.setdefault("EVAL_QUEUE_PATH", os.path.join(_ARTIFACTS, "eval_queue.db"))
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Writes a PDF with one page per text and returns its path."""
+    def make(pages, name="document.pdf"):
+        path = str(tmp_path / name)
+        with fitz.open() as doc:
+            for text in pages:
+                doc.new_page().insert_textbox(fitz.Rect(72, 72, 540, 770), text, fontsize=10)
+            doc.save(path)
+        return path
+    return make
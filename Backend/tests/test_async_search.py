@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from langchain.schema import Document
+
+from src.exception import CustomException
+from src.processing_db import vectordb_setup
+
+
+class FakeEmbeddings:
+
+    def __init__(self, error=None):
+        self.error = error
+
+    async def aembed_query(self, query):
+        if self.error:
+            raise self.error
+        return [1.0, 0.0]
+
+
+class FakeBackend:
+
+    def similarity_search_by_vector_with_score(self, embedding, k=6):
+        return [(Document(page_content="vector hit", metadata={"id": "v1"}), 0.9)]
+
+
+@pytest.fixture
+def search(monkeypatch):
+    lexical_calls = []
+
+    def lexical_candidates(query, k=6):
+        lexical_calls.append(query)
+        return [Document(page_content="lexical hit", metadata={"id": "l1", "lexical_score": 3.0})]
+
+    monkeypatch.setattr(vectordb_setup, "retrieval_cache", None)
+    monkeypatch.setattr(vectordb_setup.citation_resolver, "resolve", lambda query: ([], False))
+    monkeypatch.setattr(vectordb_setup, "vector_backend", FakeBackend())
+    monkeypatch.setattr(vectordb_setup, "lexical_candidates", lexical_candidates)
+    monkeypatch.setattr(vectordb_setup, "rerank_documents", lambda query, results, final_k: results[:final_k])
+    return lexical_calls
+
+
+def test_vector_and_lexical_hits_are_fused(search, monkeypatch):
+    monkeypatch.setattr(vectordb_setup, "gemini_embeddings", FakeEmbeddings())
+
+    results = asyncio.run(vectordb_setup.asearch_documents("cheating", initial_k=4, final_k=2))
+
+    assert sorted(doc.metadata["id"] for doc in results) == ["l1", "v1"]
+
+
+def test_failed_embedding_leaves_no_task_behind(search, monkeypatch):
+    monkeypatch.setattr(vectordb_setup, "gemini_embeddings", FakeEmbeddings(TimeoutError("embedding timed out")))
+
+    async def run():
+        with pytest.raises(CustomException):
+            await vectordb_setup.asearch_documents("cheating")
+        # Let the lexical lookup finish; its result was collected by gather, not orphaned
+        await asyncio.sleep(0.1)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    loop = asyncio.new_event_loop()
+    unretrieved = []
+    loop.set_exception_handler(lambda loop, context: unretrieved.append(context))
+    try:
+        assert loop.run_until_complete(run()) == []
+    finally:
+        loop.close()
+    assert unretrieved == []
+    assert search == ["cheating"]
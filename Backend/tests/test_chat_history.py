@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src import chat_history_manager
+from src.chat_history_manager import ChatHistoryManager, SessionHistoryStore, SQLiteHistoryBackend
+from src.LLM_setup import LLM_call
+
+
+def turn(i):
+    return {"user": f"question {i}", "system": f"answer {i}"}
+
+
+def add_turns(history, start, end):
+    for i in range(start, end):
+        history.add(**turn(i))
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteHistoryBackend(str(tmp_path / "history.db"))
+
+
+@pytest.mark.parametrize("use_backend", [False, True])
+def test_fold_keeps_turns_added_while_summarizing(use_backend, backend):
+    history = ChatHistoryManager("s", max_turns=20, backend=backend if use_backend else None)
+    add_turns(history, 0, 4)
+    folded, offset = history.snapshot()
+
+    add_turns(history, 4, 6)
+    history.fold("summary of 0-3", folded, offset)
+
+    assert history.get() == [turn(4), turn(5)]
+    assert history.get_summary() == "summary of 0-3"
+    assert history.offset == 4
+
+
+def test_fold_removes_by_position_not_equality():
+    history = ChatHistoryManager("s", max_turns=20)
+    history.add("hi", "hello")
+    folded, offset = history.snapshot()
+    history.add("hi", "hello")
+
+    history.fold("greeted", folded, offset)
+
+    assert history.get() == [{"user": "hi", "system": "hello"}]
+
+
+def test_fold_after_turns_were_dropped_by_max_turns():
+    history = ChatHistoryManager("s", max_turns=3)
+    add_turns(history, 0, 3)
+    folded, offset = history.snapshot()
+
+    # Drops turns 0 and 1 from the front while the summary is being generated
+    add_turns(history, 3, 5)
+    history.fold("summary", folded, offset)
+
+    assert history.get() == [turn(3), turn(4)]
+    assert history.offset == 3
+
+
+def test_sqlite_history_is_shared_and_reloaded(backend):
+    first = ChatHistoryManager("s", max_turns=20, backend=backend)
+    second = ChatHistoryManager("s", max_turns=20, backend=backend)
+
+    first.add(**turn(0))
+    second.add(**turn(1))
+    first.refresh()
+    folded, offset = first.snapshot()
+    second.add(**turn(2))
+    first.fold("summary", folded, offset)
+
+    reloaded = ChatHistoryManager("s", max_turns=20, backend=SQLiteHistoryBackend(backend.db_path))
+    assert reloaded.get() == [turn(2)]
+    assert reloaded.get_summary() == "summary"
+    assert reloaded.offset == 2
+    second.refresh()
+    assert second.get() == [turn(2)]
+
+
+def test_other_sessions_are_untouched(backend):
+    ChatHistoryManager("a", backend=backend).add(**turn(0))
+    ChatHistoryManager("b", backend=backend).clear()
+
+    assert ChatHistoryManager("a", backend=backend).get() == [turn(0)]
+
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(chat_history_manager.time, "monotonic", lambda: now[0])
+    store = SessionHistoryStore(max_sessions=10, idle_ttl=60)
+    store.session("idle").add(**turn(0))
+    now[0] += 30
+    store.session("active")
+
+    now[0] += 40
+    store.session("active")
+
+    assert len(store) == 1
+    assert store.session("idle").get() == []
+
+
+def test_least_recently_used_session_is_evicted_at_capacity():
+    store = SessionHistoryStore(max_sessions=2, idle_ttl=3600)
+    store.session("a").add(**turn(0))
+    store.session("b")
+    store.session("a")
+
+    store.session("c")
+
+    assert len(store) == 2
+    assert store.session("a").get() == [turn(0)]
+
+
+def test_evicted_session_is_reloaded_from_the_backend(backend):
+    store = SessionHistoryStore(max_sessions=1, backend=backend)
+    store.session("a").add(**turn(0))
+    store.session("b")
+
+    assert store.session("a").get() == [turn(0)]
+
+
+@pytest.fixture
+def summarize_always(monkeypatch):
+    monkeypatch.setattr(LLM_call, "HISTORY_TOKEN_BUDGET", 0)
+
+
+@pytest.mark.parametrize("keep, folded_count", [(2, 3), (0, 5), (10, None)])
+def test_start_summary_keeps_recent_turns(summarize_always, monkeypatch, keep, folded_count):
+    monkeypatch.setattr(LLM_call, "KEEP_RECENT_TURNS", keep)
+    history = ChatHistoryManager("s")
+    add_turns(history, 0, 5)
+
+    started = LLM_call.start_summary(history)
+
+    if folded_count is None:
+        assert started is None
+    else:
+        assert started == ([turn(i) for i in range(folded_count)], 0)
+        assert LLM_call.start_summary(history) is None
+
+
+def test_background_summary_keeps_turns_added_meanwhile(summarize_always, monkeypatch):
+    monkeypatch.setattr(LLM_call, "KEEP_RECENT_TURNS", 1)
+    store = SessionHistoryStore()
+    monkeypatch.setattr(LLM_call, "history_store", store)
+    history = store.session("s")
+    add_turns(history, 0, 3)
+
+    class FakeSummaryModel:
+        async def agenerate_response(self, system_prompt, user_prompt):
+            # A new chat turn lands while Gemini is summarizing
+            history.add(**turn(3))
+            return AIMessage(content="<summary>turns 0 and 1</summary>")
+
+    monkeypatch.setattr(LLM_call.model_registry, "get", lambda name: FakeSummaryModel())
+
+    asyncio.run(LLM_call.asummarize_history("s"))
+
+    assert history.get_summary() == "turns 0 and 1"
+    assert history.get() == [turn(2), turn(3)]
+    assert not history.summarizing
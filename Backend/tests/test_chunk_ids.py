@@ -0,0 +1,64 @@
+import pytest
+
+from src.processing_db.ingestion_manifest import IngestionManifest, make_chunk_id
+from src.processing_db.source_documents import row_to_document, table_chunk_id, item_to_document, item_chunk_id
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IngestionManifest(str(tmp_path / "manifest.db"))
+
+
+def test_chunk_id_depends_only_on_source_key_and_text():
+    first = make_chunk_id("sql:IPC", "420", "Cheating and dishonestly inducing delivery of property.")
+
+    assert first == make_chunk_id("sql:IPC", "420", "Cheating and dishonestly inducing delivery of property.")
+    assert first.startswith("sql:IPC:420:")
+    assert first != make_chunk_id("sql:IPC", "420", "Cheating, as amended.")
+    assert first != make_chunk_id("sql:IEA", "420", "Cheating and dishonestly inducing delivery of property.")
+
+
+def test_chunk_without_key_is_identified_by_its_text():
+    assert make_chunk_id("pdf:consumer_act", None, "text") == make_chunk_id("pdf:consumer_act", "", "text")
+    assert make_chunk_id("pdf:consumer_act", None, "text").count(":") == 2
+
+
+def test_table_rows_get_the_same_id_on_every_read():
+    row = {"Section": "302", "section_title": "Punishment for murder", "section_desc": "Whoever commits murder..."}
+
+    ids = {table_chunk_id("IPC", row_to_document("IPC", dict(row))) for _ in range(3)}
+
+    assert len(ids) == 1
+    assert ids.pop().startswith("sql:IPC:302:")
+
+
+def test_json_items_are_keyed_by_article():
+    document = item_to_document({"article": "21", "title": "Protection of life", "description": "No person shall be deprived..."})
+
+    assert item_chunk_id("json:constitution_of_india", document).startswith("json:constitution_of_india:21:")
+
+
+def test_diff_only_returns_new_or_edited_chunks(manifest):
+    manifest.record("faiss", "sql:IPC", added_ids=["a", "b", "c"])
+
+    new_ids, stale_ids = manifest.diff("faiss", "sql:IPC", ["a", "b2", "c", "b2"])
+
+    assert new_ids == ["b2"]
+    assert stale_ids == ["b"]
+
+
+def test_diff_without_prune_keeps_unseen_chunks(manifest):
+    manifest.record("faiss", "sql:IPC", added_ids=["a", "b"])
+
+    assert manifest.diff("faiss", "sql:IPC", ["a"], prune=False) == ([], [])
+
+
+def test_manifest_is_tracked_per_backend_and_source(manifest):
+    manifest.record("faiss", "sql:IPC", added_ids=["a", "b"])
+    manifest.record("pinecone", "sql:IPC", added_ids=["a"])
+    manifest.record("faiss", "json:constitution_of_india", added_ids=["x"])
+    manifest.record("faiss", "sql:IPC", deleted_ids=["b"])
+
+    assert manifest.indexed_ids("faiss", "sql:IPC") == {"a"}
+    assert manifest.sources("faiss") == {"sql:IPC": 1, "json:constitution_of_india": 1}
+    assert manifest.diff("pinecone", "sql:IPC", ["a", "b"]) == (["b"], [])
@@ -0,0 +1,83 @@
+import json
+import sqlite3
+
+import pytest
+from langchain.schema import Document
+
+from src.processing_db.citation_resolver import CitationResolver, with_citations
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    db_path = tmp_path / "law.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IPC (section TEXT, section_title TEXT, section_desc TEXT);")
+    conn.executemany("INSERT INTO IPC VALUES (?, ?, ?);", [
+        ("420", "Cheating", "Whoever cheats and thereby dishonestly induces..."),
+        ("498A", "Cruelty by husband", "Whoever, being the husband..."),
+    ])
+    conn.execute("CREATE TABLE CRPC (section TEXT, section_title TEXT, section_desc TEXT);")
+    conn.execute("INSERT INTO CRPC VALUES ('125', 'Maintenance', 'If any person having sufficient means...');")
+    conn.commit()
+    conn.close()
+    constitution_path = tmp_path / "constitution.json"
+    constitution_path.write_text(json.dumps([{"article": "21", "title": "Protection of life", "description": "No person shall be deprived..."}]))
+    return CitationResolver(str(db_path), str(constitution_path))
+
+
+@pytest.mark.parametrize("query, citations", [
+    ("IPC 420", [("IPC", "420")]),
+    ("Section 125 CrPC", [("CRPC", "125")]),
+    ("What does Cr.P.C. s. 125 say?", [("CRPC", "125")]),
+    ("arrested u/s 498a of the IPC", [("IPC", "498A")]),
+    ("Article 21 and art 14", [("CONSTITUTION", "21"), ("CONSTITUTION", "14")]),
+    ("section 302 of the indian penal code", [("IPC", "302")]),
+    ("how do I file a consumer complaint", []),
+])
+def test_find_detects_citations(query, citations):
+    assert CitationResolver.find(query)[0] == citations
+
+
+def test_bare_citation_resolves_exactly(resolver):
+    documents, exact = resolver.resolve("what is section 420 of IPC?")
+
+    assert exact
+    assert [doc.metadata["citation"] for doc in documents] == ["IPC 420"]
+    assert documents[0].page_content.startswith("Whoever cheats")
+    assert documents[0].metadata["id"].startswith("sql:IPC:420:")
+
+
+def test_citation_with_a_question_is_not_exact(resolver):
+    documents, exact = resolver.resolve("Can I get bail under IPC 498A?")
+
+    assert [doc.metadata["citation"] for doc in documents] == ["IPC 498A"]
+    assert not exact
+
+
+def test_unknown_section_is_not_exact(resolver):
+    documents, exact = resolver.resolve("IPC 420 and IPC 9999")
+
+    assert [doc.metadata["citation"] for doc in documents] == ["IPC 420"]
+    assert not exact
+
+
+def test_articles_resolve_from_the_constitution(resolver):
+    documents, exact = resolver.resolve("Article 21")
+
+    assert exact
+    assert documents[0].metadata["citation"] == "Article 21"
+
+
+def test_resolved_documents_are_copies(resolver):
+    documents, _ = resolver.resolve("IPC 420")
+    documents[0].metadata["rerank_score"] = 1.0
+
+    assert "rerank_score" not in resolver.resolve("IPC 420")[0][0].metadata
+
+
+def test_with_citations_puts_cited_provisions_first_without_duplicates():
+    cited = [Document(page_content="420", metadata={"id": "ipc-420"})]
+    results = [Document(page_content=text, metadata={"id": doc_id}) for doc_id, text in [("ipc-420", "420"), ("ipc-415", "415"), ("ipc-417", "417")]]
+
+    assert [doc.metadata["id"] for doc in with_citations(cited, results, final_k=2)] == ["ipc-420", "ipc-415"]
+    assert with_citations([], results, final_k=2) is results
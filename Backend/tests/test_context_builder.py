@@ -0,0 +1,72 @@
+from langchain.schema import Document
+
+from src.context_builder import assemble_context, relevance_order, overlap_length, MIN_PARTIAL_TOKENS
+from src.token_counter import token_counter
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def doc(text, **metadata):
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_citations_first_then_rerank_score():
+    documents = [doc("a", rerank_score=0.2), doc("b", rerank_score=0.9), doc("c", citation="IPC 420", rerank_score=0.1)]
+
+    assert [d.page_content for d in relevance_order(documents)] == ["c", "b", "a"]
+
+
+def test_unscored_documents_keep_retrieval_order():
+    # NoopReranker leaves documents unscored; older cache entries may still hold None
+    documents = [doc("a", rerank_score=None), doc("b"), doc("c", rerank_score=0.5)]
+
+    assert [d.page_content for d in relevance_order(documents)] == ["c", "a", "b"]
+
+
+def test_overlap_needs_a_minimum_run_of_words():
+    head = words("w", 30).split()
+
+    assert overlap_length(head, head[-10:] + ["next"]) == 10
+    assert overlap_length(head, head[-3:] + ["next"]) == 0
+
+
+def test_split_overlap_is_removed_in_either_order():
+    first = words("w", 60)
+    second = " ".join(first.split()[-12:] + words("x", 40).split())
+
+    for documents in ([doc(first), doc(second)], [doc(second), doc(first)]):
+        context = assemble_context(documents, token_budget=10000)
+        assert all(context.count(word) == 1 for word in first.split()[-12:])
+        assert "w0" in context and "x39" in context
+
+
+def test_near_duplicates_are_dropped():
+    text = words("w", 200)
+    near_copy = text.replace("w100 ", "changed ")
+
+    context = assemble_context([doc(text, rerank_score=0.9), doc(near_copy, rerank_score=0.8)], token_budget=10000)
+
+    assert context == text
+
+
+def test_line_breaks_are_kept():
+    text = "Section 420.\nCheating and dishonestly inducing delivery of property.\n\nPunishment: seven years."
+
+    assert assemble_context([doc(text)], token_budget=10000) == text
+
+
+def test_context_fits_the_token_budget():
+    documents = [doc(words(f"d{i}x", 300), rerank_score=1.0 - i / 10) for i in range(5)]
+    budget = token_counter.count(documents[0].page_content) + MIN_PARTIAL_TOKENS + 20
+
+    context = assemble_context(documents, token_budget=budget)
+
+    assert token_counter.count(context) <= budget + 1
+    assert context.startswith(documents[0].page_content)
+    assert "d1x0" in context and "d2x0" not in context
+
+
+def test_empty_documents_are_skipped():
+    assert assemble_context([doc("   "), doc("")]) == ""
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+
+from src.exception import CustomException
+from src.processing_db.db_reader import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "law.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sections (section TEXT, description TEXT);")
+    conn.executemany("INSERT INTO sections VALUES (?, ?);", [(str(i), f"Section {i}") for i in range(1, 101)])
+    # Gaps in the rowid sequence must not lose or duplicate rows
+    conn.execute("DELETE FROM sections WHERE rowid IN (10, 11, 12, 50);")
+    conn.execute("CREATE TABLE empty (section TEXT);")
+    conn.commit()
+    conn.close()
+    return DatabaseManager(str(path))
+
+
+def sections(rows):
+    return [row["section"] for row in rows]
+
+
+def test_iter_batches_pages_through_the_whole_table(db):
+    batches = list(db.iter_batches("sections", batch_size=7))
+
+    assert all(len(batch) <= 7 for batch in batches)
+    assert sections(row for batch in batches for row in batch) == [str(i) for i in range(1, 101) if i not in (10, 11, 12, 50)]
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7, 96, 500])
+def test_shards_cover_every_row_exactly_once(db, shards):
+    ranges = db.shard_ranges("sections", shards)
+
+    rows = [row for start, end in ranges for row in db.iter_rows("sections", 5, start, end)]
+
+    assert len(ranges) == min(shards, 100)
+    assert sections(rows) == sections(db.iter_rows("sections"))
+
+
+def test_shard_ranges_are_contiguous(db):
+    ranges = db.shard_ranges("sections", 4)
+
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == 100
+    assert all(ranges[i][1] == ranges[i + 1][0] for i in range(len(ranges) - 1))
+
+
+def test_empty_table_has_a_single_unbounded_shard(db):
+    assert db.shard_ranges("empty", 4) == [(None, None)]
+    assert list(db.iter_rows("empty")) == []
+
+
+def test_unknown_table_is_rejected(db):
+    with pytest.raises(CustomException):
+        db.shard_ranges("sections; DROP TABLE sections", 2)
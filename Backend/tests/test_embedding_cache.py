@@ -0,0 +1,129 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.processing_db import embedding_cache as embedding_cache_module
+from src.processing_db.embedding_cache import EmbeddingCache
+
+MODEL = "models/embedding-001"
+TASK = "retrieval_document"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(embedding_cache_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return EmbeddingCache(str(tmp_path / "embeddings.db"), max_entries=10)
+
+
+def last_access(cache, text):
+    with sqlite3.connect(cache.db_path) as conn:
+        key = cache.make_key(MODEL, TASK, text)
+        return conn.execute("SELECT last_access FROM embeddings WHERE key = ?;", (key,)).fetchone()[0]
+
+
+def test_round_trip_returns_float32_vectors_and_none_for_misses(cache):
+    vector = [0.1, -2.5, 3.0000001]
+    cache.put(MODEL, TASK, "section 302", vector)
+
+    hit, miss = cache.get_many(MODEL, TASK, ["section 302", "section 420"])
+
+    assert miss is None
+    assert hit == np.asarray(vector, dtype=np.float32).tolist()
+
+
+def test_key_includes_model_and_task_type(cache):
+    cache.put(MODEL, TASK, "text", [1.0, 2.0])
+
+    assert cache.get(MODEL, "retrieval_query", "text") is None
+    assert cache.get("models/other", TASK, "text") is None
+
+
+def test_persists_across_instances(cache):
+    cache.put_many(MODEL, TASK, ["a", "b"], [[1.0], [2.0]])
+
+    reopened = EmbeddingCache(cache.db_path, max_entries=10)
+
+    assert reopened.get_many(MODEL, TASK, ["a", "b"]) == [[1.0], [2.0]]
+    assert reopened.stats()["entries"] == 2
+
+
+def test_evicts_least_recently_used_down_to_ninety_percent(cache, clock):
+    for i in range(10):
+        clock.now += 1
+        cache.put(MODEL, TASK, f"text {i}", [float(i)])
+    clock.now += 1
+    assert cache.get(MODEL, TASK, "text 0") == [0.0]
+
+    clock.now += 1
+    cache.put(MODEL, TASK, "text 10", [10.0])
+
+    stats = cache.stats()
+    assert stats["entries"] == 9 and stats["evictions"] == 2
+    # "text 0" was read after "text 1" and "text 2" were written, so they go first
+    remaining = cache.get_many(MODEL, TASK, [f"text {i}" for i in range(11)])
+    assert [i for i, vector in enumerate(remaining) if vector is None] == [1, 2]
+
+
+def test_hit_access_times_are_buffered_until_flush(cache, clock):
+    cache.put(MODEL, TASK, "text", [1.0])
+    written = last_access(cache, "text")
+
+    clock.now += 5
+    cache.get(MODEL, TASK, "text")
+    assert last_access(cache, "text") == written
+
+    cache.flush()
+    assert last_access(cache, "text") == written + 5
+
+
+def test_buffered_access_times_flush_on_size_and_interval(cache, clock, monkeypatch):
+    monkeypatch.setattr(embedding_cache_module, "ACCESS_FLUSH_SIZE", 2)
+    cache.put_many(MODEL, TASK, ["a", "b"], [[1.0], [2.0]])
+    written = last_access(cache, "a")
+
+    clock.now += 1
+    cache.get(MODEL, TASK, "a")
+    assert last_access(cache, "a") == written
+    cache.get(MODEL, TASK, "b")
+    assert last_access(cache, "a") == written + 1
+
+    clock.now += embedding_cache_module.ACCESS_FLUSH_INTERVAL
+    cache.get(MODEL, TASK, "a")
+    assert last_access(cache, "a") == clock.now
+
+
+def test_stats_counts_hits_and_misses(cache):
+    cache.put(MODEL, TASK, "a", [1.0])
+    cache.get_many(MODEL, TASK, ["a", "b", "c"])
+    cache.get(MODEL, TASK, "a")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (2, 2, 0.5)
+    assert stats["entries"] == 1 and stats["max_entries"] == 10
+    assert stats["size_bytes"] > 0
+
+
+def test_clear_empties_cache(cache):
+    cache.put(MODEL, TASK, "a", [1.0])
+    cache.clear()
+
+    assert cache.get(MODEL, TASK, "a") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,123 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.eval.eval_queue import EvaluationQueue, EvaluationWorkerPool, RateLimitScheduler, DONE, PENDING, RUNNING
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "eval_queue.db")
+
+
+@pytest.fixture
+def queue(db_path):
+    return EvaluationQueue(db_path)
+
+
+def test_running_job_is_not_taken_by_another_worker(queue):
+    evaluation_id = queue.enqueue("q", ["context"], "answer")
+
+    job = queue.claim("worker-a", lease=60)
+
+    assert job["id"] == evaluation_id and job["attempts"] == 1
+    assert queue.claim("worker-b", lease=60) is None
+    queue.complete(evaluation_id, "worker-a", {"faithfulness": 1.0})
+    assert queue.get(evaluation_id)["status"] == DONE
+
+
+def test_expired_lease_is_reclaimed_and_stale_owner_is_ignored(queue):
+    evaluation_id = queue.enqueue("q", ["context"], "answer")
+    queue.claim("worker-a", lease=0)
+
+    job = queue.claim("worker-b", lease=60)
+
+    assert job["id"] == evaluation_id and job["attempts"] == 2
+    queue.complete(evaluation_id, "worker-a", {"faithfulness": 0.0})
+    assert queue.get(evaluation_id)["status"] == RUNNING
+    queue.complete(evaluation_id, "worker-b", {"faithfulness": 1.0})
+    assert queue.get(evaluation_id)["evaluation_scores"] == {"faithfulness": 1.0}
+
+
+def test_released_job_is_claimable_without_using_an_attempt(queue):
+    evaluation_id = queue.enqueue("q", ["context"], "answer")
+    queue.claim("worker-a", lease=60)
+
+    queue.release(evaluation_id, "worker-a")
+
+    assert queue.get(evaluation_id)["status"] == PENDING
+    assert queue.claim("worker-b", lease=60)["attempts"] == 1
+
+
+def test_retry_later_waits_until_not_before(queue):
+    evaluation_id = queue.enqueue("q", ["context"], "answer")
+    queue.claim("worker-a", lease=60)
+
+    queue.retry_later(evaluation_id, "worker-a", 60, RuntimeError("429"))
+
+    assert queue.claim("worker-a", lease=60) is None
+    assert queue.get(evaluation_id)["error"] == "429"
+
+
+def test_queue_created_before_leases_is_migrated(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE evaluations (
+            id TEXT PRIMARY KEY, status TEXT NOT NULL, query TEXT NOT NULL, context TEXT NOT NULL,
+            answer TEXT NOT NULL, scores TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,
+            not_before REAL NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL
+        );
+    """)
+    conn.execute("INSERT INTO evaluations (id, status, query, context, answer, created_at, updated_at) VALUES ('old', 'running', 'q', '[]', 'a', 0, 0);")
+    conn.commit()
+    conn.close()
+
+    queue = EvaluationQueue(db_path)
+
+    # Left running by a process that predates leases: its lease counts as expired
+    assert queue.claim("worker-a", lease=60)["id"] == "old"
+
+
+def test_rate_limit_slots_are_shared_between_processes(queue, db_path):
+    first = RateLimitScheduler(db_path, requests_per_minute=60)
+    second = RateLimitScheduler(db_path, requests_per_minute=60)
+
+    assert first.wait_time() == 0
+    assert first.reserve() == 0
+    assert 0.9 < second.wait_time() <= 1.0
+    assert 0.9 < second.reserve() <= 1.0
+    assert 1.9 < first.wait_time() <= 2.0
+
+
+def test_rate_limit_backoff_doubles_and_resets(queue, db_path):
+    scheduler = RateLimitScheduler(db_path, requests_per_minute=0, base_backoff=10, max_backoff=25)
+
+    assert [scheduler.rate_limited() for _ in range(3)] == [10, 20, 25]
+    assert 24 < RateLimitScheduler(db_path, requests_per_minute=0).wait_time() <= 25
+    scheduler.succeeded()
+    assert scheduler.rate_limited() == 10
+
+
+def test_worker_pools_in_two_processes_run_each_job_once(db_path):
+    runs = []
+
+    def job(query, context, answer):
+        runs.append(query)
+        return {"faithfulness": 1.0}
+
+    queues = [EvaluationQueue(db_path), EvaluationQueue(db_path)]
+    ids = [queues[0].enqueue(f"q{i}", [], "a") for i in range(6)]
+    pools = [EvaluationWorkerPool(queue, job=job, workers=2, scheduler=RateLimitScheduler(db_path, requests_per_minute=6000)) for queue in queues]
+    for pool in pools:
+        pool.start()
+    try:
+        deadline = time.time() + 10
+        while time.time() < deadline and any(queues[0].get(i)["status"] != DONE for i in ids):
+            time.sleep(0.05)
+    finally:
+        for pool in pools:
+            pool.stop()
+
+    assert all(queues[0].get(i)["status"] == DONE for i in ids)
+    assert sorted(runs) == sorted(f"q{i}" for i in range(6))
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+
+from src.processing_db import vector_backends
+from src.processing_db.retrieval_cache import bump_index_version, read_index_version
+from src.processing_db.vector_backends import FaissBackend
+
+DIMENSION = 16
+
+
+class FakeEmbeddings:
+    """Deterministic pseudo-random vector per text, so searching a stored text finds it first."""
+
+    def embed_query(self, text):
+        seed = sum(ord(c) * 31 ** i for i, c in enumerate(text)) % 2 ** 32
+        return np.random.RandomState(seed).randn(DIMENSION).tolist()
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def version_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "index_version")
+    monkeypatch.setattr(vector_backends, "read_index_version", lambda: read_index_version(path))
+    return path
+
+
+def make_backend(tmp_path, index_type="flat", **kwargs):
+    return FaissBackend(FakeEmbeddings(), index_dir=str(tmp_path / "faiss"), index_type=index_type,
+                        dimension=DIMENSION, **kwargs).connect()
+
+
+def docs(names):
+    return [Document(page_content=f"text {name}", metadata={"source": f"{name}.pdf"}) for name in names]
+
+
+def ids_of(results):
+    return [doc.metadata["id"] for doc, _ in results]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_add_delete_and_search(tmp_path, version_path, index_type):
+    backend = make_backend(tmp_path, index_type)
+    names = [str(i) for i in range(20)]
+    backend.add_documents(docs(names), ids=names)
+
+    results = backend.similarity_search_with_score("text 7", k=3)
+    assert ids_of(results)[0] == "7"
+    assert results[0][0].page_content == "text 7"
+    assert results[0][0].metadata["source"] == "7.pdf"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+
+    backend.delete(["7"])
+    results = backend.similarity_search_with_score("text 7", k=3)
+    assert "7" not in ids_of(results)
+    assert len(results) == 3
+
+
+def test_upsert_replaces_existing_id(tmp_path, version_path):
+    backend = make_backend(tmp_path)
+    backend.add_documents(docs(["a"]), ids=["a"])
+    backend.add_documents([Document(page_content="text b", metadata={})], ids=["a"])
+
+    assert backend.index.ntotal == 1
+    assert [doc.page_content for doc in backend.similarity_search("text b", k=5)] == ["text b"]
+
+
+def test_hnsw_overfetches_past_deleted_vectors(tmp_path, version_path, monkeypatch):
+    monkeypatch.setattr(vector_backends, "FAISS_HNSW_REBUILD_FRACTION", 1.0)
+    backend = make_backend(tmp_path, "hnsw")
+    names = [str(i) for i in range(30)]
+    backend.add_documents(docs(names), ids=names)
+    # Delete the stored vectors nearest to the query, which HNSW keeps in the graph
+    nearest = ids_of(backend.similarity_search_with_score("text 3", k=10))
+    backend.delete(nearest)
+
+    results = backend.similarity_search_with_score("text 3", k=5)
+
+    assert backend.index.ntotal == 30
+    assert len(results) == 5 and not set(ids_of(results)) & set(nearest)
+
+
+def test_hnsw_flush_rebuilds_once_tombstones_pass_fraction(tmp_path, version_path, monkeypatch):
+    monkeypatch.setattr(vector_backends, "FAISS_HNSW_REBUILD_FRACTION", 0.2)
+    backend = make_backend(tmp_path, "hnsw")
+    names = [str(i) for i in range(20)]
+    backend.add_documents(docs(names), ids=names)
+
+    backend.delete(names[:4])
+    backend.flush()
+    assert backend.index.ntotal == 20 and backend._tombstones == 4
+
+    backend.delete(names[4:5])
+    backend.flush()
+    assert backend.index.ntotal == 15 and backend._tombstones == 0
+    assert ids_of(backend.similarity_search_with_score("text 12", k=1)) == ["12"]
+
+    reloaded = make_backend(tmp_path, "hnsw")
+    assert reloaded.index.ntotal == 15 and reloaded._tombstones == 0
+
+
+def test_ivf_is_trained_at_flush_once_large_enough(tmp_path, version_path, monkeypatch):
+    monkeypatch.setattr(vector_backends, "FAISS_IVF_MIN_VECTORS", 100)
+    backend = make_backend(tmp_path, "ivf", nlist=2, nprobe=2)
+    names = [str(i) for i in range(99)]
+    backend.add_documents(docs(names), ids=names)
+    backend.flush()
+    assert isinstance(backend._base_index(), vector_backends.faiss.IndexFlat)
+
+    backend.add_documents(docs(["99"]), ids=["99"])
+    backend.flush()
+
+    base = backend._base_index()
+    assert isinstance(base, vector_backends.faiss.IndexIVF)
+    assert base.nlist == 2 and base.nprobe == 2 and backend.index.ntotal == 100
+    assert ids_of(backend.similarity_search_with_score("text 42", k=1)) == ["42"]
+
+
+def test_reader_reloads_mmapped_index_after_version_bump(tmp_path, version_path):
+    writer = make_backend(tmp_path)
+    writer.add_documents(docs(["a", "b"]), ids=["a", "b"])
+    writer.flush()
+    bump_index_version(version_path)
+
+    reader = make_backend(tmp_path)
+    assert reader._mmapped and reader.index.ntotal == 2
+
+    writer.add_documents(docs(["c"]), ids=["c"])
+    writer.flush()
+    # Without a version bump the reader keeps serving the index it loaded
+    assert "c" not in ids_of(reader.similarity_search_with_score("text c", k=3))
+
+    bump_index_version(version_path)
+    assert ids_of(reader.similarity_search_with_score("text c", k=1)) == ["c"]
+    assert reader._mmapped and reader.index.ntotal == 3
+
+
+def test_unflushed_writer_is_not_reloaded_from_disk(tmp_path, version_path):
+    writer = make_backend(tmp_path)
+    writer.add_documents(docs(["a"]), ids=["a"])
+    bump_index_version(version_path)
+
+    assert ids_of(writer.similarity_search_with_score("text a", k=1)) == ["a"]
+    assert not writer._mmapped
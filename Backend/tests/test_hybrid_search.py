@@ -0,0 +1,63 @@
+import pytest
+from langchain.schema import Document
+
+from src.processing_db.lexical_index import LexicalIndex, build_match_query, fuse_candidates
+
+
+def candidate(doc_id, **metadata):
+    return Document(page_content=f"text of {doc_id}", metadata={"id": doc_id, **metadata})
+
+
+def ids(documents):
+    return [doc.metadata["id"] for doc in documents]
+
+
+def test_rrf_scores_sum_reciprocal_ranks():
+    fused = fuse_candidates([candidate("a"), candidate("b")], [candidate("b"), candidate("c")], rrf_k=60)
+
+    scores = {doc.metadata["id"]: doc.metadata["rrf_score"] for doc in fused}
+    assert scores["a"] == pytest.approx(1 / 61)
+    assert scores["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert scores["c"] == pytest.approx(1 / 62)
+    assert ids(fused) == ["b", "a", "c"]
+
+
+def test_rrf_merges_metadata_of_chunks_found_by_both():
+    fused = fuse_candidates([candidate("a", vector_score=0.9)], [candidate("a", lexical_score=12.5)])
+
+    assert len(fused) == 1
+    assert fused[0].metadata["vector_score"] == 0.9
+    assert fused[0].metadata["lexical_score"] == 12.5
+
+
+def test_rrf_without_lexical_hits_keeps_vector_order():
+    vector_results = [candidate("b"), candidate("a")]
+
+    assert fuse_candidates(vector_results, []) is vector_results
+
+
+def test_rrf_ties_keep_vector_order_first():
+    fused = fuse_candidates([candidate("a"), candidate("b")], [candidate("c"), candidate("d")])
+
+    assert ids(fused) == ["a", "c", "b", "d"]
+
+
+def test_match_query_drops_stopwords_and_duplicates():
+    assert build_match_query("What is the punishment under section 302 of IPC 302?") == '"punishment" OR "section" OR "302" OR "ipc"'
+    assert build_match_query("what is the") == ""
+
+
+def test_bm25_ranks_exact_citations_and_replaces_on_upsert(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    index.upsert(["ipc-302", "ipc-420"], [
+        Document(page_content="Punishment for murder.", metadata={"source_table": "IPC", "Section": "302"}),
+        Document(page_content="Cheating and dishonestly inducing delivery of property.", metadata={"source_table": "IPC", "Section": "420"}),
+    ])
+
+    results = index.search("section 302 IPC", k=2)
+    assert results[0][0].metadata["id"] == "ipc-302"
+
+    index.upsert(["ipc-302"], [Document(page_content="Murder, amended.", metadata={"source_table": "IPC", "Section": "302"})])
+    index.delete(["ipc-420"])
+    assert index.count() == 1
+    assert [doc.page_content for doc, _ in index.search("murder")] == ["Murder, amended."]
@@ -0,0 +1,190 @@
+import time
+
+import pytest
+from langchain.schema import Document
+
+from src.exception import CustomException
+from src.processing_db import ingest_pipeline
+from src.processing_db.ingest_pipeline import IngestionPipeline, IngestionSource
+from src.processing_db.ingestion_manifest import IngestionManifest
+
+
+class FakeBackend:
+    """Records upserts, deletes and flushes in order; `stored` is what a flush has persisted."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.pending = {}
+        self.stored = {}
+        self.events = []
+
+    def connect(self):
+        return self
+
+    def upsert_embeddings(self, documents, embeddings, ids=None):
+        self.pending.update(zip(ids, documents))
+        self.events.append(("upsert", list(ids)))
+        return ids
+
+    def delete(self, ids):
+        for doc_id in ids:
+            self.pending.pop(doc_id, None)
+            self.stored.pop(doc_id, None)
+        self.events.append(("delete", list(ids)))
+
+    def flush(self):
+        self.stored.update(self.pending)
+        self.pending = {}
+        self.events.append(("flush", None))
+
+
+class FakeEmbeddings:
+    """
+    Embeds every text to a constant vector. With fail_after it raises once that many texts were
+    embedded, like an API outage, after waiting until `backend` has upserted them.
+    """
+
+    def __init__(self, fail_after=None, backend=None):
+        self.fail_after = fail_after
+        self.backend = backend
+        self.texts = []
+
+    def embed_documents(self, texts):
+        if self.fail_after is not None and len(self.texts) >= self.fail_after:
+            deadline = time.monotonic() + 5
+            while self.backend and len(self.backend.pending) + len(self.backend.stored) < self.fail_after:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.01)
+            raise RuntimeError("embedding API unavailable")
+        self.texts.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeLexicalIndex:
+
+    def upsert(self, ids, documents):
+        pass
+
+    def delete(self, ids):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, tmp_path):
+    monkeypatch.setattr(ingest_pipeline, "lexical_index", FakeLexicalIndex())
+    monkeypatch.setattr(ingest_pipeline, "bump_index_version", lambda: None)
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IngestionManifest(str(tmp_path / "manifest.db"))
+
+
+def source(name, texts, shards=1):
+    def records():
+        for text in texts:
+            yield f"{name}:{text}", Document(page_content=text, metadata={"source": name})
+    return IngestionSource(name, records, shards)
+
+
+def make_pipeline(backend, manifest, embedding=None, **kwargs):
+    return IngestionPipeline(backend=backend, embedding=embedding or FakeEmbeddings(), manifest=manifest,
+                             batch_size=1, read_workers=1, embed_workers=1, upsert_workers=1, **kwargs)
+
+
+def test_checkpoints_every_checkpoint_batches(monkeypatch, manifest):
+    monkeypatch.setattr(ingest_pipeline, "CHECKPOINT_BATCHES", 2)
+    backend = FakeBackend()
+
+    stats = make_pipeline(backend, manifest).run([source("a", ["1", "2", "3", "4", "5"])])
+
+    kinds = [kind for kind, _ in backend.events]
+    assert kinds == ["upsert", "upsert", "flush", "upsert", "upsert", "flush", "upsert", "flush"]
+    assert stats["upserted"] == 5
+    assert manifest.indexed_ids("fake", "a") == {f"a:{i}" for i in "12345"}
+
+
+def test_manifest_only_records_flushed_batches(monkeypatch, manifest):
+    monkeypatch.setattr(ingest_pipeline, "CHECKPOINT_BATCHES", 2)
+    recorded_at_flush = []
+    backend = FakeBackend()
+    flush = backend.flush
+
+    def checking_flush():
+        # The manifest must not be ahead of what the backend has persisted
+        recorded_at_flush.append(set(manifest.indexed_ids("fake", "a")) <= set(backend.stored))
+        flush()
+
+    backend.flush = checking_flush
+    make_pipeline(backend, manifest).run([source("a", ["1", "2", "3"])])
+
+    assert recorded_at_flush == [True, True]
+    assert manifest.indexed_ids("fake", "a") == set(backend.stored)
+
+
+def test_rerun_resumes_after_interruption(monkeypatch, manifest):
+    monkeypatch.setattr(ingest_pipeline, "CHECKPOINT_BATCHES", 2)
+    texts = [str(i) for i in range(6)]
+    backend = FakeBackend()
+
+    with pytest.raises(CustomException):
+        make_pipeline(backend, manifest, FakeEmbeddings(fail_after=3, backend=backend)).run([source("a", texts)])
+    # The batch upserted after the last checkpoint is flushed and recorded before the run fails
+    assert manifest.indexed_ids("fake", "a") == {"a:0", "a:1", "a:2"}
+    assert set(backend.stored) == {"a:0", "a:1", "a:2"}
+
+    embedding = FakeEmbeddings()
+    stats = make_pipeline(backend, manifest, embedding).run([source("a", texts)])
+
+    assert embedding.texts == ["3", "4", "5"]
+    assert stats["unchanged"] == 3 and stats["deleted"] == 0
+    assert set(backend.stored) == {f"a:{t}" for t in texts}
+    assert manifest.indexed_ids("fake", "a") == set(backend.stored)
+
+
+def test_interrupted_run_does_not_prune(monkeypatch, manifest):
+    backend = FakeBackend()
+    make_pipeline(backend, manifest).run([source("a", ["1", "2", "3"])])
+
+    with pytest.raises(CustomException):
+        make_pipeline(backend, manifest, FakeEmbeddings(fail_after=0)).run([source("a", ["1", "4"])])
+
+    assert not any(kind == "delete" for kind, _ in backend.events)
+    assert manifest.indexed_ids("fake", "a") == {"a:1", "a:2", "a:3"}
+
+
+def test_prunes_chunks_missing_from_a_fully_read_source(manifest):
+    backend = FakeBackend()
+    make_pipeline(backend, manifest).run([source("a", ["1", "2", "3"]), source("b", ["x"])])
+
+    stats = make_pipeline(backend, manifest).run([source("a", ["1", "3 edited"])])
+
+    assert stats["deleted"] == 2
+    assert set(backend.stored) == {"a:1", "a:3 edited", "b:x"}
+    # Source b wasn't part of this run, so its chunks stay
+    assert manifest.indexed_ids("fake", "b") == {"b:x"}
+    assert manifest.indexed_ids("fake", "a") == {"a:1", "a:3 edited"}
+
+
+def test_sharded_source_is_pruned_only_once_every_shard_is_read(manifest):
+    backend = FakeBackend()
+    make_pipeline(backend, manifest).run([source("t", ["1", "2"], shards=2), source("t", ["3", "4"], shards=2)])
+
+    # Only the first of two shards: "3" and "4" weren't read, so they must not be deleted
+    make_pipeline(backend, manifest).run([source("t", ["1"], shards=2)])
+    assert manifest.indexed_ids("fake", "t") == {"t:1", "t:2", "t:3", "t:4"}
+
+    stats = make_pipeline(backend, manifest).run([source("t", ["1"], shards=2), source("t", ["4"], shards=2)])
+    assert stats["deleted"] == 2
+    assert manifest.indexed_ids("fake", "t") == {"t:1", "t:4"}
+
+
+def test_no_prune_keeps_missing_chunks(manifest):
+    backend = FakeBackend()
+    make_pipeline(backend, manifest).run([source("a", ["1", "2"])])
+
+    make_pipeline(backend, manifest, prune=False).run([source("a", ["1"])])
+
+    assert manifest.indexed_ids("fake", "a") == {"a:1", "a:2"}
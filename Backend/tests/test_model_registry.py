@@ -0,0 +1,49 @@
+import asyncio
+
+from src.LLM_setup.LLM_initialization import ModelRegistry
+
+
+class FakeLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pings = []
+
+    def invoke(self, prompt):
+        raise AssertionError("warm-up must not block on the sync client")
+
+    async def ainvoke(self, prompt):
+        self.pings.append(prompt)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+
+
+class FakeChatbot:
+    def __init__(self, llm):
+        self.llm = llm
+
+
+def make_registry(**llms):
+    registry = ModelRegistry(configs={name: {} for name in llms})
+    registry._models = {name: FakeChatbot(llm) for name, llm in llms.items()}
+    return registry
+
+
+def test_warm_up_without_ping_sends_no_requests():
+    answer, summary = FakeLLM(), FakeLLM()
+    asyncio.run(make_registry(answer=answer, summary=summary).awarm_up())
+
+    assert answer.pings == [] and summary.pings == []
+
+
+def test_warm_up_pings_every_model_asynchronously():
+    answer, summary = FakeLLM(), FakeLLM()
+    asyncio.run(make_registry(answer=answer, summary=summary).awarm_up(ping=True))
+
+    assert answer.pings == ["ping"] and summary.pings == ["ping"]
+
+
+def test_failed_ping_does_not_stop_warm_up():
+    answer, summary = FakeLLM(fail=True), FakeLLM()
+    asyncio.run(make_registry(answer=answer, summary=summary).awarm_up(ping=True))
+
+    assert summary.pings == ["ping"]
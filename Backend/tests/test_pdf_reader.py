@@ -0,0 +1,54 @@
+import pytest
+
+from src.exception import CustomException
+from src.processing_db.pdf_reader import iter_pdf_pages, open_pdf, page_count, page_ranges
+
+PAGES = [f"Page {i} text." for i in range(1, 8)]
+
+
+@pytest.mark.parametrize("start,end,pages_per_shard", [(0, 7, 1), (0, 7, 3), (2, 7, 2), (0, 7, 25), (0, 100, 7)])
+def test_page_ranges_cover_every_page_once(start, end, pages_per_shard):
+    ranges = page_ranges(start, end, pages_per_shard)
+
+    pages = [page for first, last in ranges for page in range(first, last)]
+    assert pages == list(range(start, end))
+    assert all(0 < last - first <= pages_per_shard for first, last in ranges)
+
+
+def test_page_ranges_empty_when_nothing_to_read():
+    assert page_ranges(5, 5, 3) == []
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_open_pdf_reads_every_page(make_pdf, use_mmap):
+    path = make_pdf(PAGES)
+
+    with open_pdf(path, use_mmap) as doc:
+        assert len(doc) == len(PAGES)
+    assert page_count(path, use_mmap) == len(PAGES)
+    assert [(page, text.strip()) for page, text in iter_pdf_pages(path, use_mmap=use_mmap)] == list(enumerate(PAGES, 1))
+
+
+@pytest.mark.parametrize("pages_per_shard", [1, 2, 3, 7])
+def test_sharded_reads_match_a_full_read(make_pdf, pages_per_shard):
+    path = make_pdf(PAGES)
+
+    sharded = [
+        page for first, last in page_ranges(0, page_count(path), pages_per_shard)
+        for page in iter_pdf_pages(path, first, last)
+    ]
+
+    assert sharded == list(iter_pdf_pages(path))
+
+
+def test_iter_pdf_pages_clamps_end_to_page_count(make_pdf):
+    path = make_pdf(PAGES)
+
+    assert [page for page, _ in iter_pdf_pages(path, 5, 100)] == [6, 7]
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_open_pdf_raises_custom_exception_for_missing_file(tmp_path, use_mmap):
+    with pytest.raises(CustomException):
+        with open_pdf(str(tmp_path / "missing.pdf"), use_mmap):
+            pass
@@ -0,0 +1,92 @@
+import pytest
+from pinecone.exceptions import ServiceException, UnauthorizedException, PineconeApiValueError
+
+from src.processing_db import vectordb_setup
+from src.processing_db.vectordb_setup import PineconeConnection, is_transient_error
+
+
+class FakeIndex:
+
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+
+    def describe_index_stats(self):
+        if not self.healthy:
+            raise ConnectionError("connection reset")
+        return {}
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    conn = PineconeConnection(health_check_interval=60)
+    conn.connects = 0
+
+    def connect():
+        conn.connects += 1
+        conn.client, conn.index, conn.vector_store = object(), FakeIndex(), f"store-{conn.connects}"
+        conn._last_health_check = vectordb_setup.time.monotonic()
+        return conn
+
+    monkeypatch.setattr(conn, "connect", connect)
+    return conn
+
+
+def failing(error, times=1):
+    calls = []
+
+    def operation(conn):
+        calls.append(conn.vector_store)
+        if len(calls) <= times:
+            raise error
+        return conn.vector_store
+
+    return operation, calls
+
+
+@pytest.mark.parametrize("error", [
+    ServiceException(status=503, reason="Service Unavailable"),
+    ConnectionError("connection reset by peer"),
+    TimeoutError("read timed out"),
+])
+def test_transient_errors_reconnect_and_retry_once(connection, error):
+    operation, calls = failing(error)
+
+    assert connection.run(operation) == "store-2"
+    assert calls == ["store-1", "store-2"]
+    assert connection.connects == 2
+
+
+@pytest.mark.parametrize("error", [
+    UnauthorizedException(status=401, reason="Invalid API key"),
+    PineconeApiValueError("Vector dimension 512 does not match the dimension of the index 768"),
+    ValueError("bad filter"),
+])
+def test_auth_and_validation_errors_are_not_retried(connection, error):
+    operation, calls = failing(error)
+
+    with pytest.raises(type(error)):
+        connection.run(operation)
+    assert calls == ["store-1"]
+    assert connection.connects == 1
+
+
+def test_second_transient_failure_is_raised(connection):
+    operation, calls = failing(ServiceException(status=500, reason="Internal Server Error"), times=2)
+
+    with pytest.raises(ServiceException):
+        connection.run(operation)
+    assert len(calls) == 2
+
+
+def test_failed_health_check_reconnects_after_interval(connection, monkeypatch):
+    connection.ensure_connected()
+    connection.index.healthy = False
+
+    assert connection.ensure_connected().vector_store == "store-1"
+    monkeypatch.setattr(vectordb_setup.time, "monotonic", lambda: connection._last_health_check + 61)
+    assert connection.ensure_connected().vector_store == "store-2"
+
+
+def test_is_transient_error_checks_status_codes():
+    assert is_transient_error(ServiceException(status=502, reason="Bad Gateway"))
+    assert not is_transient_error(UnauthorizedException(status=403, reason="Forbidden"))
@@ -0,0 +1,86 @@
+import pytest
+
+from src.prompts import main_prompt
+from src.prompts.main_prompt import basic_prompt, fit_to_budget
+from src.token_counter import token_counter
+
+
+@pytest.fixture(autouse=True)
+def word_counts(monkeypatch):
+    # Count words, so the test doesn't depend on downloading the tiktoken encoding
+    monkeypatch.setattr(token_counter, "_encoding", False)
+    monkeypatch.setattr(main_prompt, "_template_tokens", None)
+    monkeypatch.setattr(main_prompt, "PROMPT_HISTORY_SHARE", 0.25)
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def prompt_tokens(history, chunks, query, budget):
+    return sum(token_counter.count_batch(basic_prompt(history, chunks, query, token_budget=budget)))
+
+
+def room(query, budget):
+    return budget - main_prompt.template_tokens() - token_counter.count(query)
+
+
+def test_prompt_within_budget_is_unchanged():
+    history, chunks = words("h", 50), words("c", 50)
+
+    assert fit_to_budget(history, chunks, "query", token_budget=10000) == (history, chunks)
+    assert fit_to_budget(history, chunks, "query", token_budget=None) == (history, chunks)
+
+
+def test_long_history_keeps_its_share_and_newest_turns():
+    budget = main_prompt.template_tokens() + 1 + 400
+    history, chunks = words("h", 1000), words("c", 1000)
+
+    fitted_history, fitted_chunks = fit_to_budget(history, chunks, "query", token_budget=budget)
+
+    assert fitted_history.split() == history.split()[-100:]
+    assert fitted_chunks.split() == chunks.split()[:300]
+    assert prompt_tokens(history, chunks, "query", budget) <= budget
+
+
+def test_short_history_leaves_the_rest_to_chunks():
+    budget = main_prompt.template_tokens() + 1 + 400
+    history, chunks = words("h", 30), words("c", 1000)
+
+    fitted_history, fitted_chunks = fit_to_budget(history, chunks, "query", token_budget=budget)
+
+    assert fitted_history == history
+    assert fitted_chunks.split() == chunks.split()[:370]
+
+
+def test_small_chunks_leave_the_rest_to_history():
+    budget = main_prompt.template_tokens() + 1 + 400
+    history, chunks = words("h", 1000), words("c", 50)
+
+    fitted_history, fitted_chunks = fit_to_budget(history, chunks, "query", token_budget=budget)
+
+    assert fitted_chunks == chunks
+    assert fitted_history.split() == history.split()[-350:]
+
+
+@pytest.mark.parametrize("history_words,chunk_words", [(0, 5000), (5000, 0), (3000, 3000), (10, 10)])
+@pytest.mark.parametrize("extra", [0, 1, 37, 800])
+def test_whole_prompt_stays_within_budget(history_words, chunk_words, extra):
+    query = words("q", 20)
+    budget = main_prompt.template_tokens() + 20 + extra
+    history, chunks = words("h", history_words), words("c", chunk_words)
+
+    fitted_history, fitted_chunks = fit_to_budget(history, chunks, query, token_budget=budget)
+
+    assert prompt_tokens(history, chunks, query, budget) <= budget
+    assert token_counter.count(fitted_history) + token_counter.count(fitted_chunks) == min(
+        room(query, budget), history_words + chunk_words
+    )
+
+
+def test_dense_text_is_still_trimmed():
+    # Short tokens defeat a characters-per-token estimate; the budget must still hold
+    budget = main_prompt.template_tokens() + 1 + 300
+    chunks = " ".join("7" for _ in range(1000))
+
+    assert prompt_tokens("", chunks, "query", budget) <= budget
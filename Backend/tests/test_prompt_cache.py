@@ -0,0 +1,157 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.LLM_setup import LLM_initialization
+from src.LLM_setup import prompt_cache as prompt_cache_module
+from src.LLM_setup.LLM_call import extract_token_usage
+from src.LLM_setup.LLM_initialization import LegalChatbot
+from src.LLM_setup.prompt_cache import REFRESH_MARGIN, RETRY_AFTER, PromptCacheManager
+from src.prompts.main_prompt import SYSTEM_PROMPT
+from src.token_counter import token_counter
+
+PREFIX = "You are a legal assistant. " * 100
+MODEL = "gemini-2.0-flash"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prompt_cache_module.time, "time", lambda: now[0])
+    # Count words, so the test doesn't depend on downloading the tiktoken encoding
+    monkeypatch.setattr(token_counter, "_encoding", False)
+    return now
+
+
+def local_cache(monkeypatch, ttl=3600, min_tokens=50, failures=()):
+    """Local stand-in backend recording every cache it creates; failures are raised by successive creates."""
+    cache = PromptCacheManager(backend="local", ttl=ttl, min_tokens=min_tokens)
+    created, failures = [], list(failures)
+    create = cache._create
+
+    def recording_create(model_name, prefix):
+        if failures:
+            raise failures.pop(0)
+        created.append(model_name)
+        return create(model_name, prefix)
+
+    monkeypatch.setattr(cache, "_create", recording_create)
+    return cache, created
+
+
+def test_default_minimum_lets_the_system_prompt_be_cached(clock):
+    assert token_counter.count(SYSTEM_PROMPT) >= prompt_cache_module.PROMPT_CACHE_MIN_TOKENS
+
+
+def test_lookup_creates_once_per_model_and_prefix(clock, monkeypatch):
+    cache, created = local_cache(monkeypatch)
+
+    name = cache.lookup(MODEL, PREFIX)
+
+    assert name.startswith("local/")
+    assert cache.lookup(MODEL, PREFIX) == name
+    assert cache.lookup("gemini-2.0-flash-lite", PREFIX) != name
+    assert created == [MODEL, "gemini-2.0-flash-lite"]
+    assert cache.stats() == {"backend": "local", "cached_prefixes": 2, "hits": 1, "misses": 2, "errors": 0}
+
+
+def test_short_prefix_is_not_cached_or_recounted(clock, monkeypatch):
+    cache, created = local_cache(monkeypatch)
+    counts = []
+    count = token_counter.count
+    monkeypatch.setattr(token_counter, "count", lambda text: counts.append(text) or count(text))
+
+    assert cache.lookup(MODEL, "Be brief.") is None
+    assert cache.lookup(MODEL, "Be brief.") is None
+    assert cache.lookup(MODEL, "") is None
+
+    assert created == [] and len(counts) == 1
+
+
+def test_none_backend_never_caches(clock):
+    assert PromptCacheManager(backend="none", min_tokens=0).lookup(MODEL, PREFIX) is None
+
+
+def test_cache_is_recreated_before_its_ttl_runs_out(clock, monkeypatch):
+    cache, created = local_cache(monkeypatch, ttl=600)
+    cache.lookup(MODEL, PREFIX)
+
+    clock[0] += 600 - REFRESH_MARGIN - 1
+    cache.lookup(MODEL, PREFIX)
+    assert len(created) == 1
+
+    clock[0] += 1
+    cache.lookup(MODEL, PREFIX)
+    assert len(created) == 2
+
+
+def test_failed_creation_is_retried_after_retry_after(clock, monkeypatch):
+    cache, created = local_cache(monkeypatch, failures=[RuntimeError("503 unavailable")])
+
+    assert cache.lookup(MODEL, PREFIX) is None
+    clock[0] += RETRY_AFTER - 1
+    assert cache.lookup(MODEL, PREFIX) is None
+    assert created == [] and cache.stats()["errors"] == 1
+
+    clock[0] += 1
+    assert cache.lookup(MODEL, PREFIX) is not None
+    assert created == [MODEL]
+
+
+def test_prefix_below_provider_minimum_waits_for_the_ttl(clock, monkeypatch):
+    error = RuntimeError("400 Cached content is too small. total_token_count=600, min_total_token_count=4096")
+    cache, created = local_cache(monkeypatch, ttl=3600, failures=[error])
+
+    assert cache.lookup(MODEL, PREFIX) is None
+    clock[0] += RETRY_AFTER
+    assert cache.lookup(MODEL, PREFIX) is None
+    assert cache.stats()["errors"] == 0
+
+    clock[0] += 3600
+    assert cache.lookup(MODEL, PREFIX) is not None
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(Exception, match="Unknown PROMPT_CACHE_BACKEND"):
+        PromptCacheManager(backend="redis")
+
+
+@pytest.mark.parametrize("backend,provider", [("local", False), ("gemini", True)])
+def test_build_request_references_only_provider_caches(clock, monkeypatch, backend, provider):
+    cache = PromptCacheManager(backend=backend, min_tokens=50)
+    monkeypatch.setattr(cache, "_create", lambda model_name, prefix: "cachedContents/abc")
+    monkeypatch.setattr(LLM_initialization, "prompt_cache", cache)
+    chatbot = SimpleNamespace(config=SimpleNamespace(model_name=MODEL))
+
+    messages, kwargs = LegalChatbot.build_request(chatbot, PREFIX, "What is IPC 420?")
+
+    if provider:
+        assert messages == [HumanMessage(content="What is IPC 420?")]
+        assert kwargs == {"cached_content": "cachedContents/abc"}
+    else:
+        assert messages == [SystemMessage(content=PREFIX), HumanMessage(content="What is IPC 420?")]
+        assert kwargs == {}
+
+
+def test_token_usage_splits_cached_and_uncached_input():
+    response = AIMessage(content="", usage_metadata={
+        "input_tokens": 1000, "output_tokens": 50, "total_tokens": 1050,
+        "input_token_details": {"cache_read": 800},
+    })
+
+    assert extract_token_usage(response) == {
+        "input_tokens": 1000, "cached_input_tokens": 800, "uncached_input_tokens": 200,
+        "output_tokens": 50, "total_tokens": 1050,
+    }
+
+
+def test_token_usage_without_cache_details():
+    response = AIMessage(content="", usage_metadata={"input_tokens": 300, "output_tokens": 20, "total_tokens": 320})
+
+    usage = extract_token_usage(response)
+
+    assert (usage["cached_input_tokens"], usage["uncached_input_tokens"]) == (0, 300)
+    assert extract_token_usage(AIMessage(content="")) == {
+        "input_tokens": 0, "cached_input_tokens": 0, "uncached_input_tokens": 0, "output_tokens": 0, "total_tokens": 0,
+    }
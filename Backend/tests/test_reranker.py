@@ -0,0 +1,163 @@
+import pytest
+from langchain.schema import Document
+
+from src.processing_db import vectordb_setup
+from src.processing_db.reranker import NoopReranker, Reranker, chunk_id, split_windows
+
+
+class FakeReranker(Reranker):
+    """Scores a window by how often it contains the word 'relevant'; records every scored batch."""
+
+    name = "fake"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def score_pairs(self, query, texts):
+        self.batches.append(list(texts))
+        return [text.split().count("relevant") for text in texts]
+
+
+def doc(text, doc_id=None):
+    return Document(page_content=text, metadata={"id": doc_id} if doc_id else {})
+
+
+def test_split_windows_overlap_and_cover_every_token():
+    tokens = list(range(10))
+
+    windows = split_windows(tokens, window=4, overlap=1)
+
+    assert windows == [[0, 1, 2, 3], [3, 4, 5, 6], [6, 7, 8, 9]]
+    assert split_windows(tokens, window=10, overlap=3) == [tokens]
+
+
+@pytest.mark.parametrize("length,window,overlap", [(100, 32, 8), (33, 32, 8), (64, 32, 31), (500, 40, 0)])
+def test_split_windows_respect_window_size(length, window, overlap):
+    tokens = list(range(length))
+
+    windows = split_windows(tokens, window, overlap)
+
+    assert all(len(w) <= window for w in windows)
+    assert sorted(set(t for w in windows for t in w)) == tokens
+
+
+def test_long_chunk_scores_as_its_best_window():
+    reranker = FakeReranker(max_tokens=50, overlap=4)
+    # The relevant words sit at the end, past the first window
+    long_text = " ".join(["filler"] * 100 + ["relevant"] * 3)
+
+    scores = reranker.score("query", [long_text, "relevant once"])
+
+    assert scores == [3, 1]
+    windows = reranker.batches[0]
+    assert len(windows) > 2
+    assert all(len(window.split()) <= 36 for window in windows)
+
+
+def test_rerank_returns_top_n_indices_best_first():
+    reranker = FakeReranker()
+    documents = [doc("nothing", "a"), doc("relevant relevant", "b"), doc("relevant", "c")]
+
+    assert reranker.rerank("q", documents, top_n=2) == [(1, 2.0), (2, 1.0)]
+
+
+def test_scores_are_cached_per_query_and_chunk_id():
+    reranker = FakeReranker()
+    first = [doc("relevant", "a"), doc("nothing", "b")]
+    reranker.rerank("q", first)
+
+    reranker.rerank("q", [doc("relevant", "a"), doc("relevant relevant", "c")])
+    reranker.rerank("other query", [doc("relevant", "a")])
+
+    assert reranker.batches == [["relevant", "nothing"], ["relevant relevant"], ["relevant"]]
+
+
+def test_cache_falls_back_to_text_hash_without_id():
+    reranker = FakeReranker()
+    reranker.rerank("q", [doc("relevant")])
+    reranker.rerank("q", [doc("relevant")])
+
+    assert len(reranker.batches) == 1
+    assert chunk_id(doc("relevant")) == chunk_id(doc("relevant")) != chunk_id(doc("other"))
+
+
+def test_cache_evicts_least_recently_used_pairs():
+    reranker = FakeReranker(cache_size=2)
+    reranker.rerank("q", [doc("x", "a"), doc("x", "b")])
+    # A hit on "a" makes "b" the least recently used pair
+    reranker.rerank("q", [doc("x", "a")])
+    reranker.rerank("q", [doc("y", "c")])
+
+    reranker.rerank("q", [doc("x", "a"), doc("z", "b")])
+
+    assert reranker.batches == [["x", "x"], ["y"], ["z"]]
+    assert len(reranker._cache) == 2
+
+
+def test_noop_reranker_keeps_vector_order():
+    assert NoopReranker().rerank("q", [doc("a"), doc("b"), doc("c")], top_n=2) == [(0, None), (1, None)]
+
+
+@pytest.fixture
+def fake_reranker(monkeypatch):
+    reranker = FakeReranker()
+    monkeypatch.setattr(vectordb_setup, "reranker", reranker)
+    return reranker
+
+
+def test_tag_candidates_stamps_ids_and_vector_scores():
+    results = [(doc("first", "a"), 0.9), (doc("untagged"), 0.8), (doc("first again", "a"), 0.7)]
+
+    candidates = vectordb_setup.tag_candidates(results)
+
+    assert [c.page_content for c in candidates] == ["first", "untagged"]
+    assert candidates[0].metadata == {"id": "a", "vector_score": 0.9}
+    assert candidates[1].metadata["id"] == chunk_id(doc("untagged"))
+    assert candidates[1].metadata["vector_score"] == 0.8
+
+
+def test_rerank_documents_maps_scores_to_their_chunks(fake_reranker):
+    candidates = vectordb_setup.tag_candidates([
+        (doc("nothing here", "a"), 0.9),
+        (doc("relevant relevant", "b"), 0.5),
+        (doc("relevant", "c"), 0.4),
+    ])
+
+    reranked = vectordb_setup.rerank_documents("q", candidates, final_k=2)
+
+    assert [(d.metadata["id"], d.metadata["rerank_score"], d.metadata["vector_score"]) for d in reranked] == [
+        ("b", 2.0, 0.5), ("c", 1.0, 0.4)
+    ]
+    assert [d.page_content for d in reranked] == ["relevant relevant", "relevant"]
+
+
+def test_cached_scores_stay_with_their_chunk_when_order_changes(fake_reranker):
+    vectordb_setup.rerank_documents("q", [doc("relevant", "a"), doc("nothing", "b")], final_k=2)
+
+    reranked = vectordb_setup.rerank_documents("q", [doc("nothing", "b"), doc("relevant", "a")], final_k=2)
+
+    assert [(d.metadata["id"], d.metadata["rerank_score"]) for d in reranked] == [("a", 1.0), ("b", 0.0)]
+    assert len(fake_reranker.batches) == 1
+
+
+def test_rerank_documents_falls_back_to_retrieval_order(monkeypatch):
+    class FailingReranker(FakeReranker):
+        def score_pairs(self, query, texts):
+            raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(vectordb_setup, "reranker", FailingReranker())
+    candidates = [doc("x", "a"), doc("y", "b"), doc("z", "c")]
+
+    reranked = vectordb_setup.rerank_documents("q", candidates, final_k=2)
+
+    assert [d.metadata["id"] for d in reranked] == ["a", "b"]
+    assert "rerank_score" not in reranked[0].metadata
+
+
+def test_noop_reranker_leaves_no_rerank_score(monkeypatch):
+    monkeypatch.setattr(vectordb_setup, "reranker", NoopReranker())
+
+    reranked = vectordb_setup.rerank_documents("q", [doc("x", "a"), doc("y", "b")], final_k=1)
+
+    assert [d.metadata for d in reranked] == [{"id": "a"}]
@@ -0,0 +1,106 @@
+import pytest
+from langchain.schema import Document
+
+from src.processing_db import retrieval_cache as retrieval_cache_module
+from src.processing_db.retrieval_cache import RetrievalCache, bump_index_version, normalize_query, read_index_version
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(retrieval_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RetrievalCache(max_entries=2, ttl=60, version_path=str(tmp_path / "index_version"))
+
+
+def lookup(cache, query, final_k=3):
+    return cache.get(query, 20, final_k)[0]
+
+
+def store(cache, query, documents, final_k=3, latency=0.1):
+    """Caches a result the way search_documents does: under the version read by the lookup before retrieval."""
+    _, version = cache.get(query, 20, final_k)
+    cache.put(query, 20, final_k, documents, latency, version)
+
+
+def test_queries_are_normalized():
+    assert normalize_query("  What is   IPC 420?? ") == "what is ipc 420"
+
+
+def test_hit_for_normalized_query_and_same_k(cache, clock):
+    store(cache, "What is IPC 420?", ["doc"], latency=1.5)
+
+    assert lookup(cache, "what is ipc 420") == ["doc"]
+    assert lookup(cache, "what is ipc 420", final_k=5) is None
+    assert cache.stats()["latency_saved_seconds"] == 1.5
+
+
+def test_miss_returns_current_index_version(cache):
+    bump_index_version(cache.version_path)
+
+    assert cache.get("q", 20, 3) == (None, read_index_version(cache.version_path))
+
+
+def test_returned_list_is_a_copy(cache, clock):
+    store(cache, "q", ["doc"])
+
+    lookup(cache, "q").append("other")
+
+    assert lookup(cache, "q") == ["doc"]
+
+
+def test_documents_are_copied_in_and_out(cache, clock):
+    document = Document(page_content="text", metadata={"id": "a"})
+    store(cache, "q", [document])
+
+    # Callers tag metadata on their results; neither the stored nor a returned copy may change the entry
+    document.metadata["rerank_score"] = 1.0
+    lookup(cache, "q")[0].metadata["citation"] = True
+
+    assert lookup(cache, "q")[0].metadata == {"id": "a"}
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    store(cache, "q", ["doc"])
+
+    clock[0] += 60
+    assert lookup(cache, "q") == ["doc"]
+    clock[0] += 1
+    assert lookup(cache, "q") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_index_version_bump_invalidates_entries(cache, clock):
+    store(cache, "q", ["old"])
+
+    bump_index_version(cache.version_path)
+
+    assert read_index_version(cache.version_path) != 0
+    assert lookup(cache, "q") is None
+    store(cache, "q", ["new"])
+    assert lookup(cache, "q") == ["new"]
+
+
+def test_result_retrieved_during_a_bump_keeps_the_older_version(cache, clock):
+    _, version = cache.get("q", 20, 3)
+    # Ingestion bumps the stamp while the query is being retrieved from the old index
+    bump_index_version(cache.version_path)
+    cache.put("q", 20, 3, ["stale"], 0.1, version)
+
+    assert lookup(cache, "q") is None
+
+
+def test_least_recently_used_entry_is_evicted(cache, clock):
+    store(cache, "a", ["a"])
+    store(cache, "b", ["b"])
+    lookup(cache, "a")
+
+    store(cache, "c", ["c"])
+
+    assert lookup(cache, "b") is None
+    assert lookup(cache, "a") == ["a"]
+    assert lookup(cache, "c") == ["c"]
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src import semantic_cache as semantic_cache_module
+from src.processing_db.retrieval_cache import bump_index_version
+from src.semantic_cache import SemanticAnswerCache
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(semantic_cache_module.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticAnswerCache(threshold=0.95, max_entries=10, ttl=60, dimension=4, version_path=str(tmp_path / "index_version"))
+
+
+def test_similar_query_hits(cache, clock):
+    cache.put("What is IPC 420?", [1.0, 0.0, 0.0, 0.0], {"answer": "Cheating"})
+
+    answer, matched_query, similarity = cache.get([0.99, 0.05, 0.0, 0.0])
+
+    assert answer == {"answer": "Cheating"}
+    assert matched_query == "What is IPC 420?"
+    assert similarity >= 0.95
+
+
+def test_dissimilar_query_misses(cache, clock):
+    cache.put("What is IPC 420?", [1.0, 0.0, 0.0, 0.0], {"answer": "Cheating"})
+
+    assert cache.get([0.0, 1.0, 0.0, 0.0]) is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("What is IPC 420?", [1.0, 0.0, 0.0, 0.0], {"answer": "Cheating"})
+
+    clock.now += 61
+
+    assert cache.get([1.0, 0.0, 0.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_nearest_entry_does_not_hide_a_valid_one(cache, clock):
+    cache.put("old", [1.0, 0.0, 0.0, 0.0], {"answer": "old"})
+    clock.now += 50
+    cache.put("new", [0.98, 0.2, 0.0, 0.0], {"answer": "new"})
+    clock.now += 20
+
+    answer, _, _ = cache.get([1.0, 0.0, 0.0, 0.0])
+
+    assert answer == {"answer": "new"}
+
+
+def test_index_version_change_invalidates_entries(cache, clock):
+    cache.put("What is IPC 420?", [1.0, 0.0, 0.0, 0.0], {"answer": "Cheating"})
+
+    bump_index_version(cache.version_path)
+
+    assert cache.get([1.0, 0.0, 0.0, 0.0]) is None
+    assert cache.stats()["entries"] == 0
+    cache.put("What is IPC 420?", [1.0, 0.0, 0.0, 0.0], {"answer": "Cheating, updated"})
+    assert cache.get([1.0, 0.0, 0.0, 0.0])[0] == {"answer": "Cheating, updated"}
+
+
+def test_least_recently_used_entry_is_evicted_at_capacity(tmp_path, clock):
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=2, ttl=60, dimension=4, version_path=str(tmp_path / "index_version"))
+    cache.put("a", [1.0, 0.0, 0.0, 0.0], {"answer": "a"})
+    clock.now += 1
+    cache.put("b", [0.0, 1.0, 0.0, 0.0], {"answer": "b"})
+    clock.now += 1
+    cache.get(np.array([1.0, 0.0, 0.0, 0.0]))
+    clock.now += 1
+
+    cache.put("c", [0.0, 0.0, 1.0, 0.0], {"answer": "c"})
+
+    assert cache.get([0.0, 1.0, 0.0, 0.0]) is None
+    assert cache.get([1.0, 0.0, 0.0, 0.0])[0] == {"answer": "a"}
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,113 @@
+import hashlib
+
+import fitz
+import numpy as np
+import pytest
+
+from src.token_counter import token_counter
+from src.processing_db.semantic_chunking import Sentence, ShardedSemanticChunker, split_sentences, stitch
+
+PAGES = [
+    "Section 1. Whoever commits theft shall be punished. The punishment may extend to three years and",
+    "a fine, or both. Section 2. Whoever commits robbery shall be punished with rigorous imprisonment which",
+    "may extend to ten years. Section 3. Attempt to commit robbery is punishable too.",
+    "Section 4. Extortion means intentionally putting any person in fear of injury; such a person may be",
+    "compelled to deliver property. Section 5. Dacoity is robbery by five or more persons.",
+    "Section 6. Criminal breach of trust is punishable. Section 7. Cheating is punishable and the cheat",
+    "shall also pay compensation (see Section 8)",
+]
+
+
+class FakeEmbeddings:
+    """Deterministic pseudo-random vector per text."""
+
+    def embed_documents(self, texts):
+        return [
+            np.random.RandomState(int(hashlib.md5(text.encode()).hexdigest()[:8], 16)).randn(8).tolist()
+            for text in texts
+        ]
+
+
+def sentence(page, text, tokens=None):
+    return Sentence(page, 0, page, len(text), text, tokens if tokens is not None else len(text.split()))
+
+
+def test_split_sentences_keeps_offsets_into_raw_text():
+    text = "First  sentence.\nSecond one?  Third!"
+
+    sentences = split_sentences(text)
+
+    assert [s for _, _, s in sentences] == ["First sentence.", "Second one?", "Third!"]
+    assert [text[start:end] for start, end, _ in sentences] == ["First  sentence.", "Second one?", "Third!"]
+
+
+def test_stitch_rejoins_sentences_cut_at_a_page_boundary():
+    shards = [[sentence(1, "Done."), sentence(1, "Cut across")], [sentence(2, "two pages."), sentence(2, "Next.")]]
+
+    stitched = stitch(shards)
+
+    assert [s.text for s in stitched] == ["Done.", "Cut across two pages.", "Next."]
+    assert (stitched[1].page, stitched[1].end_page, stitched[1].tokens) == (1, 2, 4)
+
+
+@pytest.mark.parametrize("split", [1, 2, 3])
+def test_stitch_is_independent_of_shard_boundaries(split):
+    sentences = [sentence(1, "A b."), sentence(1, "C d"), sentence(2, "e f"), sentence(3, "g."), sentence(3, "H.")]
+
+    assert stitch([sentences[:split], sentences[split:]]) == stitch([sentences])
+
+
+def test_pack_keeps_chunks_within_max_tokens():
+    chunker = ShardedSemanticChunker(FakeEmbeddings(), max_tokens=5)
+    group = [sentence(1, "one two three"), sentence(1, "four five"), sentence(1, "six"), sentence(2, "seven eight")]
+
+    chunks = chunker._pack(group)
+
+    assert [[s.text for s in chunk] for chunk in chunks] == [["one two three", "four five"], ["six", "seven eight"]]
+    assert all(sum(s.tokens for s in chunk) <= 5 for chunk in chunks)
+
+
+def test_pack_splits_an_oversized_sentence_in_place(monkeypatch):
+    monkeypatch.setattr(token_counter, "_encoding", False)
+    chunker = ShardedSemanticChunker(FakeEmbeddings(), max_tokens=4)
+    long = sentence(2, "w1 w2 w3 w4 w5 w6 w7 w8 w9 w10")
+
+    chunks = chunker._pack([sentence(1, "before"), long, sentence(3, "after")])
+
+    assert [s.text for s in chunks[0]] == ["before"]
+    assert [s.text for s in chunks[-1]] == ["after"]
+    parts = [chunk[0] for chunk in chunks[1:-1]]
+    assert all(len(part.text.split()) <= 4 for part in parts)
+    # Every part keeps the page and offsets of the whole sentence
+    assert {(part.page, part.start, part.end) for part in parts} == {(2, 0, len(long.text))}
+
+
+def chunk_with(path, pages_per_shard, workers=1):
+    chunker = ShardedSemanticChunker(FakeEmbeddings(), pages_per_shard=pages_per_shard, workers=workers, max_tokens=20)
+    return [(doc.page_content, doc.metadata) for doc in chunker.chunk(path, metadata={"source": "ipc"})]
+
+
+def test_chunks_do_not_depend_on_shard_size(make_pdf):
+    path = make_pdf(PAGES)
+
+    expected = chunk_with(path, pages_per_shard=len(PAGES))
+
+    for pages_per_shard in (1, 2, 3, 5):
+        assert chunk_with(path, pages_per_shard) == expected
+    assert chunk_with(path, pages_per_shard=2, workers=2) == expected
+
+
+def test_chunk_metadata_points_back_into_page_text(make_pdf):
+    path = make_pdf(PAGES)
+    with fitz.open(path) as doc:
+        page_text = [page.get_text() for page in doc]
+
+    chunks = chunk_with(path, pages_per_shard=2)
+
+    assert " ".join(text for text, _ in chunks) == " ".join(" ".join(PAGES).split())
+    for text, metadata in chunks:
+        first_page = page_text[metadata["page_start"] - 1]
+        last_page = page_text[metadata["page_end"] - 1]
+        assert text.split()[0] == first_page[metadata["char_start"]:].split()[0]
+        assert text.split()[-1] == last_page[:metadata["char_end"]].split()[-1]
+        assert metadata["source"] == "ipc"
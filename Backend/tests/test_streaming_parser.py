@@ -0,0 +1,66 @@
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.LLM_setup.LLM_call import StreamingAnswerParser, parse_gemini_response
+
+RESPONSE = (
+    "<inner_monologue>\n  Section 302 applies; check <additional> notes.\n</inner_monologue>\n"
+    "<answer>\n  The punishment is death or life imprisonment [1].\n\nSee also a < b cases.\n</answer>"
+)
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def stream(pieces):
+    parser = StreamingAnswerParser()
+    events = []
+    for piece in pieces:
+        events.extend(parser.feed(piece))
+    events.extend(parser.close())
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, len(RESPONSE)])
+def test_streamed_result_matches_non_streaming_parse(size):
+    parser, events = stream(chunks(RESPONSE, size))
+
+    expected = parse_gemini_response(AIMessage(content=RESPONSE))
+    assert parser.result() == expected
+    # The streamed events carry exactly the text that ends up in the result
+    for section in expected:
+        assert "".join(text for name, text in events if name == section).strip() == expected[section]
+
+
+def test_tag_split_across_chunks_is_not_leaked():
+    parser, events = stream(["<inner_mono", "logue>thinking</inner", "_monologue><ans", "wer>final</", "answer>"])
+
+    assert events == [("inner_monologue", "thinking"), ("answer", "final")]
+    assert parser.result() == {"inner_monologue": "thinking", "answer": "final"}
+
+
+def test_partial_tag_is_held_back_until_resolved():
+    parser = StreamingAnswerParser()
+    assert parser.feed("<answer>Yes <") == [("answer", "Yes ")]
+    assert parser.feed("b>") == [("answer", "<"), ("answer", "b>")]
+
+
+def test_missing_closing_tag_keeps_streamed_answer():
+    # A truncated stream has already shown this text to the user, so the result keeps it
+    parser, events = stream(chunks("<inner_monologue>plan</inner_monologue><answer>The answer is cut", 4))
+
+    assert parser.result() == {"inner_monologue": "plan", "answer": "The answer is cut"}
+    assert "".join(text for name, text in events if name == "answer") == "The answer is cut"
+
+
+def test_trailing_partial_tag_is_flushed_on_close():
+    parser, events = stream(["<answer>ends with <", "/ans"])
+
+    assert parser.result()["answer"] == "ends with </ans"
+
+
+def test_text_outside_sections_is_dropped():
+    parser, events = stream(["preamble <answer>only this</answer> trailer"])
+
+    assert events == [("answer", "only this")]
@@ -0,0 +1,69 @@
+import pytest
+
+from src.token_counter import TokenCounter
+
+ENGLISH = " ".join(
+    f"Section {i}: whoever voluntarily causes hurt shall be punished with imprisonment of up to {i} years."
+    for i in range(1, 40)
+)
+# Tokens much shorter than the average CHARS_PER_TOKEN
+DENSE = " ".join(str(i % 10) for i in range(2000))
+
+
+@pytest.fixture(params=["words", "tiktoken"])
+def counter(request):
+    counter = TokenCounter()
+    if request.param == "words":
+        counter._encoding = False
+    elif counter.encoding is None:
+        pytest.skip("tiktoken encoding unavailable offline")
+    return counter
+
+
+@pytest.mark.parametrize("text", [ENGLISH, DENSE], ids=["english", "dense"])
+@pytest.mark.parametrize("max_tokens", [1, 7, 50, 10000])
+def test_truncate_stays_within_budget(counter, text, max_tokens):
+    head = counter.truncate(text, max_tokens)
+    tail = counter.truncate(text, max_tokens, keep_end=True)
+
+    assert counter.count(head) <= max_tokens and counter.count(tail) <= max_tokens
+    assert text.startswith(head.split()[0]) and text.endswith(tail.split()[-1])
+    if counter.count(text) <= max_tokens:
+        assert head == tail == text
+
+
+def test_truncate_to_nothing(counter):
+    assert counter.truncate(ENGLISH, 0) == ""
+    assert counter.truncate(ENGLISH, -5, keep_end=True) == ""
+
+
+@pytest.mark.parametrize("text", [ENGLISH, DENSE], ids=["english", "dense"])
+@pytest.mark.parametrize("max_tokens,overlap", [(16, 0), (16, 4), (100, 99), (5000, 10)])
+def test_split_windows_stay_within_budget_and_cover_text(counter, text, max_tokens, overlap):
+    windows = counter.split(text, max_tokens, overlap)
+
+    assert all(counter.count(window) <= max_tokens for window in windows)
+    assert windows[0].split()[0] == text.split()[0]
+    assert windows[-1].split()[-1] == text.split()[-1]
+    if counter.encoding is None:
+        # Words round-trip exactly: dropping each window's overlap rebuilds the text
+        words = windows[0].split() + [w for window in windows[1:] for w in window.split()[overlap:]]
+        assert words == text.split()
+
+
+def test_split_empty_text(counter):
+    assert counter.split("", 10) == []
+
+
+@pytest.mark.parametrize("text", [ENGLISH, DENSE, "", "short"], ids=["english", "dense", "empty", "short"])
+def test_fits_agrees_with_exact_count(counter, text):
+    total = counter.count(text) + counter.count("a query")
+
+    for budget in (0, total // 2, total - 1, total, total + 1, total * 10):
+        assert counter.fits([text, "a query"], budget) == (total <= budget)
+
+
+def test_count_batch_matches_count(counter):
+    texts = [ENGLISH, DENSE, "", "one"]
+
+    assert counter.count_batch(texts) == [counter.count(text) for text in texts]
@@ -1,7 +1,10 @@
+import json
+import uuid
 import streamlit as st
 import requests
 
-API_URL = "http://localhost:8000/chat"
+API_URL = "http://localhost:8000/chat/stream"
+EVALUATION_URL = "http://localhost:8000/evaluate"
 
 st.set_page_config(page_title="Legal Chatbot", page_icon="⚖️")
 st.title("🧑‍⚖️ Indian Legal Chatbot")
@@ -11,13 +14,28 @@ st.caption("Ask legal questions and get responses based on Indian law")
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+# Backend keeps chat history per session id
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
 # Clear chat button
 with st.sidebar:
     st.header("⚙️ Options")
     if st.button("🗑️ Clear Chat"):
         st.session_state.messages = []
+        st.session_state.session_id = uuid.uuid4().hex
         st.experimental_rerun()
 
+def read_events(response):
+    """Yields (event, data) pairs from a server-sent events response."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:") and event:
+            yield event, json.loads(line[len("data:"):].strip())
+            event = None
+
 # Display chat history
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
@@ -34,25 +52,47 @@ if user_input := st.chat_input("Type your legal query..."):
     with st.chat_message("assistant"):
         with st.spinner("Thinking..."):
             try:
-                response = requests.post(API_URL, json={"query": user_input})
+                response = requests.post(
+                    API_URL,
+                    json={"query": user_input, "session_id": st.session_state.session_id},
+                    stream=True
+                )
 
                 if response.status_code == 200:
-                    data = response.json()
+                    answer_placeholder = st.empty()
+                    answer = ""
+                    data = {}
+
+                    # Answer tokens are rendered as they arrive; "done" carries the rest
+                    for event, payload in read_events(response):
+                        if event == "answer":
+                            answer += payload["text"]
+                            answer_placeholder.markdown(f"**Answer:** {answer}▌")
+                        elif event == "done":
+                            data = payload
+                        elif event == "error":
+                            st.error(f"❌ Error: {payload.get('detail', 'Chatbot backend returned an error.')}")
 
-                    answer = data.get("answer", "Sorry, I couldn't find an answer.")
+                    answer = data.get("answer", answer) or "Sorry, I couldn't find an answer."
                     inner_monologue = data.get("inner_monologue", "")
-                    eval_scores = data.get("Evaluation scores", {})
+                    evaluation_id = data.get("Evaluation id")
 
-                    st.markdown(f"**Answer:** {answer}")
+                    answer_placeholder.markdown(f"**Answer:** {answer}")
                     st.session_state.messages.append({"role": "assistant", "content": f"{answer}"})
 
                     # Expanders for more details
                     with st.expander("🧠 Inner Monologue"):
                         st.markdown(inner_monologue)
 
+                    # Evaluation runs in the background on the backend, so it may not be ready yet
                     with st.expander("📊 Evaluation Metrics"):
-                        for metric, score in eval_scores.items():
-                            st.write(f"{metric}: {score:.4f}")
+                        evaluation = requests.get(f"{EVALUATION_URL}/{evaluation_id}").json() if evaluation_id else {}
+                        eval_scores = evaluation.get("evaluation_scores") or {}
+                        if eval_scores:
+                            for metric, score in eval_scores.items():
+                                st.write(f"{metric}: {score:.4f}")
+                        else:
+                            st.write(f"Evaluation {evaluation.get('status', 'pending')} (id: {evaluation_id})")
 
                 else:
                     st.error("❌ Error: Chatbot backend returned an error.")